@@ -77,6 +77,9 @@ QUERY_TO_LABEL_MAPPING = {
     'support': 'support',
 }
 
+# Query terms ordered longest first, computed once rather than per lookup
+_TERMS_LONGEST_FIRST = sorted(QUERY_TO_LABEL_MAPPING, key=len, reverse=True)
+
 
 def get_label_from_query(query: str) -> str | None:
     """Extract classification label from a query string.
@@ -90,9 +93,7 @@ def get_label_from_query(query: str) -> str | None:
     query_lower = query.lower()
 
     # Check for longest matches first to handle multi-word terms
-    sorted_terms = sorted(QUERY_TO_LABEL_MAPPING.keys(), key=len, reverse=True)
-
-    for term in sorted_terms:
+    for term in _TERMS_LONGEST_FIRST:
         if term in query_lower:
             return QUERY_TO_LABEL_MAPPING[term]
 
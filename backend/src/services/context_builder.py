@@ -3,10 +3,18 @@
 This module handles formatting email data into context strings for LLM consumption.
 Separates context formatting concerns from the RAG query orchestration.
 """
+from functools import lru_cache
 from typing import List
 from datetime import datetime
 
 
+@lru_cache(maxsize=1024)
+def _format_ts(internal_date: int) -> str:
+    """Format a milliseconds-since-epoch timestamp (cached per timestamp)."""
+    dt = datetime.fromtimestamp(internal_date / 1000)
+    return dt.strftime('%Y-%m-%d %H:%M')
+
+
 class ContextBuilder:
     """Builder for creating LLM context from email messages."""
 
@@ -42,13 +50,11 @@ class ContextBuilder:
         Returns:
             Formatted context string for LLM
         """
-        context_parts = []
-
-        for idx, email in enumerate(messages, 1):
-            email_context = self._format_email(idx, email)
-            context_parts.append(email_context)
-
-        return "\n".join(context_parts)
+        # Each email block is produced by a single f-string and the blocks are
+        # joined once, so building context stays linear in the total length.
+        return "\n".join(
+            self._format_email(idx, email) for idx, email in enumerate(messages, 1)
+        )
 
     def _format_email_with_score(self, idx: int, email, score: float) -> str:
         """Format a single email with similarity score for context.
@@ -61,20 +67,7 @@ class ContextBuilder:
         Returns:
             Formatted email string
         """
-        date_str = self._format_date(email.internal_date)
-
-        # Use full body text instead of snippet for better context
-        # Limit to 2000 chars per email to stay within LLM context windows
-        body_text = email.get_body_text()
-        if len(body_text) > 2000:
-            body_text = body_text[:2000] + "... [truncated]"
-
-        return f"""Email {idx} (Relevance: {score:.2f}):
-Subject: {email.subject or 'No subject'}
-From: {email.from_ or 'Unknown'}
-Date: {date_str}
-Content: {body_text or 'No content available'}
-"""
+        return self._format_block(f"Email {idx} (Relevance: {score:.2f}):", email)
 
     def _format_email(self, idx: int, email) -> str:
         """Format a single email without similarity score for context.
@@ -83,6 +76,18 @@ Content: {body_text or 'No content available'}
             idx: Email index number
             email: MailMessage object
 
+        Returns:
+            Formatted email string
+        """
+        return self._format_block(f"Email {idx}:", email)
+
+    def _format_block(self, title: str, email) -> str:
+        """Render one email block under the given title line.
+
+        Args:
+            title: First line of the block (index and optional relevance)
+            email: MailMessage object
+
         Returns:
             Formatted email string
         """
@@ -94,7 +99,7 @@ Content: {body_text or 'No content available'}
         if len(body_text) > 2000:
             body_text = body_text[:2000] + "... [truncated]"
 
-        return f"""Email {idx}:
+        return f"""{title}
 Subject: {email.subject or 'No subject'}
 From: {email.from_ or 'Unknown'}
 Date: {date_str}
@@ -113,8 +118,7 @@ Content: {body_text or 'No content available'}
         try:
             if internal_date:
                 # internal_date is milliseconds since epoch
-                dt = datetime.fromtimestamp(internal_date / 1000)
-                return dt.strftime('%Y-%m-%d %H:%M')
+                return _format_ts(internal_date)
             else:
                 return 'Unknown'
         except Exception:
@@ -4,7 +4,6 @@ This module provides local, privacy-preserving text embeddings using sentence-tr
 No API calls or cloud services are used.
 """
 from typing import List, Dict, Optional
-from sentence_transformers import SentenceTransformer
 import re
 
 
@@ -29,6 +28,9 @@ class EmbeddingService:
             model_name: Name of the sentence-transformers model to use.
                        Default is all-MiniLM-L6-v2 (384 dimensions).
         """
+        # Imported here so that importing src.services does not pull in torch
+        from sentence_transformers import SentenceTransformer
+
         self.model_name = model_name
         self.model = SentenceTransformer(model_name)
         self.embedding_dim = self.model.get_sentence_embedding_dimension()
@@ -15,9 +15,12 @@ Configuration via environment variables:
 - ORGANIZE_MAIL_LLM_CMD: External command to run (if using command provider)
 - LLM_MODEL: Model name (default: gpt-3.5-turbo for OpenAI, claude-3-haiku for Anthropic, llama3 for Ollama)
 """
+from functools import lru_cache
 from typing import Dict, Optional
+import copy
 import os
 import json
+import re
 import shlex
 import subprocess
 import urllib.request
@@ -33,10 +36,106 @@ from .prompt_templates import (
     CHAT_TITLE_GENERATION_PROMPT,
 )
 
+try:
+    # Faster drop-in for json.loads; its JSONDecodeError subclasses json's
+    from orjson import loads as _json_loads
+except ImportError:  # pragma: no cover - optional dependency
+    from json import loads as _json_loads
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 
+# First markdown code block (optionally tagged json); tolerates a missing
+# closing fence. Used by _parse_response_cached.
+_CODE_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*(?:```|$)", re.DOTALL)
+
+
+def _keyword_pattern(*keywords: str) -> "re.Pattern[str]":
+    """Compile keywords into one alternation (plain substring match)."""
+    return re.compile("|".join(re.escape(k) for k in keywords))
+
+
+# (pattern, label or None, sets high priority) for LLMProcessor._rule_based,
+# checked in order against the lowercased subject + body.
+_RULE_BASED_KEYWORDS = (
+    (_keyword_pattern("invoice", "payment", "receipt", "bill"), "finance", False),
+    (_keyword_pattern("password", "login", "security", "account"), "security", True),
+    (_keyword_pattern("urgent", "asap", "immediately"), None, True),
+    (_keyword_pattern("meeting", "schedule", "calendar"), "meetings", False),
+    # Job-related keywords
+    (_keyword_pattern("thank you for applying", "application received", "applied for"), "job-application", False),
+    (_keyword_pattern("interview", "schedule a call", "would like to meet"), "job-interview", False),
+    (_keyword_pattern("job offer", "offer letter", "pleased to offer"), "job-offer", True),
+    (_keyword_pattern("unfortunately", "not moving forward", "position has been filled"), "job-rejection", False),
+    (_keyword_pattern("jobs match", "new job", "job alert", "apply now"), "job-ad", False),
+)
+
+
+@lru_cache(maxsize=1024)
+def _parse_response_cached(content: str) -> Dict:
+    """Parse and normalize one raw LLM response (cached per response string).
+
+    The returned dict is shared between cache hits; callers go through
+    LLMProcessor._parse_llm_response, which hands out a deep copy.
+    """
+    # Try to extract JSON from markdown code blocks if present
+    if "```" in content:
+        match = _CODE_FENCE_RE.search(content)
+        content = match.group(1)
+
+    result = _json_loads(content)
+
+    # Handle common LLM variations
+    # 1. "label" (singular) instead of "labels" (plural)
+    if "label" in result and "labels" not in result:
+        label_value = result["label"]
+        # Check if it's a comma-separated string
+        if isinstance(label_value, str):
+            result["labels"] = [
+                label.strip() for label in label_value.split(",") if label.strip()
+            ]
+        else:
+            result["labels"] = [label_value] if label_value else []
+        del result["label"]
+
+    # 2. Ensure labels is a list
+    if "labels" not in result:
+        result["labels"] = []
+    elif not isinstance(result["labels"], list):
+        # Convert single string to list
+        result["labels"] = [result["labels"]] if result["labels"] else []
+
+    # 3. Filter labels to only allowed ones (normalize to lowercase)
+    if result.get("labels"):
+        normalized_labels = []
+        for label in result["labels"]:
+            label_lower = str(label).lower().strip()
+            if label_lower in ALLOWED_LABELS:
+                normalized_labels.append(label_lower)
+        result["labels"] = normalized_labels
+
+    # 4. Ensure priority exists and is valid
+    if "priority" not in result:
+        result["priority"] = "normal"
+
+    # Normalize priority to lowercase
+    if isinstance(result.get("priority"), str):
+        result["priority"] = result["priority"].lower()
+        if result["priority"] not in ("high", "normal", "low"):
+            result["priority"] = "normal"
+
+    # 5. Ensure summary exists
+    if "summary" not in result:
+        result["summary"] = ""
+
+    # Ensure summary is a string
+    if not isinstance(result.get("summary"), str):
+        result["summary"] = str(result.get("summary", ""))
+
+    return result
+
+
 class LLMProcessor:
     """LangChain-powered LLM processor for email classification and RAG."""
 
@@ -220,7 +319,7 @@ class LLMProcessor:
         
         if self.llm:
             # Use LangChain
-            logger.info(f"[LLM INVOKE] Using LangChain with {self.provider}/{self.model}")
+            logger.info("[LLM INVOKE] Using LangChain with %s/%s", self.provider, self.model)
             messages = [HumanMessage(content=prompt)]
             response = self.llm.invoke(messages)
             logger.info("[LLM INVOKE] ========== LLM Response Received ==========")
@@ -229,7 +328,7 @@ class LLMProcessor:
             return response.content.strip()
         elif self.provider == "ollama":
             # Fallback to direct Ollama API
-            logger.info(f"[LLM INVOKE] Using direct Ollama API")
+            logger.info("[LLM INVOKE] Using direct Ollama API")
             result = self._call_ollama_direct(prompt)
             logger.info("[LLM INVOKE] ========== LLM Response Received ==========")
             logger.info("[LLM INVOKE] Response length: %d chars", len(result))
@@ -237,7 +336,7 @@ class LLMProcessor:
             return result
         elif self.provider == "rules":
             # Rules provider fallback - return a simple response for testing
-            logger.info(f"[LLM INVOKE] Rules provider - returning fallback response")
+            logger.info("[LLM INVOKE] Rules provider - returning fallback response")
             return "Based on the emails provided, I can help answer your question."
         else:
             raise RuntimeError(f"No LLM available for provider '{self.provider}'")
@@ -409,62 +508,9 @@ class LLMProcessor:
 
     def _parse_llm_response(self, content: str) -> Dict:
         """Parse LLM response, handling common formatting issues."""
-        # Try to extract JSON from markdown code blocks if present
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-
-        result = json.loads(content)
-
-        # Handle common LLM variations
-        # 1. "label" (singular) instead of "labels" (plural)
-        if "label" in result and "labels" not in result:
-            label_value = result["label"]
-            # Check if it's a comma-separated string
-            if isinstance(label_value, str):
-                result["labels"] = [
-                    label.strip() for label in label_value.split(",") if label.strip()
-                ]
-            else:
-                result["labels"] = [label_value] if label_value else []
-            del result["label"]
-
-        # 2. Ensure labels is a list
-        if "labels" not in result:
-            result["labels"] = []
-        elif not isinstance(result["labels"], list):
-            # Convert single string to list
-            result["labels"] = [result["labels"]] if result["labels"] else []
-
-        # 3. Filter labels to only allowed ones (normalize to lowercase)
-        if result.get("labels"):
-            normalized_labels = []
-            for label in result["labels"]:
-                label_lower = str(label).lower().strip()
-                if label_lower in ALLOWED_LABELS:
-                    normalized_labels.append(label_lower)
-            result["labels"] = normalized_labels
-
-        # 4. Ensure priority exists and is valid
-        if "priority" not in result:
-            result["priority"] = "normal"
-
-        # Normalize priority to lowercase
-        if isinstance(result.get("priority"), str):
-            result["priority"] = result["priority"].lower()
-            if result["priority"] not in ("high", "normal", "low"):
-                result["priority"] = "normal"
-
-        # 5. Ensure summary exists
-        if "summary" not in result:
-            result["summary"] = ""
-
-        # Ensure summary is a string
-        if not isinstance(result.get("summary"), str):
-            result["summary"] = str(result.get("summary", ""))
-
-        return result
+        # Identical responses (retries, duplicate emails) are parsed once;
+        # deep-copy so callers can't mutate the cached result or anything nested in it
+        return copy.deepcopy(_parse_response_cached(content))
 
     def _rule_based(self, subject: str, body: str) -> Dict:
         """A simple, local heuristic classifier used as a fallback.
@@ -472,33 +518,16 @@ class LLMProcessor:
         This is intentionally small: it looks for keywords and maps them to
         labels/priority. Replace with a proper LLM call in production.
         """
-        text = (subject or "") + "\n" + (body or "")
-        text_lower = text.lower()
+        text_lower = ((subject or "") + "\n" + (body or "")).lower()
         labels = []
         priority = "normal"
 
-        if any(k in text_lower for k in ["invoice", "payment", "receipt", "bill"]):
-            labels.append("finance")
-        if any(k in text_lower for k in ["password", "login", "security", "account"]):
-            labels.append("security")
-            priority = "high"
-        if any(k in text_lower for k in ["urgent", "asap", "immediately"]):
-            priority = "high"
-        if any(k in text_lower for k in ["meeting", "schedule", "calendar"]):
-            labels.append("meetings")
-
-        # Job-related keywords
-        if any(k in text_lower for k in ["thank you for applying", "application received", "applied for"]):
-            labels.append("job-application")
-        if any(k in text_lower for k in ["interview", "schedule a call", "would like to meet"]):
-            labels.append("job-interview")
-        if any(k in text_lower for k in ["job offer", "offer letter", "pleased to offer"]):
-            labels.append("job-offer")
-            priority = "high"
-        if any(k in text_lower for k in ["unfortunately", "not moving forward", "position has been filled"]):
-            labels.append("job-rejection")
-        if any(k in text_lower for k in ["jobs match", "new job", "job alert", "apply now"]):
-            labels.append("job-ad")
+        for pattern, label, high_priority in _RULE_BASED_KEYWORDS:
+            if pattern.search(text_lower):
+                if label:
+                    labels.append(label)
+                if high_priority:
+                    priority = "high"
 
         # Generate simple summary from subject
         summary = subject[:100] if subject else "No subject"
@@ -14,24 +14,14 @@ from langchain_core.prompts import PromptTemplate
 CLASSIFICATION_SYSTEM_MESSAGE = "You are an email classification assistant. Return only valid JSON with no explanations."
 
 
-def build_classification_prompt(subject: str, body: str) -> str:
-    """Build a structured prompt for LLM classification.
-
-    Args:
-        subject: Email subject
-        body: Email body (will be truncated to 2000 chars)
-
-    Returns:
-        Formatted prompt string for LLM
-    """
-    # Truncate body to avoid token limits
-    body_truncated = body[:2000] if body else ""
-
-    return f"""Classify this email into categories, assign a priority level, and provide a brief summary.
+# Static text around the subject/body of the classification prompt. Kept as
+# module constants so each call only splices in the per-email parts.
+_CLASSIFICATION_PROMPT_HEAD = """Classify this email into categories, assign a priority level, and provide a brief summary.
 
 Email to classify:
-Subject: {subject}
-Body: {body_truncated}
+Subject: """
+
+_CLASSIFICATION_PROMPT_TAIL = """
 
 Instructions:
 - You MUST ONLY choose labels from this exact list (do not create new labels):
@@ -52,11 +42,31 @@ Instructions:
 - Write a brief summary (1-2 sentences) of the email's main purpose
 - Return ONLY a JSON object in this exact format:
 
-{{"labels": ["category1", "category2"], "priority": "normal", "summary": "Brief description of the email"}}
+{"labels": ["category1", "category2"], "priority": "normal", "summary": "Brief description of the email"}
 
 Do not include explanations or markdown. Only output valid JSON. Do not invent labels not in the list."""
 
 
+def build_classification_prompt(subject: str, body: str) -> str:
+    """Build a structured prompt for LLM classification.
+
+    Args:
+        subject: Email subject
+        body: Email body (will be truncated to 2000 chars)
+
+    Returns:
+        Formatted prompt string for LLM
+    """
+    # Truncate body to avoid token limits
+    body_truncated = body[:2000] if body else ""
+
+    return "".join((
+        _CLASSIFICATION_PROMPT_HEAD,
+        f"{subject}\nBody: {body_truncated}",
+        _CLASSIFICATION_PROMPT_TAIL,
+    ))
+
+
 # =============================================================================
 # RAG QUERY CLASSIFICATION PROMPTS
 # =============================================================================
@@ -1,26 +1,102 @@
 """Query classifier for routing queries to appropriate handlers."""
 import logging
-from typing import Optional
+import re
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 
 from langchain_core.messages import SystemMessage, HumanMessage
 
-from .llm_processor import LLMProcessor
+from .llm_processor import LLMProcessor, _keyword_pattern
 from .prompt_templates import QUERY_CLASSIFICATION_PROMPT
 from ..classification_labels import is_classification_query
 
 logger = logging.getLogger(__name__)
 
 
+# Longest question prefix used for classification
+MAX_QUERY_CHARS = 500
+
+# (provider, model, normalized question) -> query type from a successful LLM
+# classification without chat context, least recently used first
+CLASSIFICATION_CACHE_SIZE = 1024
+_classification_cache: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+
+
+_SYSTEM_MESSAGE = "You are a helpful assistant that provides concise answers."
+
+
+def _cache_normalize(question: str) -> str:
+    """Classification cache key for a question.
+
+    Case, runs of whitespace and trailing ?/!/. don't change a query's
+    intent, so "Recent emails?" and "recent  emails" share one entry.
+    """
+    return " ".join(question.lower().split()).rstrip("?!.")
+
+
+def _cache_classification(key: Tuple[str, str, str], query_type: str) -> None:
+    """Remember an LLM classification, evicting the least recently used."""
+    _classification_cache[key] = query_type
+    while len(_classification_cache) > CLASSIFICATION_CACHE_SIZE:
+        _classification_cache.popitem(last=False)
+
+
+def _classification_prompt(question: str, chat_context: str = "") -> str:
+    """Fill QUERY_CLASSIFICATION_PROMPT for one question."""
+    prompt = QUERY_CLASSIFICATION_PROMPT.replace("{question}", question)
+    return prompt.replace("{chat_context}", chat_context)
+
+
+# LLM preambles stripped by QueryClassifier._parse_classification, each at
+# most once and in this order (so "the answer is: this is a ..." loses both)
+_PREAMBLE_RE = re.compile(
+    r"(?:the answer is\s*)?(?:answer is\s*)?(?:classification:\s*)?"
+    r"(?:type:\s*)?(?:the type is\s*)?(?:this is a\s*)?(?:this is\s*)?"
+    r"(?:i would classify this as\s*)?(?:i classify this as\s*)?"
+)
+
+# Query types in a response; longest names first so "filtered-temporal" is
+# never reported as "temporal"
+_VALID_TYPE_RE = re.compile(
+    r"search-by-attachment|filtered-temporal|search-by-sender|classification"
+    r"|conversation|aggregation|temporal|semantic"
+)
+
+# Non-type words an LLM answers with, mapped to the type they stand for
+_ANSWER_WORD_TYPES = {
+    'recent': 'filtered-temporal',
+    'latest': 'filtered-temporal',
+    'newest': 'filtered-temporal',
+    'oldest': 'filtered-temporal',
+    'count': 'aggregation',
+    'hello': 'conversation',
+    'hi': 'conversation',
+    'thanks': 'conversation',
+    'help': 'conversation',
+}
+
+# Keyword groups for QueryClassifier._fallback_classification, matched as
+# substrings of the lowercased question in a single scan each.
+_CONVERSATION_WORDS = _keyword_pattern('hello', 'hi', 'thanks', 'thank you', 'help', 'what can you')
+_COUNTING_WORDS = _keyword_pattern('how many', 'count', 'number of')
+_SPECIFIC_TOPIC_WORDS = _keyword_pattern(
+    'uber', 'amazon', 'linkedin', 'google', 'github', 'facebook',
+    'twitter', 'netflix', 'spotify', 'apple', 'microsoft'
+)
+_TEMPORAL_WORDS = _keyword_pattern('recent', 'latest', 'last', 'newest', 'first', 'oldest')
+_CONTENT_FILTER_WORDS = _keyword_pattern('from', 'about', 'uber', 'amazon', 'linkedin')
+
+
 class QueryClassifier:
     """Classifies user queries to determine the appropriate handler.
 
     Uses LLM-based classification with fallback heuristics.
     """
 
-    VALID_TYPES = {
+    VALID_TYPES = frozenset({
         'conversation', 'aggregation', 'search-by-sender', 'search-by-attachment',
         'classification', 'filtered-temporal', 'temporal', 'semantic'
-    }
+    })
 
     def __init__(self, llm: LLMProcessor):
         """Initialize the classifier.
@@ -46,15 +122,39 @@ class QueryClassifier:
         logger.info("[QUERY CLASSIFIER] Question: '%s'", question)
         logger.info("[QUERY CLASSIFIER] Chat history length: %d", len(chat_history) if chat_history else 0)
         
+        # Nothing to classify; skip the LLM round-trip
+        if not question.strip():
+            logger.info("[QUERY CLASSIFIER] Empty question, defaulting to semantic")
+            return 'semantic'
+
+        # Intent is evident from the start of a query; don't scan or send more
+        question = question[:MAX_QUERY_CHARS]
+
         # Check if this is a classification query using centralized module first
         if is_classification_query(question):
             logger.info("[QUERY CLASSIFIER] ✓ Detected as 'classification' via is_classification_query()")
             return 'classification'
 
+        # The rules provider has no model to ask; go straight to the heuristics
+        # instead of building a prompt only to fail over from it
+        if self.llm.provider == "rules":
+            return self._fallback_classification(question)
+
         # Use LLM to intelligently classify the query type
         # LLM now handles chat history context internally
         logger.info("[QUERY CLASSIFIER] Using LLM to classify query type")
 
+        # Without chat context the prompt depends only on the question, so a
+        # repeated question reuses the earlier LLM answer
+        use_cache = not (chat_history and len(chat_history) >= 2)
+        cache_key = (self.llm.provider, self.llm.model, _cache_normalize(question))
+        if use_cache:
+            cached = _classification_cache.get(cache_key)
+            if cached is not None:
+                _classification_cache.move_to_end(cache_key)
+                logger.info("[QUERY CLASSIFIER] ✓ Cached classification: %s", cached)
+                return cached
+
         try:
             # Build chat context string for the prompt
             chat_context = ""
@@ -68,8 +168,7 @@ class QueryClassifier:
                 chat_context = "Previous conversation context:\n" + "\n".join(context_lines) + "\n"
                 logger.debug("[QUERY CLASSIFIER] Built chat context: %s", chat_context[:200])
 
-            classification_prompt = QUERY_CLASSIFICATION_PROMPT.replace("{question}", question)
-            classification_prompt = classification_prompt.replace("{chat_context}", chat_context)
+            classification_prompt = _classification_prompt(question, chat_context)
             
             logger.info("[QUERY CLASSIFIER] ========== Sending prompt to LLM ==========")
             logger.info("[QUERY CLASSIFIER] Full prompt:\n%s", classification_prompt)
@@ -83,6 +182,8 @@ class QueryClassifier:
 
             logger.info("[QUERY CLASSIFIER] ========== Classification Result ==========")
             logger.info("[QUERY CLASSIFIER] Detected type: %s", detected_type)
+            if use_cache:
+                _cache_classification(cache_key, detected_type)
             return detected_type
 
         except Exception as e:
@@ -93,11 +194,66 @@ class QueryClassifier:
             logger.warning("[QUERY CLASSIFIER] Fallback returned: %s", fallback_type)
             return fallback_type
 
+    def detect_query_types(self, questions: List[str]) -> List[str]:
+        """Detect the query type of several independent questions.
+
+        Gives the same answers as calling detect_query_type on each question
+        without chat history, but repeated questions are classified once and,
+        with a LangChain model, the uncached ones are sent in a single batch.
+
+        Args:
+            questions: User questions
+
+        Returns:
+            One query type per question, in the same order
+        """
+        results: List[Optional[str]] = [None] * len(questions)
+        # cache key -> (question, positions in results) awaiting the model
+        pending: "OrderedDict[Tuple[str, str, str], Tuple[str, List[int]]]" = OrderedDict()
+
+        for i, question in enumerate(questions):
+            question = question[:MAX_QUERY_CHARS]
+            key = (self.llm.provider, self.llm.model, _cache_normalize(question))
+            if (
+                not self.llm.llm
+                or not question.strip()
+                or is_classification_query(question)
+                or key in _classification_cache
+            ):
+                # Answered without a model round-trip (or no batch-capable model)
+                results[i] = self.detect_query_type(question)
+            else:
+                pending.setdefault(key, (question, []))[1].append(i)
+
+        if not pending:
+            return results
+
+        logger.info("[QUERY CLASSIFIER] Batch-classifying %d questions", len(pending))
+        batch = [
+            [SystemMessage(content=_SYSTEM_MESSAGE), HumanMessage(content=_classification_prompt(question))]
+            for question, _ in pending.values()
+        ]
+        try:
+            responses = self.llm.llm.batch(batch)
+        except Exception as e:
+            logger.warning("[QUERY CLASSIFIER] Batch classification failed: %s", e)
+            responses = [None] * len(batch)
+
+        for (key, (question, positions)), response in zip(pending.items(), responses):
+            if response is None:
+                detected_type = self._fallback_classification(question)
+            else:
+                detected_type = self._parse_classification(response.content.strip().lower())
+                _cache_classification(key, detected_type)
+            for i in positions:
+                results[i] = detected_type
+        return results
+
     def _call_llm_simple(self, prompt: str) -> str:
         """Call the LLM for classification."""
         if self.llm.llm:
             messages = [
-                SystemMessage(content="You are a helpful assistant that provides concise answers."),
+                SystemMessage(content=_SYSTEM_MESSAGE),
                 HumanMessage(content=prompt)
             ]
             response = self.llm.llm.invoke(messages)
@@ -123,15 +279,10 @@ class QueryClassifier:
         cleaned = classification.lower().strip()
         
         # Remove common LLM preambles
-        prefixes_to_remove = [
-            'the answer is', 'answer is', 'classification:', 
-            'type:', 'the type is', 'this is a', 'this is',
-            'i would classify this as', 'i classify this as'
-        ]
-        for prefix in prefixes_to_remove:
-            if cleaned.startswith(prefix):
-                cleaned = cleaned[len(prefix):].strip()
-                logger.debug("[QUERY CLASSIFIER] Removed prefix '%s': '%s'", prefix, cleaned)
+        preamble = _PREAMBLE_RE.match(cleaned)
+        if preamble.end():
+            cleaned = cleaned[preamble.end():]
+            logger.debug("[QUERY CLASSIFIER] Removed preamble '%s': '%s'", preamble.group().strip(), cleaned)
         
         # Get first word/phrase (handle hyphenated types)
         words = cleaned.split()
@@ -154,20 +305,18 @@ class QueryClassifier:
         
         # Try to find valid type anywhere in the response
         logger.debug("[QUERY CLASSIFIER] First word not in valid types, searching response...")
-        for valid_type in self.VALID_TYPES:
-            if valid_type in cleaned:
-                logger.debug("[QUERY CLASSIFIER] ✓ Found valid type in response: %s", valid_type)
-                return valid_type
+        found = _VALID_TYPE_RE.search(cleaned)
+        if found:
+            logger.debug("[QUERY CLASSIFIER] ✓ Found valid type in response: %s", found.group())
+            return found.group()
 
         # Map common response words to actual types
         logger.debug("[QUERY CLASSIFIER] Trying fallback mappings...")
-        if first_word in ('recent', 'latest', 'newest', 'oldest'):
-            logger.debug("[QUERY CLASSIFIER] Mapped '%s' → filtered-temporal", first_word)
-            return 'filtered-temporal'
-        elif first_word == 'count':
-            logger.debug("[QUERY CLASSIFIER] Mapped 'count' → aggregation")
-            return 'aggregation'
-        elif 'conversation' in classification or first_word in ('hello', 'hi', 'thanks', 'help'):
+        mapped = _ANSWER_WORD_TYPES.get(first_word)
+        if mapped:
+            logger.debug("[QUERY CLASSIFIER] Mapped '%s' → %s", first_word, mapped)
+            return mapped
+        if 'conversation' in classification:
             return 'conversation'
         elif 'aggregation' in classification or 'statistic' in classification or 'count' in first_word:
             return 'aggregation'
@@ -269,27 +418,21 @@ class QueryClassifier:
         question_lower = question.lower()
 
         # Check for conversational queries
-        if any(word in question_lower for word in ['hello', 'hi', 'thanks', 'thank you', 'help', 'what can you']):
+        if _CONVERSATION_WORDS.search(question_lower):
             return 'conversation'
 
         # Check for counting queries
-        if 'how many' in question_lower or 'count' in question_lower or 'number of' in question_lower:
+        if _COUNTING_WORDS.search(question_lower):
             # Check for specific topic
-            has_specific_topic = any(word in question_lower for word in [
-                'uber', 'amazon', 'linkedin', 'google', 'github', 'facebook',
-                'twitter', 'netflix', 'spotify', 'apple', 'microsoft'
-            ]) or '@' in question_lower
+            has_specific_topic = bool(_SPECIFIC_TOPIC_WORDS.search(question_lower)) or '@' in question_lower
 
             if has_specific_topic or 'total' not in question_lower:
                 return 'aggregation'
 
-        # Check for temporal patterns
-        has_temporal = any(word in question_lower for word in ['recent', 'latest', 'last', 'newest', 'first', 'oldest'])
-        has_content_filter = any(word in question_lower for word in ['from', 'about', 'uber', 'amazon', 'linkedin'])
-
-        if has_temporal and has_content_filter:
-            return 'filtered-temporal'
-        elif has_temporal:
-            return 'temporal'
-        else:
+        # Check for temporal patterns; a content filter only matters for
+        # temporal queries, so skip that scan otherwise
+        if not _TEMPORAL_WORDS.search(question_lower):
             return 'semantic'
+        if _CONTENT_FILTER_WORDS.search(question_lower):
+            return 'filtered-temporal'
+        return 'temporal'
@@ -1,12 +1,17 @@
 """Handler for aggregation/statistical queries."""
 from typing import Dict, Optional
 import logging
+import re
 
 from .base import QueryHandler
 from ..prompt_templates import TOPIC_EXTRACTION_PROMPT
 
 logger = logging.getLogger(__name__)
 
+# Topic mentions in chat history: "198 promo emails", "how many promo mail"
+_COUNTED_TOPIC_RE = re.compile(r'\d+\s+(\w+)\s+(?:email|message)')
+_HOW_MANY_TOPIC_RE = re.compile(r'how many\s+(\w+)\s+(?:mail|email|message)')
+
 
 class AggregationHandler(QueryHandler):
     """Handle aggregation and statistical queries."""
@@ -309,8 +314,6 @@ class AggregationHandler(QueryHandler):
         Returns:
             Topic string or None
         """
-        import re
-
         logger.debug(f"[AGGREGATION] Searching {len(chat_history)} messages for topic")
 
         # Look through recent messages for topic mentions
@@ -342,7 +345,7 @@ class AggregationHandler(QueryHandler):
                             return topic
 
             # Look for "X [topic] emails/messages" patterns (e.g., "198 promo emails")
-            match = re.search(r'\d+\s+(\w+)\s+(?:email|message)', content)
+            match = _COUNTED_TOPIC_RE.search(content)
             if match:
                 potential_topic = match.group(1)
                 if potential_topic not in ['total', 'unread', 'new', 'have', 'got']:
@@ -351,7 +354,7 @@ class AggregationHandler(QueryHandler):
             # Look for user questions about topics (e.g., "how many promo mail")
             if role == "user":
                 # Extract topic from "how many X" questions
-                match = re.search(r'how many\s+(\w+)\s+(?:mail|email|message)', content)
+                match = _HOW_MANY_TOPIC_RE.search(content)
                 if match:
                     potential_topic = match.group(1)
                     if potential_topic not in ['total', 'unread', 'new']:
@@ -1,6 +1,11 @@
 """Handler for semantic (content-based) queries using vector search."""
+from collections import OrderedDict
 from typing import Dict, Optional, List, Tuple
+import hashlib
+import heapq
 import logging
+import os
+import re
 
 from .base import QueryHandler
 from ..prompt_templates import SEMANTIC_SEARCH_PROMPT
@@ -11,6 +16,56 @@ logger = logging.getLogger(__name__)
 # Lazy load cross-encoder for reranking (only when needed)
 _cross_encoder = None
 
+CROSS_ENCODER_MODEL = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+RERANK_MAX_BATCH = 64
+
+# (query digest, document digest) -> cross-encoder score, least recently used first.
+# Scores are deterministic for a given model, so repeated or paginated queries
+# only send unseen documents through the model.
+RERANK_CACHE_SIZE = 10_000
+_rerank_cache: "OrderedDict[Tuple[bytes, bytes], float]" = OrderedDict()
+
+_QUOTED_PHRASE = re.compile(r'"[^"]+"')
+
+
+def _is_literal_lookup(question: str) -> bool:
+    """Whether the query is an exact lookup the lexical ranking already serves.
+
+    Covers a fully quoted phrase, a single token, or a leading field filter
+    such as ``from:alice`` or ``subject:invoice``.
+    """
+    q = question.strip()
+    tokens = q.split()
+    if not tokens:
+        return False
+    return bool(_QUOTED_PHRASE.fullmatch(q)) or len(tokens) == 1 or ':' in tokens[0]
+
+
+def _digest(text: str) -> bytes:
+    """Short stable hash of a query or document for rerank cache keys."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def _load_cross_encoder(CrossEncoder):
+    """Construct the reranker, honouring the optional RERANKER_BACKEND setting.
+
+    RERANKER_BACKEND=onnx (or openvino) runs the model through that runtime
+    instead of PyTorch; RERANKER_ONNX_FILE picks a specific exported file such
+    as an int8-quantized ``onnx/model_qint8_avx512.onnx``. If the alternative
+    backend cannot be loaded we fall back to the default PyTorch model.
+    """
+    backend = os.environ.get("RERANKER_BACKEND", "torch").lower()
+    if backend != "torch":
+        kwargs = {"backend": backend}
+        onnx_file = os.environ.get("RERANKER_ONNX_FILE")
+        if onnx_file:
+            kwargs["model_kwargs"] = {"file_name": onnx_file}
+        try:
+            return CrossEncoder(CROSS_ENCODER_MODEL, **kwargs)
+        except Exception as e:
+            logger.warning(f"[SEMANTIC] Failed to load cross-encoder with {backend} backend: {e}. Using torch.")
+    return CrossEncoder(CROSS_ENCODER_MODEL)
+
 
 def get_cross_encoder():
     """Lazy-load cross-encoder model for reranking."""
@@ -19,7 +74,7 @@ def get_cross_encoder():
         try:
             from sentence_transformers import CrossEncoder
             # Use a lightweight cross-encoder model for reranking
-            _cross_encoder = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
+            _cross_encoder = _load_cross_encoder(CrossEncoder)
             logger.info("[SEMANTIC] Loaded cross-encoder model for reranking")
         except Exception as e:
             logger.warning(f"[SEMANTIC] Failed to load cross-encoder: {e}. Falling back to no reranking.")
@@ -46,9 +101,19 @@ class SemanticHandler(QueryHandler):
         Returns:
             Reranked list of (message, new_score) tuples
         """
+        if len(results) <= 1:
+            # Nothing to reorder; don't load the model for it
+            return results[:top_k]
+
+        if _is_literal_lookup(question):
+            # Exact-match lookups are already ranked well lexically; checked
+            # before get_cross_encoder() so they never pay the model load
+            logger.debug(f"[SEMANTIC] Skipping rerank for literal query: {question!r}")
+            return results[:top_k]
+
         cross_encoder = get_cross_encoder()
-        if cross_encoder is None or len(results) <= 1:
-            # No reranking available or not enough results
+        if cross_encoder is None:
+            # No reranking available
             return results[:top_k]
         
         try:
@@ -58,19 +123,43 @@ class SemanticHandler(QueryHandler):
                 # Create searchable text from message
                 doc_text = f"{message.subject or ''} {message.snippet or ''}"
                 pairs.append([question, doc_text])
+
+            # Serve previously scored pairs from the cache
+            query_key = _digest(question)
+            keys = [(query_key, _digest(doc_text)) for _, doc_text in pairs]
+            scores: List[Optional[float]] = [None] * len(pairs)
+            misses = []
+            for i, key in enumerate(keys):
+                cached = _rerank_cache.get(key)
+                if cached is None:
+                    misses.append(i)
+                else:
+                    _rerank_cache.move_to_end(key)
+                    scores[i] = cached
+
+            if misses:
+                # Score every uncached pair in one forward pass rather than
+                # the default batches of 32
+                predicted = cross_encoder.predict(
+                    [pairs[i] for i in misses],
+                    batch_size=min(len(misses), RERANK_MAX_BATCH),
+                    show_progress_bar=False,
+                )
+                for i, score in zip(misses, predicted):
+                    scores[i] = float(score)
+                    _rerank_cache[keys[i]] = scores[i]
+                while len(_rerank_cache) > RERANK_CACHE_SIZE:
+                    _rerank_cache.popitem(last=False)
+
+            logger.debug(f"[SEMANTIC] Rerank cache hits: {len(pairs) - len(misses)}/{len(pairs)}")
             
-            # Get cross-encoder scores
-            scores = cross_encoder.predict(pairs)
-            
-            # Combine with original results and sort by cross-encoder score
-            reranked = [
-                (message, float(score))
-                for (message, _), score in zip(results, scores)
-            ]
-            reranked.sort(key=lambda x: x[1], reverse=True)
+            # Pick the top_k indices by cross-encoder score and only build
+            # tuples for those
+            order = heapq.nlargest(top_k, range(len(scores)), key=scores.__getitem__)
+            reranked = [(results[i][0], scores[i]) for i in order]
             
             logger.debug(f"[SEMANTIC] Reranked {len(results)} results to top {top_k}")
-            return reranked[:top_k]
+            return reranked
             
         except Exception as e:
             logger.warning(f"[SEMANTIC] Reranking failed: {e}. Using original results.")
@@ -8,6 +8,13 @@ from ..prompt_templates import SEARCH_BY_SENDER_PROMPT, SENDER_EXTRACTION_PROMPT
 
 logger = logging.getLogger(__name__)
 
+# "last N", "show N", "N emails" style limits, tried in order
+_NUMBER_PATTERNS = (
+    re.compile(r'\b(?:last|recent|latest)\s+(\d+)\b', re.IGNORECASE),
+    re.compile(r'\b(?:show|get|find)\s+(?:me\s+)?(\d+)\b', re.IGNORECASE),
+    re.compile(r'\b(\d+)\s+(?:emails?|messages?|mails?)\b', re.IGNORECASE),
+)
+
 
 class SenderHandler(QueryHandler):
     """Handle search queries for emails from a specific sender."""
@@ -130,15 +137,8 @@ class SenderHandler(QueryHandler):
         Returns:
             Extracted number or None if not found
         """
-        # Look for patterns like "last N", "show N", "N emails", "N messages"
-        patterns = [
-            r'\b(?:last|recent|latest)\s+(\d+)\b',
-            r'\b(?:show|get|find)\s+(?:me\s+)?(\d+)\b',
-            r'\b(\d+)\s+(?:emails?|messages?|mails?)\b',
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, question, re.IGNORECASE)
+        for pattern in _NUMBER_PATTERNS:
+            match = pattern.search(question)
             if match:
                 num = int(match.group(1))
                 # Sanity check: limit to reasonable range
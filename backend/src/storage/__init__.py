@@ -9,6 +9,7 @@ from .storage import (
     storage_factory_from_env,
     set_storage_backend,
     get_storage_backend,
+    use_storage,
     init_db,
     save_message,
     get_message_ids,
@@ -49,6 +50,7 @@ __all__ = [
     "storage_factory_from_env",
     "set_storage_backend",
     "get_storage_backend",
+    "use_storage",
     "init_db",
     "save_message",
     "get_message_ids",
@@ -1,7 +1,9 @@
 """In-memory storage backend for testing and development."""
 from __future__ import annotations
 
-from typing import List, Optional
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Callable, List, Optional
 from datetime import datetime, timezone
 import uuid
 
@@ -22,15 +24,133 @@ class InMemoryStorage(StorageBackend):
         # store classification records in memory for tests/dev
         self._classifications: dict[str, list[dict]] = {}
         self._latest_classification: dict[str, str] = {}  # message_id -> classification_id
+        # lowercased from_ -> ids of messages from that address, so sender
+        # searches scan distinct senders instead of every message
+        self._sender_index: dict[str, set[str]] = {}
+        self._saved_sender: dict[str, str] = {}  # message_id -> from_ it was indexed under
+        self._sender_counts: Counter[str] = Counter()  # from_ -> message count
+        # (-internal_date, first-save order, id) kept sorted, i.e. newest first
+        # with ties in insertion order, so searches never re-sort everything
+        self._date_order: list[tuple[int, int, str]] = []
+        self._date_keys: dict[str, tuple[int, int, str]] = {}  # message_id -> its _date_order entry
+        self._save_count = 0
+        # message_id -> lowercased "subject from snippet" for keyword/topic matching
+        self._search_text: dict[str, str] = {}
+        # lowercased topic -> count_by_topic result, dropped on every save
+        self._topic_counts: dict[str, int] = {}
+        self._unread_ids: set[str] = set()
+        self._attachment_ids: set[str] = set()
+        self._saved_day: dict[str, str] = {}  # message_id -> local YYYY-MM-DD it was counted under
+        self._day_counts: Counter[str] = Counter()
 
     def init_db(self) -> None:
+        """No-op: the containers are created in ``__init__``.
+
+        Like the SQL backends, initialization never drops existing data, so
+        callers such as the sync manager can call it on a live store. Use
+        ``reset()`` to empty the store.
+        """
+
+    def reset(self) -> None:
+        """Drop all messages, classifications and metadata in place."""
         self._messages.clear()
         self._meta.clear()
         self._classifications.clear()
         self._latest_classification.clear()
+        self._sender_index.clear()
+        self._saved_sender.clear()
+        self._date_order.clear()
+        self._date_keys.clear()
+        self._save_count = 0
+        self._search_text.clear()
+        self._topic_counts.clear()
+        self._sender_counts.clear()
+        self._unread_ids.clear()
+        self._attachment_ids.clear()
+        self._saved_day.clear()
+        self._day_counts.clear()
 
     def save_message(self, msg: MailMessage) -> None:
+        change = self._index_message(msg)
+        if change is not None:
+            old_key, key = change
+            if old_key is not None:
+                del self._date_order[bisect_left(self._date_order, old_key)]
+            insort(self._date_order, key)
+
+    def save_messages_batch(self, msgs: List[MailMessage]) -> None:
+        """Save multiple messages, re-sorting the date order once for the batch."""
+        stale: set[tuple[int, int, str]] = set()
+        pending: dict[str, tuple[int, int, str]] = {}
+        for msg in msgs:
+            change = self._index_message(msg)
+            if change is None:
+                continue
+            old_key, key = change
+            # An id saved twice in one batch replaces a key not yet in _date_order
+            if old_key is not None and pending.get(msg.id) != old_key:
+                stale.add(old_key)
+            pending[msg.id] = key
+        if stale:
+            self._date_order[:] = [key for key in self._date_order if key not in stale]
+        if pending:
+            self._date_order.extend(pending.values())
+            self._date_order.sort()
+
+    def _index_message(self, msg: MailMessage) -> Optional[tuple]:
+        """Store ``msg`` and update every index except ``_date_order``.
+
+        Returns ``(old_key, new_key)`` when the message's date-order key
+        changed (``old_key`` is None for a new id), otherwise None.
+        """
         self._messages[msg.id] = msg
+        self._search_text[msg.id] = f"{msg.subject or ''} {msg.from_ or ''} {msg.snippet or ''}".lower()
+        self._topic_counts.clear()
+        if msg.labels and 'UNREAD' in msg.labels:
+            self._unread_ids.add(msg.id)
+        else:
+            self._unread_ids.discard(msg.id)
+        if msg.has_attachments:
+            self._attachment_ids.add(msg.id)
+        else:
+            self._attachment_ids.discard(msg.id)
+
+        old_day = self._saved_day.pop(msg.id, None)
+        if old_day is not None:
+            self._day_counts[old_day] -= 1
+            if not self._day_counts[old_day]:
+                del self._day_counts[old_day]
+        if msg.internal_date:
+            day = datetime.fromtimestamp(msg.internal_date / 1000).strftime('%Y-%m-%d')
+            self._saved_day[msg.id] = day
+            self._day_counts[day] += 1
+
+        # Re-saving an id may change its sender, so drop the old entries
+        old_sender = self._saved_sender.pop(msg.id, None)
+        if old_sender is not None:
+            ids = self._sender_index[old_sender.lower()]
+            ids.discard(msg.id)
+            if not ids:
+                del self._sender_index[old_sender.lower()]
+            self._sender_counts[old_sender] -= 1
+            if not self._sender_counts[old_sender]:
+                del self._sender_counts[old_sender]
+        if msg.from_:
+            self._sender_index.setdefault(msg.from_.lower(), set()).add(msg.id)
+            self._saved_sender[msg.id] = msg.from_
+            self._sender_counts[msg.from_] += 1
+
+        old_key = self._date_keys.get(msg.id)
+        if old_key is None:
+            self._save_count += 1
+            seq = self._save_count
+        else:
+            seq = old_key[1]
+        key = (-(msg.internal_date or 0), seq, msg.id)
+        if key == old_key:
+            return None
+        self._date_keys[msg.id] = key
+        return old_key, key
 
     def save_classification_record(self, record) -> None:
         lst = self._classifications.setdefault(record.message_id, [])
@@ -232,77 +352,72 @@ class InMemoryStorage(StorageBackend):
         paginated = filtered[offset:offset + limit]
         return paginated, total
 
+    def _newest_first(self, predicate: Callable[[MailMessage], bool], limit: int) -> List[MailMessage]:
+        """Walk messages newest first, keeping up to ``limit`` that match."""
+        results: List[MailMessage] = []
+        if limit <= 0:
+            return results
+        for _, _, msg_id in self._date_order:
+            msg = self._messages[msg_id]
+            if predicate(msg):
+                results.append(msg)
+                if len(results) >= limit:
+                    break
+        return results
+
     # RAG query support methods - stubs for testing
     def search_by_sender(self, sender: str, limit: int = 100) -> List[MailMessage]:
         """Search for messages from a specific sender."""
         sender_lower = sender.lower()
-        filtered = [
-            msg for msg in self._messages.values()
-            if msg.from_ and sender_lower in msg.from_.lower()
+        matched = [
+            msg_id
+            for address, ids in self._sender_index.items()
+            if sender_lower in address
+            for msg_id in ids
         ]
-        # Sort by internal_date descending (most recent first)
-        filtered.sort(key=lambda m: m.internal_date or 0, reverse=True)
-        return filtered[:limit]
+        # Most recent first; only the hits are ordered, not the whole store
+        matched.sort(key=self._date_keys.__getitem__)
+        return [self._messages[msg_id] for msg_id in matched[:limit]]
 
     def search_by_attachment(self, limit: int = 100) -> List[MailMessage]:
         """Search for messages that have attachments."""
-        filtered = [
-            msg for msg in self._messages.values()
-            if msg.has_attachments
-        ]
-        filtered.sort(key=lambda m: m.internal_date or 0, reverse=True)
-        return filtered[:limit]
+        matched = sorted(self._attachment_ids, key=self._date_keys.__getitem__)
+        return [self._messages[msg_id] for msg_id in matched[:limit]]
 
     def search_by_keywords(self, keywords: List[str], limit: int = 100) -> List[MailMessage]:
         """Search for messages matching any of the keywords."""
         if not keywords:
             return []
 
+        keywords_lower = [kw.lower() for kw in keywords]
+        search_text = self._search_text
+
         def matches_any_keyword(msg: MailMessage) -> bool:
-            text = f"{msg.subject or ''} {msg.from_ or ''} {msg.snippet or ''}".lower()
-            return any(kw.lower() in text for kw in keywords)
+            text = search_text[msg.id]
+            return any(kw in text for kw in keywords_lower)
 
-        filtered = [msg for msg in self._messages.values() if matches_any_keyword(msg)]
-        filtered.sort(key=lambda m: m.internal_date or 0, reverse=True)
-        return filtered[:limit]
+        return self._newest_first(matches_any_keyword, limit)
 
     def count_by_topic(self, topic: str) -> int:
         """Count messages matching a topic."""
         topic_lower = topic.lower()
-        count = 0
-        for msg in self._messages.values():
-            text = f"{msg.subject or ''} {msg.from_ or ''} {msg.snippet or ''}".lower()
-            if topic_lower in text:
-                count += 1
+        count = self._topic_counts.get(topic_lower)
+        if count is None:
+            count = sum(1 for text in self._search_text.values() if topic_lower in text)
+            self._topic_counts[topic_lower] = count
         return count
 
     def get_daily_email_stats(self, days: int = 30) -> List[dict]:
         """Get email count statistics per day."""
-        # Simple implementation - group by date
-        from collections import defaultdict
-        from datetime import datetime
-
-        date_counts = defaultdict(int)
-        for msg in self._messages.values():
-            if msg.internal_date:
-                dt = datetime.fromtimestamp(msg.internal_date / 1000)
-                date_str = dt.strftime('%Y-%m-%d')
-                date_counts[date_str] += 1
-
-        # Sort by date descending and limit
-        sorted_dates = sorted(date_counts.items(), reverse=True)[:days]
+        # Sort the per-day buckets by date descending and limit
+        sorted_dates = sorted(self._day_counts.items(), reverse=True)[:days]
         return [{'date': d, 'count': c} for d, c in sorted_dates]
 
     def get_top_senders(self, limit: int = 10) -> List[dict]:
         """Get top email senders by message count."""
-        from collections import Counter
-
-        sender_counts = Counter(
-            msg.from_ for msg in self._messages.values() if msg.from_
-        )
         return [
             {'from_addr': addr, 'count': count}
-            for addr, count in sender_counts.most_common(limit)
+            for addr, count in self._sender_counts.most_common(limit)
         ]
 
     def get_total_message_count(self) -> int:
@@ -311,8 +426,4 @@ class InMemoryStorage(StorageBackend):
 
     def get_unread_count(self) -> int:
         """Get count of unread messages."""
-        count = 0
-        for msg in self._messages.values():
-            if msg.labels and 'UNREAD' in msg.labels:
-                count += 1
-        return count
+        return len(self._unread_ids)
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import heapq
 import json
 import os
 import uuid
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import List, Optional, Tuple
 import psycopg2
 from psycopg2.extras import RealDictCursor, Json, execute_values
@@ -26,7 +28,95 @@ def get_db_url() -> str:
     return db_url
 
 
+@lru_cache(maxsize=None)
+def _filter_sql(classified: Optional[bool], has_priority: bool, label_count: int) -> Tuple[str, str]:
+    """Build the (page query, count query) pair for list_messages_by_filters.
+
+    Keyed on the shape of the filter set only; values are always bound as
+    parameters, so the cached SQL text is safe to reuse across calls.
+    """
+    where_clauses = []
+
+    # Classification filter
+    if classified is True:
+        where_clauses.append("m.latest_classification_id IS NOT NULL")
+    elif classified is False:
+        where_clauses.append("m.latest_classification_id IS NULL")
+
+    # Priority filter
+    if has_priority:
+        where_clauses.append("LOWER(c.priority) = LOWER(%s)")
+
+    # Labels filter - must have ALL specified labels (AND logic)
+    where_clauses.extend(["c.labels @> %s::jsonb"] * label_count)
+
+    # Determine JOIN type
+    if classified is False or (classified is None and not has_priority and not label_count):
+        # LEFT JOIN for unclassified or when no classification filters
+        join_type = "LEFT JOIN"
+    else:
+        # INNER JOIN when we need classification data
+        join_type = "INNER JOIN"
+
+    where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
+
+    query = f"""
+            SELECT m.*, c.labels as class_labels, c.priority as class_priority, c.summary as class_summary
+            FROM messages m
+            {join_type} classifications c ON m.latest_classification_id = c.id
+            WHERE {where_sql}
+            ORDER BY m.internal_date DESC
+            LIMIT %s OFFSET %s
+        """
+    count_query = f"""
+            SELECT COUNT(*) as count
+            FROM messages m
+            {join_type} classifications c ON m.latest_classification_id = c.id
+            WHERE {where_sql}
+        """
+    return query, count_query
+
+
+def rrf_fuse(
+    vector_results: List[tuple[MailMessage, float]],
+    keyword_results: List[tuple[MailMessage, float]],
+    limit: int,
+    vector_weight: float = 0.5,
+    keyword_weight: float = 0.5,
+    rrf_k: int = 60,
+) -> List[tuple[MailMessage, float]]:
+    """Combine two ranked result lists with weighted Reciprocal Rank Fusion.
+
+    Each message scores ``weight / (rrf_k + rank)`` per list it appears in;
+    contributions are summed and the top ``limit`` messages returned in
+    descending score order (ties keep first-seen order).
+    """
+    # Parallel lists indexed by first-seen position, plus an id -> index map
+    # for merging the second list into the first.
+    index_of: dict[str, int] = {}
+    messages: List[MailMessage] = []
+    scores: List[float] = []
+
+    for results, weight in ((vector_results, vector_weight), (keyword_results, keyword_weight)):
+        for rank, (message, _) in enumerate(results, start=1):
+            idx = index_of.get(message.id)
+            if idx is None:
+                index_of[message.id] = len(scores)
+                messages.append(message)
+                scores.append(weight / (rrf_k + rank))
+            else:
+                scores[idx] += weight / (rrf_k + rank)
+
+    # Partial selection: O(n log limit) rather than sorting every candidate
+    top = heapq.nlargest(limit, range(len(scores)), key=scores.__getitem__)
+    return [(messages[i], scores[i]) for i in top]
+
+
 class PostgresStorage(StorageBackend):
+    # Database URLs whose schema has already been created in this process.
+    # The DDL below is idempotent, so repeating it only costs catalog round-trips.
+    _initialized_urls: set[str] = set()
+
     def __init__(self, db_url: Optional[str] = None):
         self.db_url = db_url or get_db_url()
 
@@ -64,7 +154,15 @@ class PostgresStorage(StorageBackend):
         )
 
     def init_db(self) -> None:
-        """Initialize database tables and indexes."""
+        """Initialize database tables and indexes.
+
+        Runs the schema DDL once per database URL per process; later calls
+        (e.g. from per-test fixtures or repeated storage construction) return
+        immediately.
+        """
+        if self.db_url in PostgresStorage._initialized_urls:
+            return
+
         conn = self.connect()
         cur = conn.cursor()
 
@@ -337,6 +435,7 @@ class PostgresStorage(StorageBackend):
 
         cur.close()
         conn.close()
+        PostgresStorage._initialized_urls.add(self.db_url)
 
     def save_message(self, msg: MailMessage) -> None:
         """Save or update a message in the database."""
@@ -1239,60 +1338,23 @@ class PostgresStorage(StorageBackend):
         conn = self.connect()
         cur = conn.cursor(cursor_factory=RealDictCursor)
 
-        # Build WHERE clauses dynamically
-        where_clauses = []
-        params = []
-
-        # Classification filter
-        if classified is True:
-            where_clauses.append("m.latest_classification_id IS NOT NULL")
-        elif classified is False:
-            where_clauses.append("m.latest_classification_id IS NULL")
+        # The SQL text only depends on which filters are present, not on their
+        # values, so it is built once per filter shape and reused.
+        label_count = len(labels) if labels else 0
+        query, count_query = _filter_sql(classified, bool(priority), label_count)
 
-        # Priority filter
+        params = []
         if priority:
-            where_clauses.append("LOWER(c.priority) = LOWER(%s)")
             params.append(priority)
-
-        # Labels filter - must have ALL specified labels (AND logic)
-        if labels:
-            for label in labels:
-                # Use JSONB containment operator @> for GIN index
-                where_clauses.append("c.labels @> %s::jsonb")
-                params.append(json.dumps([label]))
-
-        # Determine JOIN type
-        if classified is False or (classified is None and not priority and not labels):
-            # LEFT JOIN for unclassified or when no classification filters
-            join_type = "LEFT JOIN"
-        else:
-            # INNER JOIN when we need classification data
-            join_type = "INNER JOIN"
-
-        # Build WHERE clause
-        where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
-
-        # Query with pagination
-        query = f"""
-            SELECT m.*, c.labels as class_labels, c.priority as class_priority, c.summary as class_summary
-            FROM messages m
-            {join_type} classifications c ON m.latest_classification_id = c.id
-            WHERE {where_sql}
-            ORDER BY m.internal_date DESC
-            LIMIT %s OFFSET %s
-        """
+        for label in labels or ():
+            # Use JSONB containment operator @> for GIN index
+            params.append(json.dumps([label]))
         params.extend([limit, offset])
 
         cur.execute(query, params)
         rows = cur.fetchall()
 
         # Get total count with same filters
-        count_query = f"""
-            SELECT COUNT(*) as count
-            FROM messages m
-            {join_type} classifications c ON m.latest_classification_id = c.id
-            WHERE {where_sql}
-        """
         cur.execute(count_query, params[:-2])  # Exclude limit/offset
         total = cur.fetchone()['count']
 
@@ -1730,42 +1792,12 @@ class PostgresStorage(StorageBackend):
         )
 
         # Reciprocal Rank Fusion (RRF)
-        # Formula: score = sum(1 / (k + rank)) for each result list
+        # Formula: score = sum(weight / (k + rank)) for each result list
         # k is a constant (typically 60) to prevent division by very small numbers
-        rrf_k = 60
-        fused_scores = {}
-
-        # Process vector search results
-        for rank, (message, similarity) in enumerate(vector_results, start=1):
-            rrf_score = vector_weight / (rrf_k + rank)
-            fused_scores[message.id] = {
-                'message': message,
-                'score': rrf_score,
-                'vector_rank': rank,
-                'vector_sim': similarity
-            }
-
-        # Process keyword search results
-        for rank, (message, keyword_rank) in enumerate(keyword_results, start=1):
-            rrf_score = keyword_weight / (rrf_k + rank)
-            if message.id in fused_scores:
-                fused_scores[message.id]['score'] += rrf_score
-                fused_scores[message.id]['keyword_rank'] = rank
-                fused_scores[message.id]['keyword_score'] = keyword_rank
-            else:
-                fused_scores[message.id] = {
-                    'message': message,
-                    'score': rrf_score,
-                    'keyword_rank': rank,
-                    'keyword_score': keyword_rank
-                }
-
-        # Sort by fused score and return top-k
-        sorted_results = sorted(
-            fused_scores.values(),
-            key=lambda x: x['score'],
-            reverse=True
-        )[:limit]
-
-        # Return as (message, score) tuples
-        return [(item['message'], item['score']) for item in sorted_results]
+        return rrf_fuse(
+            vector_results,
+            keyword_results,
+            limit=limit,
+            vector_weight=vector_weight,
+            keyword_weight=keyword_weight,
+        )
@@ -3,26 +3,108 @@ from __future__ import annotations
 import json
 import os
 import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
 from ..models.message import MailMessage
 from .storage_interface import StorageBackend
 
+try:
+    # Faster drop-in for json.loads on the read path
+    from orjson import loads as _json_loads
+except ImportError:  # pragma: no cover - optional dependency
+    from json import loads as _json_loads
+
 
 def default_db_path() -> str:
     return os.path.join(os.path.expanduser("~"), ".organize_mail.db")
 
 
+class _TransactionConnection:
+    """Connection handed out inside SQLiteStorage.transaction().
+
+    Storage methods commit and close the connection they get from
+    ``connect()``; within a transaction those calls are deferred to the
+    transaction itself.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def commit(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
 class SQLiteStorage(StorageBackend):
     def __init__(self, db_path: Optional[str] = None):
         self.db_path = db_path or default_db_path()
+        # Per-thread connection of an open transaction(), if any
+        self._tx = threading.local()
+        self._memory_uri: Optional[str] = None
+        self._keepalive: Optional[sqlite3.Connection] = None
+        if self.db_path == ":memory:":
+            # Every method opens (and closes) its own connection, so a plain
+            # ":memory:" database would vanish between calls. Use a named
+            # shared-cache in-memory database instead and hold one connection
+            # open for the lifetime of this instance to keep it alive.
+            self._memory_uri = f"file:organize_mail_{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self._keepalive = sqlite3.connect(self._memory_uri, uri=True)
+
+    def close(self) -> None:
+        """Release the connection keeping a ":memory:" database alive.
+
+        The in-memory database and its data are discarded, so the instance
+        should not be used afterwards. File-backed storage holds no
+        connection between calls, so this is a no-op there.
+        """
+        if self._keepalive is not None:
+            self._keepalive.close()
+            self._keepalive = None
 
     def connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+        tx_conn = getattr(self._tx, "conn", None)
+        if tx_conn is not None:
+            return tx_conn
+        if self._memory_uri:
+            conn = sqlite3.connect(self._memory_uri, uri=True, detect_types=sqlite3.PARSE_DECLTYPES)
+        else:
+            conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
         conn.row_factory = sqlite3.Row
         return conn
 
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Run several storage calls in one SQLite transaction.
+
+        Calls made by this thread inside the block share one connection and
+        are committed together on exit (rolled back if the block raises).
+        Nested blocks join the outer transaction.
+        """
+        if getattr(self._tx, "conn", None) is not None:
+            yield
+            return
+
+        conn = self.connect()
+        self._tx.conn = _TransactionConnection(conn)
+        try:
+            yield
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._tx.conn = None
+            conn.close()
+
     def init_db(self) -> None:
         conn = self.connect()
         cur = conn.cursor()
@@ -173,7 +255,7 @@ class SQLiteStorage(StorageBackend):
     def _deserialize(self, text: Optional[str]):
         if not text:
             return None
-        return json.loads(text)
+        return _json_loads(text)
 
     def save_message(self, msg: MailMessage) -> None:
         conn = self.connect()
@@ -265,23 +347,37 @@ class SQLiteStorage(StorageBackend):
 
         Returns the classification ID.
         """
-        import uuid
-        from datetime import datetime, timezone
+        return self.create_classifications_batch([(message_id, labels, priority, summary, model)])[0]
+
+    def create_classifications_batch(
+        self,
+        classifications: List[Tuple[str, List[str], str, str, Optional[str]]]
+    ) -> List[str]:
+        """Create multiple classification records in a single transaction.
+
+        Both statements go through executemany, so SQLite prepares each once
+        for the whole batch instead of once per row.
+
+        Args:
+            classifications: List of tuples (message_id, labels, priority, summary, model)
+
+        Returns:
+            List of classification IDs created.
+        """
+        if not classifications:
+            return []
 
-        classification_id = str(uuid.uuid4())
         created_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
-        conn = self.connect()
-        cur = conn.cursor()
+        # Generate IDs and prepare batch data
+        classification_ids = []
+        classification_values = []
+        update_values = []
 
-        # Insert classification record
-        cur.execute(
-            """
-            INSERT INTO classifications
-            (id, message_id, labels, priority, summary, model, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
+        for message_id, labels, priority, summary, model in classifications:
+            classification_id = str(uuid.uuid4())
+            classification_ids.append(classification_id)
+            classification_values.append((
                 classification_id,
                 message_id,
                 self._serialize(labels) if labels else None,
@@ -289,23 +385,36 @@ class SQLiteStorage(StorageBackend):
                 summary,
                 model,
                 created_at,
-            ),
+            ))
+            update_values.append((classification_id, message_id))
+
+        conn = self.connect()
+        cur = conn.cursor()
+
+        # Insert classification records
+        cur.executemany(
+            """
+            INSERT INTO classifications
+            (id, message_id, labels, priority, summary, model, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            classification_values,
         )
 
-        # Update message to point to this latest classification
-        cur.execute(
+        # Update messages to point to their latest classification
+        cur.executemany(
             """
             UPDATE messages
             SET latest_classification_id = ?
             WHERE id = ?
             """,
-            (classification_id, message_id),
+            update_values,
         )
 
         conn.commit()
         conn.close()
 
-        return classification_id
+        return classification_ids
 
     def get_latest_classification(self, message_id: str) -> Optional[dict]:
         """Get the most recent classification for a message.
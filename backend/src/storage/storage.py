@@ -14,7 +14,8 @@ that implements the StorageBackend interface (see storage_interface.py).
 """
 from __future__ import annotations
 
-from typing import List, Optional
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
 import os
 
 from ..models.message import MailMessage
@@ -82,6 +83,22 @@ def set_storage_backend(backend: StorageBackend) -> None:
     _backend = backend
 
 
+@contextmanager
+def use_storage(backend: StorageBackend) -> Iterator[StorageBackend]:
+    """Temporarily install `backend` as the global backend.
+
+    The previous backend (possibly still uninitialized) is restored on exit,
+    so callers such as tests don't leak their backend into later code.
+    """
+    global _backend
+    previous = _backend
+    _backend = backend
+    try:
+        yield backend
+    finally:
+        _backend = previous
+
+
 def get_storage_backend() -> StorageBackend:
     """Get the global storage backend, initializing from env if needed."""
     global _backend
@@ -5,32 +5,48 @@ This conftest.py provides fixtures and configuration that apply to ALL tests
 in the test suite. It primarily handles:
 - Setting LLM_PROVIDER=rules environment variable for deterministic testing
 - Ensuring environment is consistent across all test modules
+- Restoring os.environ after each module, so env changes cannot leak
 
 Note: pytest requires the filename 'conftest.py' for automatic fixture discovery.
 """
 import os
 import pytest
 
+# Env vars that would make LLMProcessor pick a real provider
+LLM_PROVIDER_ENV_VARS = ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "OLLAMA_HOST", "ORGANIZE_MAIL_LLM_CMD")
+
+
+@pytest.fixture(autouse=True, scope="module")
+def _env_sandbox():
+    """Snapshot os.environ before each test module and restore it afterwards."""
+    snapshot = os.environ.copy()
+    yield
+    os.environ.clear()
+    os.environ.update(snapshot)
+
+
+@pytest.fixture(scope="module")
+def no_llm_api_env():
+    """Unset real LLM provider settings and select 'rules' for the whole module.
+
+    Opt in with ``pytestmark = pytest.mark.usefixtures("no_llm_api_env")``.
+    The values are restored when the module finishes, so modules that talk
+    to a real provider can run in the same session.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("LLM_PROVIDER", "rules")
+        for key in LLM_PROVIDER_ENV_VARS:
+            mp.delenv(key, raising=False)
+        yield
+
 
 @pytest.fixture(autouse=True)
-def reset_llm_provider_env():
+def reset_llm_provider_env(monkeypatch):
     """
     Ensure LLM_PROVIDER is set to 'rules' for all tests.
     
     This fixture runs automatically before every test (autouse=True) and ensures
     that tests use the deterministic 'rules' provider instead of making actual
-    LLM API calls.
-    
-    The fixture:
-    1. Saves the original LLM_PROVIDER value
-    2. Sets LLM_PROVIDER to 'rules' before each test
-    3. Restores the original value after each test (cleanup)
+    LLM API calls. monkeypatch restores the original value after each test.
     """
-    original = os.environ.get("LLM_PROVIDER")
-    os.environ["LLM_PROVIDER"] = "rules"
-    yield
-    # Restore original value after test
-    if original is None:
-        os.environ.pop("LLM_PROVIDER", None)
-    else:
-        os.environ["LLM_PROVIDER"] = original
+    monkeypatch.setenv("LLM_PROVIDER", "rules")
@@ -1038,17 +1038,15 @@ class TestPostgresStorageFilteringOptimization:
     def test_filter_with_pagination(self, storage):
         """Test filtering with pagination using batch inserts."""
         # Create 20 messages with same priority using batch insert
+        ids = [f"page-test-{i}" for i in range(20)]
         msgs = [
-            MailMessage(id=f"page-test-{i}", subject=f"Test {i}", from_="sender@example.com")
-            for i in range(20)
+            MailMessage(id=msg_id, subject=f"Test {i}", from_="sender@example.com")
+            for i, msg_id in enumerate(ids)
         ]
         storage.save_messages_batch(msgs)
         
         # Create classifications in batch
-        classifications = [
-            (f"page-test-{i}", ["test"], "high", "Test", None)
-            for i in range(20)
-        ]
+        classifications = [(msg_id, ["test"], "high", "Test", None) for msg_id in ids]
         storage.create_classifications_batch(classifications)
         
         # Get first page (5 messages)
@@ -1131,7 +1129,8 @@ class TestPostgresStorageFilteringOptimization:
         ids = {m.id for m in messages}
         assert ids == {"all-params-0", "all-params-1"}
     
-    def test_filter_case_insensitivity(self, storage):
+    @pytest.mark.parametrize("priority_variant", ["high", "HIGH", "High", "HiGh"])
+    def test_filter_case_insensitivity(self, storage, priority_variant):
         """Test that priority filtering is case-insensitive."""
         msg = MailMessage(id="case-test", subject="Test", from_="sender@example.com")
         storage.save_message(msg)
@@ -1143,11 +1142,10 @@ class TestPostgresStorageFilteringOptimization:
         )
         
         # Should match regardless of case
-        for priority_variant in ["high", "HIGH", "High", "HiGh"]:
-            messages, total = storage.list_messages_by_filters(priority=priority_variant, limit=10, offset=0)
-            assert len(messages) == 1
-            assert total == 1
-            assert messages[0].id == "case-test"
+        messages, total = storage.list_messages_by_filters(priority=priority_variant, limit=10, offset=0)
+        assert len(messages) == 1
+        assert total == 1
+        assert messages[0].id == "case-test"
     
     def test_filter_empty_labels_list(self, storage):
         """Test filtering with empty labels list using batch inserts."""
@@ -1170,23 +1168,22 @@ class TestPostgresStorageFilteringOptimization:
     
     def test_filter_performance_large_dataset(self, storage):
         """Test filtering performance with larger dataset using batch inserts."""
-        # Create 30 messages (reduced from 100) using batch insert
+        # Create 30 messages (reduced from 100) using batch insert.
+        # Ids and subjects are formatted once and shared by both batches.
+        ids = [f"perf-{i}" for i in range(30)]
+        subjects = [f"Test {i}" for i in range(30)]
         msgs = [
-            MailMessage(id=f"perf-{i}", subject=f"Test {i}", from_="sender@example.com")
-            for i in range(30)
+            MailMessage(id=msg_id, subject=subject, from_="sender@example.com")
+            for msg_id, subject in zip(ids, subjects)
         ]
         storage.save_messages_batch(msgs)
         
         # Create classifications in batch
+        label_cycle = (["work"], ["personal"], ["work", "urgent"])
+        priority_cycle = ("high", "normal", "low")
         classifications = [
-            (
-                f"perf-{i}",
-                [["work"], ["personal"], ["work", "urgent"]][i % 3],
-                ["high", "normal", "low"][i % 3],
-                f"Test {i}",
-                None
-            )
-            for i in range(30)
+            (msg_id, label_cycle[i % 3], priority_cycle[i % 3], subject, None)
+            for i, (msg_id, subject) in enumerate(zip(ids, subjects))
         ]
         storage.create_classifications_batch(classifications)
         
@@ -14,12 +14,6 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-os.environ["LLM_PROVIDER"] = "rules"
-os.environ.pop("OPENAI_API_KEY", None)
-os.environ.pop("ANTHROPIC_API_KEY", None)
-os.environ.pop("OLLAMA_HOST", None)
-os.environ.pop("ORGANIZE_MAIL_LLM_CMD", None)
-
 import pytest
 from unittest.mock import MagicMock, patch
 from src.storage.storage import get_storage_backend
@@ -27,11 +21,10 @@ from src.storage.memory_storage import InMemoryStorage
 from src.services import EmbeddingService, LLMProcessor, RAGQueryEngine
 from src.services.query_classifier import QueryClassifier
 from src.services.context_builder import ContextBuilder
-from src.services.query_handlers.conversation import ConversationHandler
-from src.services.query_handlers.aggregation import AggregationHandler
-from src.services.query_handlers.temporal import TemporalHandler
 from src.models.message import MailMessage
 
+pytestmark = pytest.mark.usefixtures("no_llm_api_env")
+
 
 def print_banner(text):
     """Print a formatted banner."""
@@ -370,16 +363,6 @@ class TestQueryClassifierIntegrationWithEngine:
         assert hasattr(memory_rag_engine, 'classifier')
         assert isinstance(memory_rag_engine.classifier, QueryClassifier)
 
-    def test_detect_query_type_delegates(self, memory_rag_engine):
-        """_detect_query_type should delegate to classifier."""
-        query = "hello"
-        
-        # Call through both paths
-        via_engine = memory_rag_engine._detect_query_type(query)
-        via_classifier = memory_rag_engine.classifier.detect_query_type(query)
-        
-        assert via_engine == via_classifier
-
     def test_all_handlers_initialized(self, memory_rag_engine):
         """All handler types should be initialized."""
         expected_handlers = {
@@ -17,9 +17,7 @@ def test_complete_chat_history():
     print("🧪 Final Chat History Verification")
     print("=" * 50)
     
-    # Set up environment for testing
-    os.environ['LLM_PROVIDER'] = 'rules'
-    
+    # LLM_PROVIDER=rules comes from tests/conftest.py (or __main__ below)
     try:
         # Create components
         storage = InMemoryStorage()
@@ -162,5 +160,6 @@ def test_complete_chat_history():
         return False
 
 if __name__ == "__main__":
+    os.environ['LLM_PROVIDER'] = 'rules'
     success = test_complete_chat_history()
     sys.exit(0 if success else 1)
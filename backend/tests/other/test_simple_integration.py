@@ -17,9 +17,7 @@ def test_basic_functionality():
     print("🧪 Testing Chat History Functionality")
     print("=" * 50)
     
-    # Set up environment for testing
-    os.environ['LLM_PROVIDER'] = 'rules'
-    
+    # LLM_PROVIDER=rules comes from tests/conftest.py (or __main__ below)
     try:
         # Create components
         storage = InMemoryStorage()
@@ -126,5 +124,6 @@ def test_basic_functionality():
         return False
 
 if __name__ == "__main__":
+    os.environ['LLM_PROVIDER'] = 'rules'
     success = test_basic_functionality()
     sys.exit(0 if success else 1)
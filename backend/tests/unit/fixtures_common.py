@@ -1,245 +1,349 @@
 """Shared unit-test fixtures for RAG and handler tests.
 
 This previously lived in `tests/unit/conftest.py` but is now moved here
-for a clearer filename. The existing `tests/unit/conftest.py` will import
-from this module to keep pytest behavior unchanged.
+for a clearer filename. `tests/unit/conftest.py` re-exports these fixtures
+so pytest discovers a single definition of each one.
 """
-import os
-import pytest
-from unittest.mock import Mock, MagicMock, patch
-from typing import List
+from unittest.mock import patch, MagicMock
 
-# Set rules provider for deterministic tests BEFORE any imports
-os.environ["LLM_PROVIDER"] = "rules"
-# Clear any API keys that might cause auto-detection to pick another provider
-os.environ.pop("OPENAI_API_KEY", None)
-os.environ.pop("ANTHROPIC_API_KEY", None)
-os.environ.pop("OLLAMA_HOST", None)
-os.environ.pop("ORGANIZE_MAIL_LLM_CMD", None)
+import pytest
 
-from src.models.message import MailMessage
 from src.storage.memory_storage import InMemoryStorage
 from src.services.llm_processor import LLMProcessor
-from src.services.context_builder import ContextBuilder
 from src.services.query_classifier import QueryClassifier
-from src.services.embedding_service import EmbeddingService
+from src.services.context_builder import ContextBuilder
+from src.models.message import MailMessage
 
 
-@pytest.fixture
-def sample_emails() -> InMemoryStorage:
-    """Pre-populated InMemoryStorage with diverse test emails."""
-    storage = InMemoryStorage()
-    storage.init_db()
+def make_email(
+    id: str,
+    subject: str,
+    sender: str,
+    snippet: str,
+    date_ts: int,
+    labels: list[str] | None = None,
+    has_attachments: bool = False,
+) -> MailMessage:
+    """Helper function to create email MailMessage objects for testing."""
+    return MailMessage(
+        id=id,
+        thread_id=f"thread_{id}",
+        subject=subject,
+        from_=sender,
+        snippet=snippet,
+        internal_date=date_ts * 1000,  # internal_date is in milliseconds
+        labels=labels or [],
+        has_attachments=has_attachments,
+    )
 
-    # Base timestamp: Dec 1, 2025, 10:00 AM UTC in milliseconds
-    base_ts = 1733050800000
-    day_ms = 86400000  # milliseconds in a day
 
+def make_sample_storage() -> InMemoryStorage:
+    """Build the 10-email InMemoryStorage behind the ``sample_emails`` fixture.
+
+    Exposed as a plain function so tests can build their own copy at a
+    wider fixture scope.
+    """
+    storage = InMemoryStorage()
+    storage.init_db()
+    
     emails = [
-        # Uber Eats emails
-        MailMessage(
-            id="uber1",
-            thread_id="t1",
-            from_="noreply@uber.com",
-            to="user@example.com",
-            subject="Your Uber Eats order is on the way",
-            snippet="Your order from McDonald's is being prepared",
-            labels=["INBOX", "UNREAD"],
-            internal_date=base_ts,
-            has_attachments=False,
+        make_email(
+            "1",
+            "Your Uber receipt",
+            "noreply@uber.com",
+            "Thanks for riding with Uber. Your trip cost $25.",
+            1699000000,
+            ["receipts"],
+            False,
         ),
-        MailMessage(
-            id="uber2",
-            thread_id="t2",
-            from_="receipts@uber.com",
-            to="user@example.com",
-            subject="Your Uber Eats receipt",
-            snippet="Total: $25.99. Thank you for your order.",
-            labels=["INBOX"],
-            internal_date=base_ts - day_ms,
-            has_attachments=True,
+        make_email(
+            "2",
+            "Amazon order shipped",
+            "orders@amazon.com",
+            "Your Amazon order has shipped. Track your package.",
+            1699100000,
+            ["shopping"],
+            True,
         ),
-        # Amazon emails
-        MailMessage(
-            id="amazon1",
-            thread_id="t3",
-            from_="shipment-tracking@amazon.com",
-            to="user@example.com",
-            subject="Your Amazon order has shipped",
-            snippet="Your package will arrive by Thursday",
-            labels=["INBOX"],
-            internal_date=base_ts - 2 * day_ms,
-            has_attachments=False,
+        make_email(
+            "3",
+            "GitHub notification",
+            "notifications@github.com",
+            "New pull request in your repository.",
+            1699200000,
+            ["work"],
+            False,
         ),
-        MailMessage(
-            id="amazon2",
-            thread_id="t4",
-            from_="no-reply@amazon.com",
-            to="user@example.com",
-            subject="Your Amazon.com order confirmation",
-            snippet="Order #123-456-789 confirmed. Invoice attached.",
-            labels=["INBOX"],
-            internal_date=base_ts - 3 * day_ms,
-            has_attachments=True,
+        make_email(
+            "4",
+            "Uber Eats delivery",
+            "noreply@uber.com",
+            "Your McDonald's order is on the way! Delivery in 30 minutes.",
+            1699300000,
+            ["food", "UNREAD"],
+            False,
         ),
-        # LinkedIn emails
-        MailMessage(
-            id="linkedin1",
-            thread_id="t5",
-            from_="notifications@linkedin.com",
-            to="user@example.com",
-            subject="John Doe accepted your connection request",
-            snippet="You and John Doe are now connected",
-            labels=["INBOX", "UNREAD"],
-            internal_date=base_ts - 4 * day_ms,
-            has_attachments=False,
+        make_email(
+            "5",
+            "LinkedIn connection",
+            "linkedin@linkedin.com",
+            "You have a new connection request.",
+            1699400000,
+            ["social", "UNREAD"],
+            True,
         ),
-        # GitHub emails
-        MailMessage(
-            id="github1",
-            thread_id="t6",
-            from_="notifications@github.com",
-            to="user@example.com",
-            subject="[repo/project] Pull request #42: Fix bug",
-            snippet="@contributor opened a new pull request",
-            labels=["INBOX"],
-            internal_date=base_ts - 5 * day_ms,
-            has_attachments=False,
+        make_email(
+            "6",
+            "Amazon Prime Day deals",
+            "deals@amazon.com",
+            "Don't miss these exclusive Prime Day deals!",
+            1699500000,
+            ["promotions"],
+            True,
         ),
-        # Work email with attachment
-        MailMessage(
-            id="work1",
-            thread_id="t7",
-            from_="boss@company.com",
-            to="user@example.com",
-            subject="Q4 Budget Review - Action Required",
-            snippet="Please review the attached budget spreadsheet",
-            labels=["INBOX", "UNREAD"],
-            internal_date=base_ts - 6 * day_ms,
-            has_attachments=True,
+        make_email(
+            "7",
+            "Work project update",
+            "manager@company.com",
+            "Please review the quarterly report by Friday.",
+            1699600000,
+            ["work", "UNREAD"],
+            False,
         ),
-        # Personal email
-        MailMessage(
-            id="personal1",
-            thread_id="t8",
-            from_="friend@gmail.com",
-            to="user@example.com",
-            subject="Dinner plans for Saturday?",
-            snippet="Hey! Are you free for dinner this weekend?",
-            labels=["INBOX"],
-            internal_date=base_ts - 7 * day_ms,
-            has_attachments=False,
+        make_email(
+            "8",
+            "Newsletter weekly digest",
+            "newsletter@example.com",
+            "This week's top stories and updates.",
+            1699700000,
+            ["newsletter"],
+            False,
         ),
-        # Newsletter
-        MailMessage(
-            id="newsletter1",
-            thread_id="t9",
-            from_="newsletter@techcrunch.com",
-            to="user@example.com",
-            subject="TechCrunch Daily: AI News Roundup",
-            snippet="Today's top stories in artificial intelligence",
-            labels=["INBOX"],
-            internal_date=base_ts - 8 * day_ms,
-            has_attachments=False,
+        make_email(
+            "9",
+            "Bank statement",
+            "noreply@bank.com",
+            "Your monthly statement is ready to view.",
+            1699800000,
+            ["finance"],
+            True,
         ),
-        # Invoice email
-        MailMessage(
-            id="invoice1",
-            thread_id="t10",
-            from_="billing@spotify.com",
-            to="user@example.com",
-            subject="Your Spotify Premium invoice",
-            snippet="Your monthly subscription has been renewed. Invoice attached.",
-            labels=["INBOX"],
-            internal_date=base_ts - 9 * day_ms,
-            has_attachments=True,
+        make_email(
+            "10",
+            "Meeting reminder",
+            "calendar@company.com",
+            "Reminder: Team meeting tomorrow at 10 AM.",
+            1699900000,
+            ["work"],
+            False,
         ),
     ]
+    
+    storage.save_messages_batch(emails)
+    
+    return storage
 
-    for email in emails:
-        storage.save_message(email)
 
-    storage.create_classification(
-        message_id="uber1",
-        labels=["food-delivery", "receipts"],
-        priority="low",
-        summary="Uber Eats order notification",
-        model="rules"
-    )
-    storage.create_classification(
-        message_id="uber2",
-        labels=["food-delivery", "receipts", "finance"],
-        priority="low",
-        summary="Uber Eats receipt",
-        model="rules"
-    )
-    storage.create_classification(
-        message_id="amazon1",
-        labels=["shopping", "shipping"],
-        priority="medium",
-        summary="Amazon shipment notification",
-        model="rules"
-    )
-    storage.create_classification(
-        message_id="work1",
-        labels=["work", "finance", "action-required"],
-        priority="high",
-        summary="Budget review request from boss",
-        model="rules"
-    )
-    storage.create_classification(
-        message_id="linkedin1",
-        labels=["social", "networking"],
-        priority="low",
-        summary="LinkedIn connection accepted",
-        model="rules"
+@pytest.fixture(scope="session")
+def sample_emails():
+    """
+    Create an InMemoryStorage with sample email data for testing.
+    
+    Returns a storage instance populated with 10 test emails from various
+    senders (Uber, Amazon, GitHub, LinkedIn, etc.) with different attributes
+    for testing search, filtering, and aggregation functionality.
+    
+    Includes:
+    - 2 Uber emails (one ride, one Uber Eats with McDonald's)
+    - 2 Amazon emails (both with attachments)
+    - 1 GitHub notification
+    - 1 LinkedIn connection request (unread)
+    - 1 Work email (unread)
+    - 3 emails with UNREAD labels
+
+    Built once per session and shared read-only: tests that save, classify
+    or otherwise change messages should use ``make_sample_storage()`` or
+    ``empty_storage`` instead.
+    """
+    return make_sample_storage()
+
+
+@pytest.fixture(scope="module")
+def sample_message() -> MailMessage:
+    """A single fully-populated message, built once per test module.
+
+    Shared read-only: tests that need different field values should build
+    their own MailMessage.
+    """
+    return MailMessage(
+        id="test1",
+        from_="sender@example.com",
+        subject="Test Subject",
+        snippet="Email content",
+        internal_date=1733050800000,
     )
 
-    return storage
+
+@pytest.fixture(scope="module")
+def bulk_messages() -> list[MailMessage]:
+    """100 distinct messages for volume tests, built once per test module."""
+    return [
+        MailMessage(
+            id=f"test{i}",
+            from_=f"sender{i}@example.com",
+            subject=f"Subject {i}",
+            snippet=f"Content {i}",
+            internal_date=1733050800000,
+        )
+        for i in range(100)
+    ]
 
 
 @pytest.fixture
-def llm_processor() -> LLMProcessor:
-    """LLM processor configured with rules provider for deterministic tests.
+def empty_storage():
+    """Create an empty InMemoryStorage instance for testing edge cases."""
+    storage = InMemoryStorage()
+    storage.init_db()
+    return storage
 
-    Patches _is_ollama_running to avoid network timeout when Ollama is not available.
+
+@pytest.fixture(scope="session")
+def llm_processor():
+    """
+    Create an LLMProcessor configured with the 'rules' provider.
+    
+    The rules provider uses keyword-based classification without making
+    actual LLM API calls, making tests deterministic and fast. Built once
+    per session; tests must not modify it.
     """
-    with patch.object(LLMProcessor, '_is_ollama_running', return_value=False):
-        return LLMProcessor()
+    # Ensure LLM_PROVIDER is set to rules
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("LLM_PROVIDER", "rules")
+        with patch.object(LLMProcessor, '_is_ollama_running', return_value=False):
+            return LLMProcessor()
+
+
+@pytest.fixture(scope="session")
+def query_classifier(llm_processor):
+    """Create a QueryClassifier instance using the rules-based LLM processor (shared, read-only)."""
+    return QueryClassifier(llm_processor)
 
 
 @pytest.fixture
-def context_builder() -> ContextBuilder:
-    """Context builder instance."""
+def context_builder():
+    """Create a ContextBuilder instance for testing context formatting."""
     return ContextBuilder()
 
 
 @pytest.fixture
-def query_classifier(llm_processor) -> QueryClassifier:
-    """Query classifier with rules-based LLM."""
-    return QueryClassifier(llm_processor)
+def mock_embedding_service():
+    """Create a mock embedding service that returns empty results."""
+    mock = MagicMock()
+    mock.search_similar.return_value = []
+    return mock
 
 
 @pytest.fixture
-def mock_embedding_service() -> Mock:
-    """Mock EmbeddingService that returns deterministic embeddings.
+def handler_dependencies(llm_processor, context_builder, mock_embedding_service):
+    """
+    Bundle all common handler dependencies into a single fixture.
+    
+    Returns a dictionary with:
+    - storage: a fresh InMemoryStorage with the sample emails
+    - llm: LLMProcessor with rules provider
+    - context_builder: ContextBuilder instance
+    - embedder: Mock embedding service
 
-    Returns a 384-dimensional vector (same as all-MiniLM-L6-v2).
-    The mock tracks calls and can be configured for specific test scenarios.
+    Function-scoped on purpose: tests add messages to the storage and
+    replace methods on it and on the embedder, so the storage is built per
+    test with make_sample_storage() rather than taken from the shared,
+    read-only ``sample_emails``. Only the LLM processor, the one costly
+    piece, is shared (session scope).
     """
-    mock_embedder = Mock(spec=EmbeddingService)
+    return {
+        "storage": make_sample_storage(),
+        "llm": llm_processor,
+        "context_builder": context_builder,
+        "embedder": mock_embedding_service,
+    }
 
-    default_embedding = [0.1] * 384
-    mock_embedder.embed_text.return_value = default_embedding
-    mock_embedder.embed_batch.return_value = [default_embedding]
-    mock_embedder.model_name = "mock-model"
-    mock_embedder.embedding_dim = 384
 
-    return mock_embedder
+@pytest.fixture
+def sample_emails_with_payloads():
+    """Sample emails enhanced with full body payloads for testing get_body_text()."""
+    from tests.unit.fixtures_payloads import (
+        make_simple_text_payload,
+        make_multipart_payload,
+        make_long_email_payload
+    )
+    
+    storage = InMemoryStorage()
+    storage.init_db()
+    
+    # Email 1: Simple text payload
+    body1 = "This is the full body content for email 1. " * 10
+    email1 = MailMessage(
+        id="email1",
+        thread_id="t1",
+        from_="sender1@example.com",
+        subject="Email with simple text",
+        snippet="This is the full body...",
+        internal_date=1733050800000,
+        payload=make_simple_text_payload(body1),
+        labels=["INBOX"]
+    )
+    
+    # Email 2: Multipart payload (plain + HTML)
+    body2_plain = "This is the plain text version of email 2. " * 10
+    body2_html = "<p>This is the <b>HTML</b> version of email 2.</p>" * 10
+    email2 = MailMessage(
+        id="email2",
+        thread_id="t2",
+        from_="sender2@example.com",
+        subject="Email with multipart",
+        snippet="This is the plain text...",
+        internal_date=1733050800000 - 86400000,
+        payload=make_multipart_payload(body2_plain, body2_html),
+        labels=["INBOX"]
+    )
+    
+    # Email 3: Long email payload
+    email3 = MailMessage(
+        id="email3",
+        thread_id="t3",
+        from_="sender3@example.com",
+        subject="Very long email",
+        snippet="This is paragraph 1...",
+        internal_date=1733050800000 - 2 * 86400000,
+        payload=make_long_email_payload(50),
+        labels=["INBOX"]
+    )
+    
+    storage.save_message(email1)
+    storage.save_message(email2)
+    storage.save_message(email3)
+    
+    return storage
 
 
 @pytest.fixture
-def handler_dependencies(sample_emails, llm_processor, context_builder, mock_embedding_service):
-    """Common dependencies for all query handlers.
+def mock_cross_encoder():
+    """Mock sentence-transformers CrossEncoder for reranking tests."""
+    mock = MagicMock()
+    # Return descending scores to simulate reranking
+    mock.predict = MagicMock(return_value=[0.9, 0.7, 0.5, 0.3, 0.1])
+    return mock
+
+
+@pytest.fixture(scope="session")
+def api_client():
+    """FastAPI TestClient shared by every API test in the session.
+
+    The client is created without entering its context manager so the app's
+    startup hook (which initializes the env-configured storage backend) does
+    not run; tests patch the storage layer themselves.
+    """
+    from fastapi.testclient import TestClient
+    from src.api import app
 
-The file was created successfully.
\ No newline at end of file
+    return TestClient(app)
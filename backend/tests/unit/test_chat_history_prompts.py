@@ -35,7 +35,7 @@ class TestChatHistoryPrompts:
         # Mock LLM response for extraction - use _call_llm_simple on the handler
         with patch.object(self.handler, '_call_llm_simple', return_value="promotional"):
             # Mock _format_chat_history method
-            self.handler._format_chat_history = Mock(return_value="User: how many promotional emails do I have\nAssistant: You have 97 promotional emails")
+            self.handler._format_chat_history = lambda history: "User: how many promotional emails do I have\nAssistant: You have 97 promotional emails"
             
             # Test extraction
             result = self.handler._extract_label_from_history(chat_history)
@@ -51,7 +51,7 @@ class TestChatHistoryPrompts:
         
         # Mock LLM response - use _call_llm_simple on the handler
         with patch.object(self.handler, '_call_llm_simple', return_value="job"):
-            self.handler._format_chat_history = Mock(return_value="User: show me job applications\nAssistant: I found 15 job applications")
+            self.handler._format_chat_history = lambda history: "User: show me job applications\nAssistant: I found 15 job applications"
             
             result = self.handler._extract_label_from_history(chat_history)
             
@@ -68,7 +68,7 @@ class TestChatHistoryPrompts:
         ]
         
         with patch.object(self.handler, '_call_llm_simple', return_value="receipt"):
-            self.handler._format_chat_history = Mock(return_value="User: how many receipts?\nAssistant: 5 receipts\nUser: count spam emails\nAssistant: 23 spam emails")
+            self.handler._format_chat_history = lambda history: "User: how many receipts?\nAssistant: 5 receipts\nUser: count spam emails\nAssistant: 23 spam emails"
             
             result = self.handler._extract_label_from_history(chat_history)
             
@@ -83,7 +83,7 @@ class TestChatHistoryPrompts:
         ]
         
         with patch.object(self.handler, '_call_llm_simple', return_value="none"):
-            self.handler._format_chat_history = Mock(return_value="User: hello\nAssistant: Hi! How can I help you?\nUser: from those, what do you mean?")
+            self.handler._format_chat_history = lambda history: "User: hello\nAssistant: Hi! How can I help you?\nUser: from those, what do you mean?"
             
             result = self.handler._extract_label_from_history(chat_history)
             
@@ -140,7 +140,7 @@ class TestChatHistoryPrompts:
         ]
         
         with patch.object(self.handler, '_call_llm_simple', return_value="promotional"):
-            self.handler._format_chat_history = Mock(return_value="Formatted history")
+            self.handler._format_chat_history = lambda history: "Formatted history"
             
             result = self.handler._extract_label_from_history(chat_history)
             
@@ -2,16 +2,14 @@
 
 Tests the context building logic for formatting email data into LLM context strings.
 """
-import os
 import pytest
 from datetime import datetime
 
-os.environ["LLM_PROVIDER"] = "rules"
-os.environ.pop("OLLAMA_HOST", None)
-
 from src.services.context_builder import ContextBuilder
 from src.models.message import MailMessage
 
+pytestmark = pytest.mark.usefixtures("no_llm_api_env")
+
 
 class TestContextBuilderInit:
     """Tests for ContextBuilder initialization."""
@@ -111,17 +109,9 @@ class TestBuildContext:
 class TestBuildContextFromMessages:
     """Tests for build_context_from_messages method without similarity scores."""
 
-    def test_build_context_from_messages_single(self, context_builder):
+    def test_build_context_from_messages_single(self, context_builder, sample_message):
         """Should build context from a single message."""
-        email = MailMessage(
-            id="test1",
-            from_="sender@example.com",
-            subject="Test Subject",
-            snippet="Email content here.",
-            internal_date=1733050800000,
-        )
-        
-        context = context_builder.build_context_from_messages([email])
+        context = context_builder.build_context_from_messages([sample_message])
         
         assert "Email 1" in context
         assert "Relevance" not in context  # No similarity score
@@ -151,17 +141,9 @@ class TestBuildContextFromMessages:
 class TestFormatEmailWithScore:
     """Tests for _format_email_with_score method."""
 
-    def test_format_with_all_fields(self, context_builder):
+    def test_format_with_all_fields(self, context_builder, sample_message):
         """Should format email with all fields present."""
-        email = MailMessage(
-            id="test1",
-            from_="sender@example.com",
-            subject="Test Subject",
-            snippet="Email content",
-            internal_date=1733050800000,
-        )
-        
-        formatted = context_builder._format_email_with_score(1, email, 0.92)
+        formatted = context_builder._format_email_with_score(1, sample_message, 0.92)
         
         assert "Email 1 (Relevance: 0.92)" in formatted
         assert "Subject: Test Subject" in formatted
@@ -228,17 +210,9 @@ class TestFormatEmailWithScore:
 class TestFormatEmail:
     """Tests for _format_email method without score."""
 
-    def test_format_email_basic(self, context_builder):
+    def test_format_email_basic(self, context_builder, sample_message):
         """Should format email without score."""
-        email = MailMessage(
-            id="test1",
-            from_="sender@example.com",
-            subject="Test Subject",
-            snippet="Email content",
-            internal_date=1733050800000,
-        )
-        
-        formatted = context_builder._format_email(1, email)
+        formatted = context_builder._format_email(1, sample_message)
         
         assert "Email 1:" in formatted
         assert "Relevance" not in formatted
@@ -378,20 +352,9 @@ class TestContextBuilderEdgeCases:
         assert "Subject: No subject" in formatted or "Subject:" in formatted
         assert "From: Unknown" in formatted or "From:" in formatted
 
-    def test_large_number_of_emails(self, context_builder):
+    def test_large_number_of_emails(self, context_builder, bulk_messages):
         """Should handle many emails without error."""
-        emails = [
-            MailMessage(
-                id=f"test{i}",
-                from_=f"sender{i}@example.com",
-                subject=f"Subject {i}",
-                snippet=f"Content {i}",
-                internal_date=1733050800000,
-            )
-            for i in range(100)
-        ]
-        
-        context = context_builder.build_context_from_messages(emails)
+        context = context_builder.build_context_from_messages(bulk_messages)
         
         # Should include all emails
         assert "Email 1:" in context
@@ -1,267 +1,427 @@
-"""Tests for hybrid search and cross-encoder reranking improvements."""
-import pytest
-from unittest.mock import Mock, patch, MagicMock
-from src.storage.postgres_storage import PostgresStorage
-from src.models.message import MailMessage
-from src.services.query_handlers.semantic import SemanticHandler, get_cross_encoder
-
-
-class TestHybridSearch:
-    """Test hybrid search (vector + keyword) with RRF fusion."""
-    
-    def test_rrf_fusion_logic(self):
-        """Test that RRF correctly combines and ranks results."""
-        # Create mock messages
-        msg1 = MailMessage(id="1", subject="Invoice from Acme Corp", snippet="Payment due")
-        msg2 = MailMessage(id="2", subject="Receipt confirmation", snippet="Thank you for your purchase")
-        msg3 = MailMessage(id="3", subject="Acme Newsletter", snippet="Latest updates")
-        
-        # Simulate vector results (msg1 and msg2 rank high)
-        vector_results = [(msg1, 0.9), (msg2, 0.85), (msg3, 0.6)]
-        
-        # Simulate keyword results (msg1 and msg3 rank high due to "Acme")
-        keyword_results = [(msg1, 5.2), (msg3, 4.8), (msg2, 2.1)]
-        
-        # Mock storage methods
-        storage = Mock(spec=PostgresStorage)
-        storage.similarity_search = Mock(return_value=vector_results)
-        storage.keyword_search = Mock(return_value=keyword_results)
-        storage.hybrid_search = storage.hybrid_search  # Use real implementation
-        
-        # Manually test RRF logic
-        rrf_k = 60
-        vector_weight = 0.6
-        keyword_weight = 0.4
-        
-        fused_scores = {}
-        
-        # Process vector results
-        for rank, (message, similarity) in enumerate(vector_results, start=1):
-            rrf_score = vector_weight / (rrf_k + rank)
-            fused_scores[message.id] = {'message': message, 'score': rrf_score}
-        
-        # Process keyword results
-        for rank, (message, keyword_rank) in enumerate(keyword_results, start=1):
-            rrf_score = keyword_weight / (rrf_k + rank)
-            if message.id in fused_scores:
-                fused_scores[message.id]['score'] += rrf_score
-            else:
-                fused_scores[message.id] = {'message': message, 'score': rrf_score}
-        
-        # Sort by fused score
-        sorted_results = sorted(fused_scores.values(), key=lambda x: x['score'], reverse=True)
-        
-        # msg1 should rank highest (appears in both top positions)
-        assert sorted_results[0]['message'].id == "1"
-        # msg1 score should be sum of both RRF contributions
-        assert sorted_results[0]['score'] > 0.015  # Approximately 0.6/61 + 0.4/61
-
-
-class TestCrossEncoderReranking:
-    """Test cross-encoder reranking functionality."""
-    
-    def test_cross_encoder_lazy_loading(self):
-        """Test that cross-encoder is loaded lazily and cached."""
-        # Reset global state
-        import src.services.query_handlers.semantic as semantic_module
-        semantic_module._cross_encoder = None
-        
-        with patch('sentence_transformers.CrossEncoder') as mock_ce:
-            mock_model = Mock()
-            mock_ce.return_value = mock_model
-            
-            # First call should load the model
-            encoder1 = get_cross_encoder()
-            assert encoder1 == mock_model
-            mock_ce.assert_called_once()
-            
-            # Second call should return cached model
-            encoder2 = get_cross_encoder()
-            assert encoder2 == mock_model
-            mock_ce.assert_called_once()  # Still only called once
-    
-    def test_reranking_improves_order(self):
-        """Test that reranking reorders results by relevance."""
-        handler = SemanticHandler(
-            storage=Mock(),
-            llm=Mock(),
-            embedder=Mock(),
-            context_builder=Mock()
-        )
-        
-        # Create mock messages
-        msg1 = MailMessage(id="1", subject="Unrelated topic", snippet="Random content")
-        msg2 = MailMessage(id="2", subject="Python tutorial", snippet="Learn Python programming")
-        msg3 = MailMessage(id="3", subject="Python job", snippet="Senior Python developer position")
-        
-        results = [(msg1, 0.75), (msg2, 0.70), (msg3, 0.68)]
-        question = "Python programming jobs"
-        
-        # Mock cross-encoder to prefer msg3, then msg2 (job-related, then tutorial)
-        mock_encoder = Mock()
-        mock_encoder.predict = Mock(return_value=[0.2, 0.6, 0.9])  # Higher score for msg3
-        
-        with patch('src.services.query_handlers.semantic.get_cross_encoder', return_value=mock_encoder):
-            reranked = handler._rerank_results(question, results, top_k=3)
-            
-            # msg3 should now be first (highest cross-encoder score)
-            assert reranked[0][0].id == "3"
-            assert reranked[1][0].id == "2"
-            assert reranked[2][0].id == "1"
-    
-    def test_reranking_handles_failure_gracefully(self):
-        """Test that reranking failures fallback to original order."""
-        handler = SemanticHandler(
-            storage=Mock(),
-            llm=Mock(),
-            embedder=Mock(),
-            context_builder=Mock()
-        )
-        
-        msg1 = MailMessage(id="1", subject="Test", snippet="Content")
-        results = [(msg1, 0.8)]
-        
-        # Mock cross-encoder to raise an exception
-        mock_encoder = Mock()
-        mock_encoder.predict = Mock(side_effect=RuntimeError("Model error"))
-        
-        with patch('src.services.query_handlers.semantic.get_cross_encoder', return_value=mock_encoder):
-            reranked = handler._rerank_results("test query", results, top_k=5)
-            
-            # Should return original results
-            assert len(reranked) == 1
-            assert reranked[0][0].id == "1"
-
-
-class TestFullBodyContext:
-    """Test that full email body is used in context instead of snippet."""
-    
-    def test_get_body_text_extracts_from_payload(self):
-        """Test MailMessage.get_body_text() extracts full body."""
-        import base64
-        
-        # Create a mock payload with text/plain part
-        body_text = "This is the full email body with lots of details that wouldn't fit in a snippet."
-        encoded_body = base64.urlsafe_b64encode(body_text.encode()).decode()
-        
-        payload = {
-            "parts": [
-                {
-                    "mimeType": "text/plain",
-                    "body": {
-                        "data": encoded_body
-                    }
-                }
-            ]
-        }
-        
-        msg = MailMessage(
-            id="1",
-            subject="Test",
-            snippet="Short snippet...",
-            payload=payload
-        )
-        
-        full_body = msg.get_body_text()
-        assert full_body == body_text
-        assert len(full_body) > len(msg.snippet)
-    
-    def test_get_body_text_falls_back_to_snippet(self):
-        """Test fallback to snippet when payload is unavailable."""
-        msg = MailMessage(
-            id="1",
-            subject="Test",
-            snippet="Fallback snippet",
-            payload=None
-        )
-        
-        assert msg.get_body_text() == "Fallback snippet"
-    
-    def test_get_body_text_multipart_prefers_plain(self):
-        """Should prioritize text/plain but may include other text content."""
-        import base64
-        
-        plain_text = "Plain text version"
-        html_text = "<p>HTML version</p>"
-        
-        payload = {
-            "parts": [
-                {
-                    "mimeType": "text/html",
-                    "body": {
-                        "data": base64.urlsafe_b64encode(html_text.encode()).decode()
-                    }
-                },
-                {
-                    "mimeType": "text/plain",
-                    "body": {
-                        "data": base64.urlsafe_b64encode(plain_text.encode()).decode()
-                    }
-                }
-            ]
-        }
-        
-        msg = MailMessage(id="1", payload=payload)
-        body = msg.get_body_text()
-        # Should include plain text (prioritized)
-        assert plain_text in body
-        # Implementation may include HTML too - that's acceptable for better search coverage
-    
-    def test_get_body_text_nested_multipart(self):
-        """Should handle nested multipart structures."""
-        import base64
-        
-        nested_text = "Nested plain text content"
-        
-        payload = {
-            "parts": [{
-                "mimeType": "multipart/alternative",
-                "parts": [
-                    {
-                        "mimeType": "text/plain",
-                        "body": {
-                            "data": base64.urlsafe_b64encode(nested_text.encode()).decode()
-                        }
-                    }
-                ]
-            }]
-        }
-        
-        msg = MailMessage(id="1", payload=payload)
-        assert msg.get_body_text() == nested_text
-    
-    def test_get_body_text_handles_invalid_base64(self):
-        """Should handle invalid base64 gracefully."""
-        payload = {
-            "mimeType": "text/plain",
-            "body": {
-                "data": "!!!invalid-base64!!!"
-            }
-        }
-        
-        msg = MailMessage(id="1", snippet="fallback", payload=payload)
-        # Should fall back to snippet without crashing
-        result = msg.get_body_text()
-        assert isinstance(result, str)
-    
-    def test_get_body_text_empty_payload(self):
-        """Should handle empty payload gracefully."""
-        msg = MailMessage(id="1", snippet="snippet", payload={})
-        assert msg.get_body_text() == "snippet"
-
-
-class TestKeywordSearch:
-    """Test PostgreSQL full-text search functionality."""
-    
-    @pytest.mark.integration
-    def test_keyword_search_query_format(self):
-        """Test that keyword search SQL uses correct tsvector syntax."""
-        # This would require a real database connection
-        # For now, just verify the method exists
-        storage = PostgresStorage.__new__(PostgresStorage)
-        assert hasattr(storage, 'keyword_search')
-        assert hasattr(storage, 'hybrid_search')
-
-
-if __name__ == "__main__":
-    pytest.main([__file__, "-v"])
+"""Tests for hybrid search and cross-encoder reranking improvements."""
+import base64
+
+import pytest
+from unittest.mock import Mock, patch, MagicMock
+from src.storage.postgres_storage import PostgresStorage, rrf_fuse
+from src.models.message import MailMessage
+from src.services.query_handlers.semantic import SemanticHandler, get_cross_encoder
+
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+
+# Body texts and their base64url encodings for the get_body_text tests,
+# encoded once at import.
+_FULL_BODY = "This is the full email body with lots of details that wouldn't fit in a snippet."
+_FULL_BODY_B64 = _b64(_FULL_BODY)
+_PLAIN_TEXT = "Plain text version"
+_PLAIN_TEXT_B64 = _b64(_PLAIN_TEXT)
+_HTML_TEXT_B64 = _b64("<p>HTML version</p>")
+_HTML_ONLY = "<p>Only HTML here</p>"
+_HTML_ONLY_B64 = _b64(_HTML_ONLY)
+_NESTED_TEXT = "Nested plain text content"
+_NESTED_TEXT_B64 = _b64(_NESTED_TEXT)
+_UNPADDED_TEXT = "Needs padding!"
+_UNPADDED_B64 = _b64(_UNPADDED_TEXT).rstrip("=")
+
+
+@pytest.fixture(scope="module")
+def storage_mock():
+    """One spec'd PostgresStorage mock shared by the module's tests."""
+    return Mock(spec=PostgresStorage)
+
+
+@pytest.fixture(scope="module")
+def _semantic_handler(storage_mock):
+    """A SemanticHandler built once per module around shared mocks."""
+    return SemanticHandler(
+        storage=storage_mock,
+        llm=Mock(),
+        embedder=Mock(),
+        context_builder=Mock()
+    )
+
+
+@pytest.fixture
+def handler(_semantic_handler):
+    """The shared SemanticHandler with its mocks reset for this test."""
+    for dependency in (
+        _semantic_handler.storage,
+        _semantic_handler.llm,
+        _semantic_handler.embedder,
+        _semantic_handler.context_builder,
+    ):
+        dependency.reset_mock(return_value=True, side_effect=True)
+    return _semantic_handler
+
+
+class TestHybridSearch:
+    """Test hybrid search (vector + keyword) with RRF fusion."""
+    
+    def test_rrf_fusion_logic(self):
+        """Test that RRF correctly combines and ranks results."""
+        # Create mock messages
+        msg1 = MailMessage(id="1", subject="Invoice from Acme Corp", snippet="Payment due")
+        msg2 = MailMessage(id="2", subject="Receipt confirmation", snippet="Thank you for your purchase")
+        msg3 = MailMessage(id="3", subject="Acme Newsletter", snippet="Latest updates")
+        
+        # Simulate vector results (msg1 and msg2 rank high)
+        vector_results = [(msg1, 0.9), (msg2, 0.85), (msg3, 0.6)]
+        
+        # Simulate keyword results (msg1 and msg3 rank high due to "Acme")
+        keyword_results = [(msg1, 5.2), (msg3, 4.8), (msg2, 2.1)]
+        
+        sorted_results = rrf_fuse(
+            vector_results,
+            keyword_results,
+            limit=10,
+            vector_weight=0.6,
+            keyword_weight=0.4,
+        )
+
+        # msg1 should rank highest (appears in both top positions)
+        assert sorted_results[0][0].id == "1"
+        # msg1 score should be sum of both RRF contributions
+        assert sorted_results[0][1] > 0.015  # Approximately 0.6/61 + 0.4/61
+        assert sorted_results[0][1] == pytest.approx(0.6 / 61 + 0.4 / 61)
+        assert [m.id for m, _ in sorted_results] == ["1", "2", "3"]
+
+    def test_rrf_fusion_returns_top_k_only(self):
+        """Only the `limit` best fused results are returned, best first."""
+        vector_results = [(MailMessage(id=f"v{i}"), 1.0) for i in range(50)]
+        keyword_results = [(MailMessage(id=f"k{i}"), 1.0) for i in range(50)]
+
+        top = rrf_fuse(vector_results, keyword_results, limit=3,
+                       vector_weight=0.7, keyword_weight=0.3)
+
+        assert [m.id for m, _ in top] == ["v0", "v1", "v2"]
+        assert [score for _, score in top] == sorted((score for _, score in top), reverse=True)
+
+
+class TestCrossEncoderReranking:
+    """Test cross-encoder reranking functionality."""
+
+    @pytest.fixture(autouse=True)
+    def _clear_rerank_cache(self):
+        """Start every test with an empty rerank score cache."""
+        import src.services.query_handlers.semantic as semantic_module
+        semantic_module._rerank_cache.clear()
+        yield
+        semantic_module._rerank_cache.clear()
+    
+    def test_cross_encoder_lazy_loading(self):
+        """Test that cross-encoder is loaded lazily and cached."""
+        # Reset global state
+        import src.services.query_handlers.semantic as semantic_module
+        semantic_module._cross_encoder = None
+        
+        with patch('sentence_transformers.CrossEncoder') as mock_ce:
+            mock_model = Mock()
+            mock_ce.return_value = mock_model
+            
+            # First call should load the model
+            encoder1 = get_cross_encoder()
+            assert encoder1 == mock_model
+            mock_ce.assert_called_once()
+            
+            # Second call should return cached model
+            encoder2 = get_cross_encoder()
+            assert encoder2 == mock_model
+            mock_ce.assert_called_once()  # Still only called once
+    
+    def test_reranking_improves_order(self, handler):
+        """Test that reranking reorders results by relevance."""
+        # Create mock messages
+        msg1 = MailMessage(id="1", subject="Unrelated topic", snippet="Random content")
+        msg2 = MailMessage(id="2", subject="Python tutorial", snippet="Learn Python programming")
+        msg3 = MailMessage(id="3", subject="Python job", snippet="Senior Python developer position")
+        
+        results = [(msg1, 0.75), (msg2, 0.70), (msg3, 0.68)]
+        question = "Python programming jobs"
+        
+        # Mock cross-encoder to prefer msg3, then msg2 (job-related, then tutorial)
+        mock_encoder = Mock()
+        mock_encoder.predict = Mock(return_value=[0.2, 0.6, 0.9])  # Higher score for msg3
+        
+        with patch('src.services.query_handlers.semantic.get_cross_encoder', return_value=mock_encoder):
+            reranked = handler._rerank_results(question, results, top_k=3)
+            
+            # msg3 should now be first (highest cross-encoder score)
+            assert reranked[0][0].id == "3"
+            assert reranked[1][0].id == "2"
+            assert reranked[2][0].id == "1"
+
+            # All pairs are scored in a single batched call
+            mock_encoder.predict.assert_called_once()
+            _, kwargs = mock_encoder.predict.call_args
+            assert kwargs["batch_size"] == 3
+            assert kwargs["show_progress_bar"] is False
+    
+    def test_single_result_skips_model_load(self, handler):
+        """A single result is returned as-is without loading the cross-encoder."""
+        results = [(MailMessage(id="1", subject="Only", snippet="One"), 0.8)]
+
+        with patch('src.services.query_handlers.semantic.get_cross_encoder') as mock_get:
+            assert handler._rerank_results("anything", results, top_k=5) == results
+
+        mock_get.assert_not_called()
+
+    def test_cross_encoder_onnx_backend(self, monkeypatch):
+        """RERANKER_BACKEND/RERANKER_ONNX_FILE are passed through to CrossEncoder."""
+        import src.services.query_handlers.semantic as semantic_module
+        monkeypatch.setattr(semantic_module, "_cross_encoder", None)
+        monkeypatch.setenv("RERANKER_BACKEND", "onnx")
+        monkeypatch.setenv("RERANKER_ONNX_FILE", "onnx/model_qint8_avx512.onnx")
+
+        with patch('sentence_transformers.CrossEncoder') as mock_ce:
+            get_cross_encoder()
+
+        mock_ce.assert_called_once_with(
+            semantic_module.CROSS_ENCODER_MODEL,
+            backend="onnx",
+            model_kwargs={"file_name": "onnx/model_qint8_avx512.onnx"},
+        )
+
+    def test_cross_encoder_onnx_falls_back_to_torch(self, monkeypatch):
+        """A failed ONNX load falls back to the default PyTorch model."""
+        import src.services.query_handlers.semantic as semantic_module
+        monkeypatch.setattr(semantic_module, "_cross_encoder", None)
+        monkeypatch.setenv("RERANKER_BACKEND", "onnx")
+        monkeypatch.delenv("RERANKER_ONNX_FILE", raising=False)
+
+        torch_model = Mock()
+        with patch('sentence_transformers.CrossEncoder',
+                   side_effect=[ImportError("onnxruntime missing"), torch_model]) as mock_ce:
+            assert get_cross_encoder() is torch_model
+
+        assert mock_ce.call_count == 2
+        assert mock_ce.call_args == ((semantic_module.CROSS_ENCODER_MODEL,), {})
+
+    def test_reranking_reuses_cached_scores(self, handler):
+        """Pairs scored once are served from the cache on later calls."""
+        msg1 = MailMessage(id="1", subject="Invoice", snippet="Payment due")
+        msg2 = MailMessage(id="2", subject="Receipt", snippet="Thanks")
+        msg3 = MailMessage(id="3", subject="Newsletter", snippet="Updates")
+
+        mock_encoder = Mock()
+        mock_encoder.predict = Mock(return_value=[0.1, 0.7])
+
+        with patch('src.services.query_handlers.semantic.get_cross_encoder', return_value=mock_encoder):
+            handler._rerank_results("unpaid invoice", [(msg1, 0.9), (msg2, 0.8)], top_k=2)
+
+            # Only the unseen document goes through the model
+            mock_encoder.predict.reset_mock(return_value=True)
+            mock_encoder.predict.return_value = [0.4]
+            reranked = handler._rerank_results(
+                "unpaid invoice", [(msg1, 0.9), (msg2, 0.8), (msg3, 0.7)], top_k=3
+            )
+
+        mock_encoder.predict.assert_called_once()
+        (pairs,), _ = mock_encoder.predict.call_args
+        assert pairs == [["unpaid invoice", "Newsletter Updates"]]
+        assert [(m.id, score) for m, score in reranked] == [("2", 0.7), ("3", 0.4), ("1", 0.1)]
+
+    @pytest.mark.parametrize(
+        "question",
+        ['"quarterly report"', "invoice", "from:alice@example.com budget", "subject:invoice"],
+    )
+    def test_reranking_skipped_for_literal_queries(self, handler, question):
+        """Quoted phrases, single tokens and field filters keep lexical order."""
+        msg1 = MailMessage(id="1", subject="Invoice", snippet="Payment due")
+        msg2 = MailMessage(id="2", subject="Report", snippet="Q3 numbers")
+        results = [(msg1, 0.9), (msg2, 0.8)]
+
+        with patch('src.services.query_handlers.semantic.get_cross_encoder') as get_encoder:
+            reranked = handler._rerank_results(question, results, top_k=5)
+
+        # The model is never even loaded for literal lookups
+        get_encoder.assert_not_called()
+        assert reranked == results
+
+    def test_reranking_handles_failure_gracefully(self, handler):
+        """Test that reranking failures fallback to original order."""
+        msg1 = MailMessage(id="1", subject="Test", snippet="Content")
+        results = [(msg1, 0.8)]
+        
+        # Mock cross-encoder to raise an exception
+        mock_encoder = Mock()
+        mock_encoder.predict = Mock(side_effect=RuntimeError("Model error"))
+        
+        with patch('src.services.query_handlers.semantic.get_cross_encoder', return_value=mock_encoder):
+            reranked = handler._rerank_results("test query", results, top_k=5)
+            
+            # Should return original results
+            assert len(reranked) == 1
+            assert reranked[0][0].id == "1"
+
+
+class TestFullBodyContext:
+    """Test that full email body is used in context instead of snippet."""
+    
+    def test_get_body_text_extracts_from_payload(self):
+        """Test MailMessage.get_body_text() extracts full body."""
+        # Create a mock payload with text/plain part
+        body_text, encoded_body = _FULL_BODY, _FULL_BODY_B64
+
+        payload = {
+            "parts": [
+                {
+                    "mimeType": "text/plain",
+                    "body": {
+                        "data": encoded_body
+                    }
+                }
+            ]
+        }
+        
+        msg = MailMessage(
+            id="1",
+            subject="Test",
+            snippet="Short snippet...",
+            payload=payload
+        )
+        
+        full_body = msg.get_body_text()
+        assert full_body == body_text
+        assert len(full_body) > len(msg.snippet)
+    
+    def test_get_body_text_falls_back_to_snippet(self):
+        """Test fallback to snippet when payload is unavailable."""
+        msg = MailMessage(
+            id="1",
+            subject="Test",
+            snippet="Fallback snippet",
+            payload=None
+        )
+        
+        assert msg.get_body_text() == "Fallback snippet"
+    
+    def test_get_body_text_multipart_prefers_plain(self):
+        """Should prioritize text/plain but may include other text content."""
+        plain_text = _PLAIN_TEXT
+
+        payload = {
+            "parts": [
+                {
+                    "mimeType": "text/html",
+                    "body": {
+                        "data": _HTML_TEXT_B64
+                    }
+                },
+                {
+                    "mimeType": "text/plain",
+                    "body": {
+                        "data": _PLAIN_TEXT_B64
+                    }
+                }
+            ]
+        }
+        
+        msg = MailMessage(id="1", payload=payload)
+        body = msg.get_body_text()
+        # Only the text/plain part is decoded and returned
+        assert body == plain_text
+
+    def test_get_body_text_html_only_fallback(self):
+        """Should use the first text/html part when there is no text/plain."""
+        payload = {
+            "mimeType": "multipart/mixed",
+            "parts": [
+                {"mimeType": "application/pdf", "filename": "a.pdf", "body": {"attachmentId": "x"}},
+                {
+                    "mimeType": "multipart/alternative",
+                    "parts": [{
+                        "mimeType": "text/html",
+                        "body": {"data": _HTML_ONLY_B64}
+                    }]
+                },
+            ]
+        }
+
+        msg = MailMessage(id="1", snippet="snippet", payload=payload)
+        assert msg.get_body_text() == _HTML_ONLY
+    
+    def test_get_body_text_nested_multipart(self):
+        """Should handle nested multipart structures."""
+        payload = {
+            "parts": [{
+                "mimeType": "multipart/alternative",
+                "parts": [
+                    {
+                        "mimeType": "text/plain",
+                        "body": {
+                            "data": _NESTED_TEXT_B64
+                        }
+                    }
+                ]
+            }]
+        }
+        
+        msg = MailMessage(id="1", payload=payload)
+        assert msg.get_body_text() == _NESTED_TEXT
+    
+    def test_get_body_text_handles_invalid_base64(self):
+        """Should handle invalid base64 gracefully."""
+        payload = {
+            "mimeType": "text/plain",
+            "body": {
+                "data": "!!!invalid-base64!!!"
+            }
+        }
+        
+        msg = MailMessage(id="1", snippet="fallback", payload=payload)
+        # Should fall back to snippet without crashing
+        assert msg.get_body_text() == "fallback"
+    
+    def test_get_body_text_unpadded_base64(self):
+        """Should decode base64url data with the '=' padding stripped."""
+        assert len(_UNPADDED_B64) % 4  # sanity: this input really is unpadded
+
+        payload = {"mimeType": "text/plain", "body": {"data": _UNPADDED_B64}}
+        msg = MailMessage(id="1", snippet="snippet", payload=payload)
+        assert msg.get_body_text() == _UNPADDED_TEXT
+
+    def test_get_body_text_is_cached_until_payload_changes(self):
+        """Body text is decoded once and recomputed when the payload changes."""
+        payload = {"mimeType": "text/plain", "body": {"data": _PLAIN_TEXT_B64}}
+        msg = MailMessage(id="1", snippet="snippet", payload=payload)
+
+        with patch.object(MailMessage, "_extract_body_text", autospec=True,
+                          side_effect=MailMessage._extract_body_text) as extract:
+            assert msg.get_body_text() == _PLAIN_TEXT
+            assert msg.get_body_text() == _PLAIN_TEXT
+            assert extract.call_count == 1
+
+            # Reassigning the payload is picked up automatically
+            msg.payload = {"mimeType": "text/plain", "body": {"data": _NESTED_TEXT_B64}}
+            assert msg.get_body_text() == _NESTED_TEXT
+
+            # In-place mutation needs an explicit invalidation
+            msg.payload["body"]["data"] = _PLAIN_TEXT_B64
+            msg._invalidate_body()
+            assert msg.get_body_text() == _PLAIN_TEXT
+            assert extract.call_count == 3
+
+    def test_get_body_text_empty_payload(self):
+        """Should handle empty payload gracefully."""
+        msg = MailMessage(id="1", snippet="snippet", payload={})
+        assert msg.get_body_text() == "snippet"
+
+
+class TestKeywordSearch:
+    """Test PostgreSQL full-text search functionality."""
+    
+    @pytest.mark.integration
+    def test_keyword_search_query_format(self):
+        """Test that keyword search SQL uses correct tsvector syntax."""
+        # This would require a real database connection
+        # For now, just verify the method exists
+        storage = PostgresStorage.__new__(PostgresStorage)
+        assert hasattr(storage, 'keyword_search')
+        assert hasattr(storage, 'hybrid_search')
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
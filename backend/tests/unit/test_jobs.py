@@ -13,6 +13,12 @@ import types
 
 import pytest
 
+from src import storage as stor
+from src.jobs import pull_all_inbox as pai
+from src.jobs import pull_messages as pm
+from src.jobs import register_watch as rw
+from src.storage import InMemoryStorage, use_storage
+
 
 # Ensure the register_watch job writes the watch response JSON file to the
 # user's home directory. This test stubs Gmail helpers and asserts the
@@ -38,13 +44,12 @@ def test_register_watch_writes_file(monkeypatch, tmp_path):
         called['resp'] = {"historyId": "h123"}
         return called['resp']
 
-    monkeypatch.setattr("src.clients.gmail.build_credentials_from_oauth", fake_build_creds)
-    monkeypatch.setattr("src.clients.gmail.build_gmail_service", fake_build_service)
-    monkeypatch.setattr("src.clients.gmail.register_watch", fake_register_watch)
+    # the job imports the Gmail helpers by name, so patch them on the job module
+    monkeypatch.setattr(rw, "build_credentials_from_oauth", fake_build_creds)
+    monkeypatch.setattr(rw, "build_gmail_service", fake_build_service)
+    monkeypatch.setattr(rw, "register_watch", fake_register_watch)
 
-    # import and run the job
-    import importlib
-    rw = importlib.import_module("src.jobs.register_watch")
+    # run the job
     rw.main()
 
     p = tmp_path / ".organize_mail_watch.json"
@@ -62,21 +67,14 @@ def test_pull_messages_saves_message(monkeypatch):
     monkeypatch.setenv("GOOGLE_CLIENT_SECRET", "secret")
     monkeypatch.setenv("GOOGLE_REFRESH", "refresh")
 
-    # use in-memory storage backend
-    from src.storage import InMemoryStorage, set_storage_backend
-
+    # use a fresh in-memory backend (set_history_id below writes to it)
     mem = InMemoryStorage()
-    set_storage_backend(mem)
     mem.init_db()
 
-    # set existing historyId in storage so pull_messages uses it
-    from src import storage as stor
-    stor.set_history_id("h0")
-
-    # stub gmail client helpers
-    monkeypatch.setattr("src.clients.gmail.build_credentials_from_oauth", lambda a,b,c: None)
-    monkeypatch.setattr("src.clients.gmail.build_gmail_service", lambda credentials=None: None)
-    monkeypatch.setattr("src.clients.gmail.fetch_messages_by_history", lambda service, history_id: ["m1"])
+    # stub gmail client helpers (imported by name into the job module)
+    monkeypatch.setattr(pm, "build_credentials_from_oauth", lambda a,b,c: None)
+    monkeypatch.setattr(pm, "build_gmail_service", lambda credentials=None: None)
+    monkeypatch.setattr(pm, "fetch_messages_by_history", lambda service, history_id: ["m1"])
 
     def fake_fetch_message(service, mid, format="metadata"):
         return {
@@ -87,15 +85,13 @@ def test_pull_messages_saves_message(monkeypatch):
             "payload": {"headers": [{"name": "From", "value": "a@b"}, {"name": "Subject", "value": "hi"}]},
         }
 
-    # import the job module after we've patched the clients module above
-    import importlib
-    pm = importlib.import_module("src.jobs.pull_messages")
-    # the job module imported fetch_message at import time, so patch the
-    # attribute on the job module itself
     monkeypatch.setattr(pm, "fetch_message", fake_fetch_message)
 
-    # run the job
-    pm.main()
+    # run the job against the in-memory backend, restoring the previous one after
+    with use_storage(mem):
+        # set existing historyId in storage so pull_messages uses it
+        stor.set_history_id("h0")
+        pm.main()
 
     ids = mem.get_message_ids()
     assert "m1" in ids
@@ -110,20 +106,15 @@ def test_pull_all_inbox_saves_messages(monkeypatch):
     monkeypatch.setenv("GOOGLE_CLIENT_SECRET", "secret")
     monkeypatch.setenv("GOOGLE_REFRESH", "refresh")
 
-    # use in-memory storage backend
-    from src.storage import InMemoryStorage, set_storage_backend
-
+    # use a fresh in-memory backend
     mem = InMemoryStorage()
-    set_storage_backend(mem)
     mem.init_db()
 
     # stub gmail helpers used by pull_all_inbox
-    monkeypatch.setattr("src.clients.gmail.build_credentials_from_oauth", lambda a,b,c: None)
-    monkeypatch.setattr("src.clients.gmail.build_gmail_service", lambda credentials=None: None)
+    monkeypatch.setattr(pai, "build_credentials_from_oauth", lambda a,b,c: None)
+    monkeypatch.setattr(pai, "build_gmail_service", lambda credentials=None: None)
 
     # patch the list_all_message_ids function defined in the job module
-    import importlib
-    pai = importlib.import_module("src.jobs.pull_all_inbox")
     monkeypatch.setattr(pai, "list_all_message_ids", lambda service, user_id="me", label_ids=None, q=None: ["m1", "m2"]) 
 
     def fake_fetch_message(service, mid, format="metadata"):
@@ -134,7 +125,8 @@ def test_pull_all_inbox_saves_messages(monkeypatch):
 
     # run the job (no args); ensure argparse doesn't see pytest's argv
     monkeypatch.setattr(sys, "argv", ["pull_all_inbox"])
-    pai.main()
+    with use_storage(mem):
+        pai.main()
 
     ids = set(mem.get_message_ids())
     assert {"m1", "m2"}.issubset(ids)
@@ -6,55 +6,60 @@ to external LLM providers (OpenAI, Anthropic, Ollama) as those would
 require real API keys or running services.
 """
 
-import os
 import json
 import pytest
 from src.services import LLMProcessor
 from src.services.prompt_templates import CLASSIFICATION_SYSTEM_MESSAGE, build_classification_prompt
 
 
+@pytest.fixture(scope="module")
+def rules_processor():
+    """One 'rules' LLMProcessor shared by the module's parsing/classification tests.
+
+    Response parsing and rule-based classification don't touch instance
+    state, so a single instance is safe to reuse.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("LLM_PROVIDER", "rules")
+        yield LLMProcessor()
+
+
 class TestLLMProcessorConstants:
     """Test shared configuration constants."""
 
     def test_constants_are_set(self):
         """Verify all shared constants exist and have reasonable values."""
-        os.environ["LLM_PROVIDER"] = "rules"
-        processor = LLMProcessor()
-        
         # Check system message from llm_prompts module
         assert CLASSIFICATION_SYSTEM_MESSAGE is not None
         assert len(CLASSIFICATION_SYSTEM_MESSAGE) > 0
         assert "classification" in CLASSIFICATION_SYSTEM_MESSAGE.lower()
         
-        assert processor.TEMPERATURE == 0.3
-        assert processor.MAX_TOKENS == 200
-        assert processor.TIMEOUT == 60  # Updated timeout
-        
-        os.environ.pop("LLM_PROVIDER", None)
+        # Class attributes; no processor instance needed
+        assert LLMProcessor.TEMPERATURE == 0.3
+        assert LLMProcessor.MAX_TOKENS == 200
+        assert LLMProcessor.TIMEOUT == 60  # Updated timeout
 
 
 class TestProviderDetection:
     """Test auto-detection of LLM providers."""
 
-    def test_explicit_provider_rules(self):
+    def test_explicit_provider_rules(self, monkeypatch):
         """LLM_PROVIDER=rules should use rule-based."""
-        os.environ["LLM_PROVIDER"] = "rules"
+        monkeypatch.setenv("LLM_PROVIDER", "rules")
         processor = LLMProcessor()
         assert processor.provider == "rules"
-        os.environ.pop("LLM_PROVIDER", None)
 
-    def test_explicit_provider_openai(self):
+    def test_explicit_provider_openai(self, monkeypatch):
         """LLM_PROVIDER=openai should set provider even without API key."""
-        os.environ["LLM_PROVIDER"] = "openai"
+        monkeypatch.setenv("LLM_PROVIDER", "openai")
         processor = LLMProcessor()
         assert processor.provider == "openai"
-        os.environ.pop("LLM_PROVIDER", None)
 
     def test_raises_error_when_nothing_available(self, monkeypatch):
         """Should raise error when no providers detected and not explicitly rules."""
         # Clear all provider-related env vars
         for key in ["LLM_PROVIDER", "OPENAI_API_KEY", "ANTHROPIC_API_KEY", "ORGANIZE_MAIL_LLM_CMD"]:
-            os.environ.pop(key, None)
+            monkeypatch.delenv(key, raising=False)
         
         # Mock _is_ollama_running to return False
         def fake_ollama_check(self):
@@ -64,46 +69,41 @@ class TestProviderDetection:
         with pytest.raises(RuntimeError, match="No LLM provider configured"):
             LLMProcessor()
     
-    def test_explicit_rules_provider_works(self):
+    def test_explicit_rules_provider_works(self, monkeypatch):
         """LLM_PROVIDER=rules should work for testing."""
         # Clear all other providers
         for key in ["OPENAI_API_KEY", "ANTHROPIC_API_KEY", "ORGANIZE_MAIL_LLM_CMD"]:
-            os.environ.pop(key, None)
+            monkeypatch.delenv(key, raising=False)
         
-        os.environ["LLM_PROVIDER"] = "rules"
+        monkeypatch.setenv("LLM_PROVIDER", "rules")
         processor = LLMProcessor()
         assert processor.provider == "rules"
-        os.environ.pop("LLM_PROVIDER", None)
 
 
 class TestModelNameSelection:
     """Test model name selection logic."""
 
-    def test_explicit_model_name(self):
+    def test_explicit_model_name(self, monkeypatch):
         """LLM_MODEL env var should override defaults."""
-        os.environ["LLM_MODEL"] = "my-custom-model"
-        os.environ["LLM_PROVIDER"] = "rules"
+        monkeypatch.setenv("LLM_MODEL", "my-custom-model")
+        monkeypatch.setenv("LLM_PROVIDER", "rules")
         processor = LLMProcessor()
         assert processor.model == "my-custom-model"
-        os.environ.pop("LLM_MODEL", None)
-        os.environ.pop("LLM_PROVIDER", None)
 
-    def test_default_model_for_openai(self):
+    def test_default_model_for_openai(self, monkeypatch):
         """OpenAI provider should default to gpt-3.5-turbo."""
-        os.environ["LLM_PROVIDER"] = "openai"
-        os.environ.pop("LLM_MODEL", None)
+        monkeypatch.setenv("LLM_PROVIDER", "openai")
+        monkeypatch.delenv("LLM_MODEL", raising=False)
         processor = LLMProcessor()
         assert processor.model == "gpt-3.5-turbo"
-        os.environ.pop("LLM_PROVIDER", None)
 
-    def test_default_model_for_ollama(self):
+    def test_default_model_for_ollama(self, monkeypatch):
         """Ollama provider should auto-select best available model."""
-        os.environ["LLM_PROVIDER"] = "ollama"
-        os.environ.pop("LLM_MODEL", None)
+        monkeypatch.setenv("LLM_PROVIDER", "ollama")
+        monkeypatch.delenv("LLM_MODEL", raising=False)
         processor = LLMProcessor()
         # Should auto-select based on available models, or fall back to 'llama3'
         assert processor.model is not None and len(processor.model) > 0
-        os.environ.pop("LLM_PROVIDER", None)
 
 
 class TestPromptBuilding:
@@ -137,113 +137,99 @@ class TestPromptBuilding:
         assert len(prompt) < 3500  # Prompt + truncated body
 
 
+# (raw LLM response, expected fields in the parsed result)
+PARSE_CASES = [
+    pytest.param(
+        '{"labels": ["finance", "work"], "priority": "high", "summary": "Invoice payment due"}',
+        {"labels": ["finance", "work"], "priority": "high", "summary": "Invoice payment due"},
+        id="valid_json",
+    ),
+    pytest.param(
+        '```json\n{"labels": ["security"], "priority": "normal", "summary": "Security alert"}\n```',
+        {"labels": ["security"], "priority": "normal", "summary": "Security alert"},
+        id="markdown_backticks",
+    ),
+    pytest.param(
+        'Here is the result:\n```\n{"labels": ["travel"], "priority": "low", "summary": "Trip"}\n```\nHope this helps.',
+        {"labels": ["travel"], "priority": "low", "summary": "Trip"},
+        id="untagged_fence_with_surrounding_text",
+    ),
+    pytest.param(
+        '{"label": "finance", "priority": "high"}',
+        {"labels": ["finance"]},
+        id="singular_label_field",
+    ),
+    pytest.param(
+        '{"label": "finance,work,security", "priority": "high"}',
+        {"labels": ["finance", "work", "security"]},
+        id="comma_separated_labels",
+    ),
+    pytest.param(
+        '{"labels": ["finance"], "summary": "Test"}',
+        {"priority": "normal"},
+        id="missing_priority_defaults_to_normal",
+    ),
+    pytest.param(
+        '{"labels": ["finance"], "priority": "high"}',
+        {"summary": ""},
+        id="missing_summary_defaults_to_empty",
+    ),
+    pytest.param(
+        '{"labels": ["finance"], "priority": "HIGH"}',
+        {"priority": "high"},
+        id="normalizes_priority_case",
+    ),
+    pytest.param(
+        '{"labels": ["finance"], "priority": "urgent"}',
+        {"priority": "normal"},
+        id="invalid_priority_defaults_to_normal",
+    ),
+    pytest.param(
+        '{"summary": "Re: \\"Q3 [draft]\\", see {notes}", "labels": ["work"], "priority": "low"}',
+        {"labels": ["work"], "priority": "low", "summary": 'Re: "Q3 [draft]", see {notes}'},
+        id="escaped_quotes_and_brackets_in_summary",
+    ),
+]
+
+
 class TestResponseParsing:
     """Test parsing of LLM responses with various formats."""
 
-    def test_parse_valid_json(self):
-        """Should parse valid JSON response."""
-        os.environ["LLM_PROVIDER"] = "rules"
-        processor = LLMProcessor()
-        response = '{"labels": ["finance", "work"], "priority": "high", "summary": "Invoice payment due"}'
-        result = processor._parse_llm_response(response)
-        
-        assert result["labels"] == ["finance", "work"]
-        assert result["priority"] == "high"
-        assert result["summary"] == "Invoice payment due"
-        
-        os.environ.pop("LLM_PROVIDER", None)
+    @pytest.mark.parametrize("response, expected", PARSE_CASES)
+    def test_parse(self, rules_processor, response, expected):
+        """Parsed result should carry normalized labels, priority and summary."""
+        result = rules_processor._parse_llm_response(response)
 
-    def test_parse_json_with_markdown_backticks(self):
-        """Should extract JSON from markdown code blocks."""
-        os.environ["LLM_PROVIDER"] = "rules"
-        processor = LLMProcessor()
-        response = '```json\n{"labels": ["security"], "priority": "normal", "summary": "Security alert"}\n```'
-        result = processor._parse_llm_response(response)
-        
-        assert result["labels"] == ["security"]
-        assert result["priority"] == "normal"
-        assert result["summary"] == "Security alert"
-        
-        os.environ.pop("LLM_PROVIDER", None)
-
-    def test_parse_singular_label_field(self):
-        """Should handle 'label' (singular) and convert to 'labels' (plural)."""
-        os.environ["LLM_PROVIDER"] = "rules"
-        processor = LLMProcessor()
-        response = '{"label": "finance", "priority": "high"}'
-        result = processor._parse_llm_response(response)
-        
-        assert "labels" in result
-        assert result["labels"] == ["finance"]
+        for key, value in expected.items():
+            assert result[key] == value, f"{key}: expected {value!r}, got {result[key]!r}"
+        # Singular 'label' is always folded into 'labels'; summary is always a str
         assert "label" not in result
-        
-        os.environ.pop("LLM_PROVIDER", None)
-
-    def test_parse_comma_separated_labels(self):
-        """Should handle comma-separated label strings."""
-        os.environ["LLM_PROVIDER"] = "rules"
-        processor = LLMProcessor()
-        response = '{"label": "finance,work,security", "priority": "high"}'
-        result = processor._parse_llm_response(response)
-        
-        assert result["labels"] == ["finance", "work", "security"]
-        
-        os.environ.pop("LLM_PROVIDER", None)
-
-    def test_parse_missing_priority_defaults_to_normal(self):
-        """Should default to 'normal' priority if missing."""
-        os.environ["LLM_PROVIDER"] = "rules"
-        processor = LLMProcessor()
-        response = '{"labels": ["finance"], "summary": "Test"}'
-        result = processor._parse_llm_response(response)
-        
-        assert result["priority"] == "normal"
-        
-        os.environ.pop("LLM_PROVIDER", None)
-
-    def test_parse_missing_summary_defaults_to_empty(self):
-        """Should default to empty string if summary missing."""
-        os.environ["LLM_PROVIDER"] = "rules"
-        processor = LLMProcessor()
-        response = '{"labels": ["finance"], "priority": "high"}'
-        result = processor._parse_llm_response(response)
-        
-        assert result["summary"] == ""
         assert isinstance(result["summary"], str)
-        
-        os.environ.pop("LLM_PROVIDER", None)
 
-    def test_parse_normalizes_priority_case(self):
-        """Should normalize priority to lowercase."""
-        os.environ["LLM_PROVIDER"] = "rules"
-        processor = LLMProcessor()
-        response = '{"labels": ["finance"], "priority": "HIGH"}'
-        result = processor._parse_llm_response(response)
-        
-        assert result["priority"] == "high"
-        
-        os.environ.pop("LLM_PROVIDER", None)
+    def test_repeated_parse_returns_independent_results(self, rules_processor):
+        """Mutating a parsed result must not leak into the next parse of the same response."""
+        response = (
+            '{"labels": ["finance"], "priority": "high", "summary": "Invoice",'
+            ' "extra": {"amounts": [500]}}'
+        )
+        first = rules_processor._parse_llm_response(response)
+        first["labels"].append("work")
+        first["priority"] = "low"
+        first["extra"]["amounts"].append(600)
 
-    def test_parse_invalid_priority_defaults_to_normal(self):
-        """Should default invalid priority values to 'normal'."""
-        os.environ["LLM_PROVIDER"] = "rules"
-        processor = LLMProcessor()
-        response = '{"labels": ["finance"], "priority": "urgent"}'
-        result = processor._parse_llm_response(response)
-        
-        assert result["priority"] == "normal"
-        
-        os.environ.pop("LLM_PROVIDER", None)
+        second = rules_processor._parse_llm_response(response)
+        assert second == {
+            "labels": ["finance"], "priority": "high", "summary": "Invoice",
+            "extra": {"amounts": [500]},
+        }
 
 
 class TestRuleBasedClassification:
     """Test rule-based classification fallback."""
 
-    def test_finance_keywords(self):
+    def test_finance_keywords(self, rules_processor):
         """Should detect finance-related emails."""
-        os.environ["LLM_PROVIDER"] = "rules"
-        processor = LLMProcessor()
-        result = processor._rule_based(
+        result = rules_processor._rule_based(
             "Invoice #12345",
             "Your payment of $500 is due."
         )
@@ -251,59 +237,42 @@ class TestRuleBasedClassification:
         assert "finance" in result["labels"]
         assert "summary" in result
         assert result["summary"] == "Invoice #12345"
-        
-        os.environ.pop("LLM_PROVIDER", None)
 
-    def test_security_keywords(self):
+    def test_security_keywords(self, rules_processor):
         """Should detect security-related emails and mark as high priority."""
-        os.environ["LLM_PROVIDER"] = "rules"
-        processor = LLMProcessor()
-        result = processor._rule_based(
+        result = rules_processor._rule_based(
             "Security Alert",
             "Unusual login detected on your account."
         )
         
         assert "security" in result["labels"]
         assert result["priority"] == "high"
-        
-        os.environ.pop("LLM_PROVIDER", None)
 
-    def test_meeting_keywords(self):
+    def test_meeting_keywords(self, rules_processor):
         """Should detect meeting-related emails."""
-        os.environ["LLM_PROVIDER"] = "rules"
-        processor = LLMProcessor()
-        result = processor._rule_based(
+        result = rules_processor._rule_based(
             "Team Meeting Tomorrow",
             "Let's schedule a meeting for 3pm."
         )
         
         assert "meetings" in result["labels"]
-        
-        os.environ.pop("LLM_PROVIDER", None)
 
-    def test_urgent_keywords_set_high_priority(self):
+    def test_urgent_keywords_set_high_priority(self, rules_processor):
         """Should set high priority for urgent keywords."""
-        os.environ["LLM_PROVIDER"] = "rules"
-        processor = LLMProcessor()
-        result = processor._rule_based(
+        result = rules_processor._rule_based(
             "URGENT: Action Required",
             "Please respond immediately."
         )
         
         assert result["priority"] == "high"
-        
-        os.environ.pop("LLM_PROVIDER", None)
 
 
 class TestCategorizeMessage:
     """Test the main categorize_message method."""
 
-    def test_categorize_with_rules_provider(self):
+    def test_categorize_with_rules_provider(self, rules_processor):
         """Should use rule-based classification when provider is 'rules'."""
-        os.environ["LLM_PROVIDER"] = "rules"
-        processor = LLMProcessor()
-        
-        result = processor.categorize_message(
+        result = rules_processor.categorize_message(
             "Invoice Payment Due",
             "Your invoice for $500 is overdue."
         )
@@ -311,15 +280,10 @@ class TestCategorizeMessage:
         assert "labels" in result
         assert "priority" in result
         assert "finance" in result["labels"]
-        
-        os.environ.pop("LLM_PROVIDER", None)
 
-    def test_categorize_returns_dict_with_required_fields(self):
+    def test_categorize_returns_dict_with_required_fields(self, rules_processor):
         """Result should always have 'labels', 'priority', and 'summary' fields."""
-        os.environ["LLM_PROVIDER"] = "rules"
-        processor = LLMProcessor()
-        
-        result = processor.categorize_message("Test", "Test body")
+        result = rules_processor.categorize_message("Test", "Test body")
         
         assert isinstance(result, dict)
         assert "labels" in result
@@ -328,5 +292,13 @@ class TestCategorizeMessage:
         assert isinstance(result["labels"], list)
         assert result["priority"] in ("high", "normal", "low")
         assert isinstance(result["summary"], str)
-        
-        os.environ.pop("LLM_PROVIDER", None)
+
+
+class TestInvoke:
+    """Test the string-prompt invoke used by RAG handlers."""
+
+    def test_rules_provider_returns_fixed_response(self, rules_processor):
+        """The rules provider answers every prompt with the same canned text."""
+        first = rules_processor.invoke("hello")
+        assert first
+        assert rules_processor.invoke("a completely different prompt") == first
@@ -11,18 +11,15 @@ Covers all 8 query types:
 - temporal
 - semantic
 """
-import os
 import pytest
+from unittest.mock import MagicMock, patch
 
-os.environ["LLM_PROVIDER"] = "rules"
-os.environ.pop("OPENAI_API_KEY", None)
-os.environ.pop("ANTHROPIC_API_KEY", None)
-os.environ.pop("OLLAMA_HOST", None)
-os.environ.pop("ORGANIZE_MAIL_LLM_CMD", None)
-
+from src.services import query_classifier as qc_mod
 from src.services.query_classifier import QueryClassifier
 from src.services.llm_processor import LLMProcessor
 
+pytestmark = pytest.mark.usefixtures("no_llm_api_env")
+
 
 class TestQueryClassifierInit:
     """Tests for QueryClassifier initialization."""
@@ -41,306 +38,219 @@ class TestQueryClassifierInit:
         assert query_classifier.VALID_TYPES == expected_types
 
 
-class TestDetectQueryTypeConversation:
-    """Tests for conversation query detection."""
-
-    def test_detect_hello(self, query_classifier):
-        """Should classify 'hello' as conversation."""
-        result = query_classifier.detect_query_type("hello")
-        assert result == "conversation"
-
-    def test_detect_hi(self, query_classifier):
-        """Should classify 'hi' as conversation."""
-        result = query_classifier.detect_query_type("hi")
-        assert result == "conversation"
-
-    def test_detect_thanks(self, query_classifier):
-        """Should classify 'thanks' as conversation."""
-        result = query_classifier.detect_query_type("thanks")
-        assert result == "conversation"
-
-    def test_detect_help(self, query_classifier):
-        """Should classify 'help' as conversation."""
-        result = query_classifier.detect_query_type("help")
-        assert result == "conversation"
-
-    def test_detect_what_can_you_do(self, query_classifier):
-        """Should classify 'what can you do' as conversation."""
-        result = query_classifier.detect_query_type("what can you do")
-        assert result == "conversation"
-
+# (query, acceptable query types). Several queries legitimately land in more
+# than one handler depending on how the LLM reads them.
+DETECT_CASES = [
+    # Conversation
+    pytest.param("hello", {"conversation"}, id="hello"),
+    pytest.param("hi", {"conversation"}, id="hi"),
+    pytest.param("thanks", {"conversation"}, id="thanks"),
+    pytest.param("help", {"conversation"}, id="help"),
+    pytest.param("what can you do", {"conversation"}, id="what_can_you_do"),
+    # Aggregation
+    pytest.param("how many emails do I have", {"aggregation"}, id="how_many_emails"),
+    pytest.param("how many uber emails do I have", {"aggregation"}, id="how_many_topic"),
+    pytest.param("count my amazon emails", {"aggregation"}, id="count_emails"),
+    pytest.param("what is the number of unread messages", {"aggregation"}, id="number_of"),
+    # Search by sender
+    pytest.param("emails from uber", {"search-by-sender", "semantic", "aggregation"}, id="emails_from"),
+    pytest.param(
+        "all emails from john@company.com", {"search-by-sender", "semantic", "aggregation"}, id="all_emails_from"
+    ),
+    # The original failing query from the bug report
+    pytest.param(
+        "what are my last 10 ubereats mail", {"search-by-sender", "filtered-temporal"}, id="ubereats_query"
+    ),
+    pytest.param("show me uber emails", {"search-by-sender", "filtered-temporal", "semantic"}, id="uber_show_me"),
+    pytest.param("last 5 ubereats", {"search-by-sender", "filtered-temporal", "semantic"}, id="uber_last_5"),
+    pytest.param("uber eats messages", {"search-by-sender", "filtered-temporal", "semantic"}, id="uber_eats"),
+    pytest.param("recent uber mail", {"search-by-sender", "filtered-temporal", "semantic"}, id="uber_recent"),
+    pytest.param("doordash emails", {"search-by-sender", "filtered-temporal", "semantic"}, id="company_doordash"),
+    pytest.param(
+        "show me amazon orders",
+        {"search-by-sender", "classification", "filtered-temporal", "semantic"},
+        id="company_amazon",
+    ),
+    pytest.param("netflix messages", {"search-by-sender", "filtered-temporal", "semantic"}, id="company_netflix"),
+    pytest.param("github emails", {"search-by-sender", "filtered-temporal", "semantic"}, id="company_github"),
+    # Ambiguous: "notifications" could be classification intent
+    pytest.param(
+        "linkedin notifications",
+        {"search-by-sender", "classification", "filtered-temporal", "semantic"},
+        id="company_linkedin",
+    ),
+    # Search by attachment
+    pytest.param("emails with attachments", {"search-by-attachment", "semantic"}, id="with_attachments"),
+    pytest.param(
+        "find emails with PDF attachments",
+        {"search-by-attachment", "semantic", "filtered-temporal"},
+        id="find_pdfs",
+    ),
+    # Classification
+    pytest.param("show me my finance emails", {"classification"}, id="finance_label"),
+    # 'work' may or may not be detected as a classification label
+    pytest.param("work emails", {"classification", "semantic"}, id="work_label"),
+    pytest.param("show me shopping emails", {"classification"}, id="shopping_label"),
+    # Temporal
+    pytest.param("latest messages", {"temporal", "filtered-temporal", "semantic"}, id="latest"),
+    pytest.param("recent emails", {"temporal", "filtered-temporal", "semantic"}, id="recent"),
+    pytest.param("newest messages", {"temporal", "filtered-temporal", "semantic"}, id="newest"),
+    # Filtered temporal
+    pytest.param(
+        "recent uber emails",
+        {"filtered-temporal", "search-by-sender", "aggregation", "semantic"},
+        id="recent_uber",
+    ),
+    pytest.param(
+        "latest amazon orders", {"filtered-temporal", "search-by-sender", "semantic"}, id="latest_amazon_orders"
+    ),
+    # The original problem query
+    pytest.param(
+        "what are the five most recent uber eats mails?",
+        {"filtered-temporal", "search-by-sender", "aggregation"},
+        id="five_most_recent_uber_eats",
+    ),
+    # Semantic
+    pytest.param(
+        "emails about budget planning", {"semantic", "classification", "aggregation"}, id="about_topic"
+    ),
+    pytest.param(
+        "regarding the meeting next week", {"semantic", "conversation", "classification"}, id="regarding_topic"
+    ),
+]
+
+
+@pytest.mark.parametrize("query, expected", DETECT_CASES)
+def test_detect_query_type(query_classifier, query, expected):
+    """Each query should be routed to one of its acceptable handler types."""
+    result = query_classifier.detect_query_type(query)
+    assert result in expected, f"{query!r}: got {result}, expected one of {sorted(expected)}"
+
+
+class TestClassificationCache:
+    """Tests for reuse of LLM classifications of repeated questions."""
+
+    @pytest.fixture
+    def llm_classifier(self, monkeypatch):
+        """Classifier backed by a mock chat model that always answers 'aggregation'."""
+        monkeypatch.setattr(qc_mod, "_classification_cache", qc_mod.OrderedDict())
+        llm = MagicMock(provider="openai", model="test-model")
+        llm.llm.invoke.return_value = MagicMock(content="aggregation")
+        return QueryClassifier(llm)
+
+    def test_repeated_question_skips_llm(self, llm_classifier):
+        """Same question (modulo case, spacing, trailing punctuation) is classified by the LLM once."""
+        assert llm_classifier.detect_query_type("How many emails from Bob?") == "aggregation"
+        assert llm_classifier.detect_query_type("  how many emails from bob?") == "aggregation"
+        assert llm_classifier.detect_query_type("how many  emails from bob") == "aggregation"
+        assert llm_classifier.llm.llm.invoke.call_count == 1
+
+    def test_chat_history_bypasses_cache(self, llm_classifier):
+        """With chat context the prompt differs, so the LLM is asked every time."""
+        history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+        llm_classifier.detect_query_type("how many emails from bob?")
+        llm_classifier.detect_query_type("how many emails from bob?", chat_history=history)
+        assert llm_classifier.llm.llm.invoke.call_count == 2
+
+    def test_rules_provider_uses_heuristics_directly(self, query_classifier, monkeypatch):
+        """The rules provider never builds a prompt or touches the cache."""
+        monkeypatch.setattr(qc_mod, "_classification_cache", qc_mod.OrderedDict())
+        with patch.object(query_classifier, "_call_llm_simple") as call_llm:
+            assert query_classifier.detect_query_type("how many uber emails") == "aggregation"
+        call_llm.assert_not_called()
+        assert not qc_mod._classification_cache
+
+
+class TestBatchClassification:
+    """Tests for detect_query_types."""
+
+    @pytest.fixture
+    def batch_classifier(self, monkeypatch):
+        """Classifier over a mock chat model whose batch answers in order."""
+        monkeypatch.setattr(qc_mod, "_classification_cache", qc_mod.OrderedDict())
+        llm = MagicMock(provider="openai", model="test-model")
+        llm.llm.batch.side_effect = lambda batch: [
+            MagicMock(content="aggregation" if "zebra" in messages[1].content else "semantic")
+            for messages in batch
+        ]
+        return QueryClassifier(llm)
 
-class TestDetectQueryTypeAggregation:
-    """Tests for aggregation query detection."""
-
-    def test_detect_how_many_emails(self, query_classifier):
-        """Should classify 'how many emails' as aggregation."""
-        result = query_classifier.detect_query_type("how many emails do I have")
-        assert result == "aggregation"
-
-    def test_detect_how_many_topic(self, query_classifier):
-        """Should classify 'how many [topic]' as aggregation."""
-        result = query_classifier.detect_query_type("how many uber emails do I have")
-        assert result == "aggregation"
-
-    def test_detect_count_emails(self, query_classifier):
-        """Should classify count queries as aggregation."""
-        result = query_classifier.detect_query_type("count my amazon emails")
-        assert result == "aggregation"
-
-    def test_detect_number_of(self, query_classifier):
-        """Should classify 'number of' queries as aggregation."""
-        result = query_classifier.detect_query_type("what is the number of unread messages")
-        assert result == "aggregation"
-
-
-class TestDetectQueryTypeSender:
-    """Tests for search-by-sender query detection."""
-
-    def test_detect_emails_from(self, query_classifier):
-        """Should classify 'emails from X' as search-by-sender."""
-        result = query_classifier.detect_query_type("emails from uber")
-        # May be classified as search-by-sender or semantic depending on LLM
-        assert result in ("search-by-sender", "semantic", "aggregation")
-
-    def test_detect_all_emails_from(self, query_classifier):
-        """Should classify 'all emails from X' as search-by-sender."""
-        result = query_classifier.detect_query_type("all emails from john@company.com")
-        # LLM classification can vary
-        assert result in ("search-by-sender", "semantic", "aggregation")
-
-    def test_detect_ubereats_query(self, query_classifier):
-        """Should classify 'ubereats mail' as search-by-sender (original bug report)."""
-        result = query_classifier.detect_query_type("what are my last 10 ubereats mail")
-        # This was the original failing query - should now be search-by-sender
-        assert result in ("search-by-sender", "filtered-temporal")
-
-    def test_detect_uber_variations(self, query_classifier):
-        """Should classify various uber/ubereats name forms as search-by-sender."""
-        test_cases = [
-            "show me uber emails",
-            "last 5 ubereats",
-            "uber eats messages",
-            "recent uber mail"
+    def test_uncached_questions_go_in_one_batch(self, batch_classifier):
+        """Distinct uncached questions share one batch call; repeats are sent once."""
+        questions = ["how many zebra emails", "budget talk", "How many Zebra emails?", "show me finance emails"]
+        assert batch_classifier.detect_query_types(questions) == [
+            "aggregation", "semantic", "aggregation", "classification"
         ]
-        for query in test_cases:
-            result = query_classifier.detect_query_type(query)
-            assert result in ("search-by-sender", "filtered-temporal", "semantic"), \
-                f"Failed for: {query} (got {result})"
-
-    def test_detect_company_name_variations(self, query_classifier):
-        """Should classify concatenated company names as search-by-sender."""
-        test_cases = [
-            # Clear sender queries
-            ("doordash emails", ["search-by-sender", "filtered-temporal", "semantic"]),
-            ("show me amazon orders", ["search-by-sender", "classification", "filtered-temporal", "semantic"]),
-            ("netflix messages", ["search-by-sender", "filtered-temporal", "semantic"]),
-            ("github emails", ["search-by-sender", "filtered-temporal", "semantic"]),
-            # Ambiguous: "notifications" could be classification intent
-            ("linkedin notifications", ["search-by-sender", "classification", "filtered-temporal", "semantic"]),
+        batch_classifier.llm.llm.batch.assert_called_once()
+        (batch,), _ = batch_classifier.llm.llm.batch.call_args
+        assert len(batch) == 2
+        batch_classifier.llm.llm.invoke.assert_not_called()
+
+    def test_batch_results_are_cached(self, batch_classifier):
+        """A question classified in a batch is not sent to the model again."""
+        batch_classifier.detect_query_types(["how many zebra emails"])
+        assert batch_classifier.detect_query_type("how many zebra emails") == "aggregation"
+        batch_classifier.llm.llm.invoke.assert_not_called()
+
+    def test_batch_failure_falls_back_to_heuristics(self, batch_classifier):
+        """If the batch call fails, each question gets the heuristic answer."""
+        batch_classifier.llm.llm.batch.side_effect = RuntimeError("model down")
+        assert batch_classifier.detect_query_types(["count my emails", "budget talk"]) == [
+            "aggregation", "semantic"
         ]
-        for query, valid_types in test_cases:
-            result = query_classifier.detect_query_type(query)
-            # Intent-based classification should recognize company names
-            assert result in valid_types, \
-                f"Failed for: {query} (got {result}, expected one of {valid_types})"
-
-
-class TestDetectQueryTypeAttachment:
-    """Tests for search-by-attachment query detection."""
-
-    def test_detect_emails_with_attachments(self, query_classifier):
-        """Should classify attachment queries."""
-        result = query_classifier.detect_query_type("emails with attachments")
-        # LLM classification can vary
-        assert result in ("search-by-attachment", "semantic")
-
-    def test_detect_find_pdfs(self, query_classifier):
-        """Should classify PDF attachment queries."""
-        result = query_classifier.detect_query_type("find emails with PDF attachments")
-        # LLM classification can vary
-        assert result in ("search-by-attachment", "semantic", "filtered-temporal")
-
-
-class TestDetectQueryTypeClassification:
-    """Tests for classification query detection."""
-
-    def test_detect_finance_emails(self, query_classifier):
-        """Should classify label-based queries as classification."""
-        result = query_classifier.detect_query_type("show me my finance emails")
-        assert result == "classification"
-
-    def test_detect_work_label(self, query_classifier):
-        """Should classify work label queries as classification type."""
-        result = query_classifier.detect_query_type("work emails")
-        # 'work' may or may not be detected as a classification label
-        assert result in ("classification", "semantic")
-
-    def test_detect_shopping_label(self, query_classifier):
-        """Should classify shopping label queries as classification."""
-        result = query_classifier.detect_query_type("show me shopping emails")
-        assert result == "classification"
-
-
-class TestDetectQueryTypeTemporal:
-    """Tests for temporal query detection."""
-
-    def test_detect_latest_emails(self, query_classifier):
-        """Should classify 'latest' queries as temporal."""
-        result = query_classifier.detect_query_type("latest messages")
-        # LLM classification can vary between temporal types
-        assert result in ("temporal", "filtered-temporal", "semantic")
-
-    def test_detect_recent_emails(self, query_classifier):
-        """Should classify 'recent' queries as temporal."""
-        result = query_classifier.detect_query_type("recent emails")
-        assert result in ("temporal", "filtered-temporal", "semantic")
-
-    def test_detect_newest_emails(self, query_classifier):
-        """Should classify 'newest' queries as temporal."""
-        result = query_classifier.detect_query_type("newest messages")
-        assert result in ("temporal", "filtered-temporal", "semantic")
+        assert not qc_mod._classification_cache
 
+    def test_rules_provider_matches_single_calls(self, query_classifier):
+        """Without a chat model, results match detect_query_type one by one."""
+        questions = ["how many uber eats mail do i have", "show me my finance emails", "", "hi"]
+        assert query_classifier.detect_query_types(questions) == [
+            query_classifier.detect_query_type(q) for q in questions
+        ]
 
-class TestDetectQueryTypeFilteredTemporal:
-    """Tests for filtered-temporal query detection."""
-
-    def test_detect_recent_uber(self, query_classifier):
-        """Should classify 'recent uber' as filtered-temporal."""
-        result = query_classifier.detect_query_type("recent uber emails")
-        # Should have some filtering component detected
-        assert result in ("filtered-temporal", "search-by-sender", "aggregation", "semantic")
-
-    def test_detect_latest_amazon_orders(self, query_classifier):
-        """Should classify 'latest amazon orders' as filtered-temporal."""
-        result = query_classifier.detect_query_type("latest amazon orders")
-        assert result in ("filtered-temporal", "search-by-sender", "semantic")
-
-    def test_detect_five_most_recent_uber_eats(self, query_classifier):
-        """Should classify the original problem query."""
-        result = query_classifier.detect_query_type("what are the five most recent uber eats mails?")
-        # This was the original problem query - should be filtered-temporal or sender
-        assert result in ("filtered-temporal", "search-by-sender", "aggregation")
-
-
-class TestDetectQueryTypeSemantic:
-    """Tests for semantic query detection."""
-
-    def test_detect_about_topic(self, query_classifier):
-        """Should classify general topic queries as semantic."""
-        result = query_classifier.detect_query_type("emails about budget planning")
-        # LLM classification can vary
-        assert result in ("semantic", "classification", "aggregation")
-
-    def test_detect_regarding_topic(self, query_classifier):
-        """Should classify 'regarding' queries."""
-        result = query_classifier.detect_query_type("regarding the meeting next week")
-        assert result in ("semantic", "conversation", "classification")
-
-
-class TestParseClassification:
-    """Tests for _parse_classification method."""
-
-    def test_parse_direct_type(self, query_classifier):
-        """Should parse direct type names."""
-        assert query_classifier._parse_classification("conversation") == "conversation"
-        assert query_classifier._parse_classification("aggregation") == "aggregation"
-        assert query_classifier._parse_classification("semantic") == "semantic"
-
-    def test_parse_with_answer_is_prefix(self, query_classifier):
-        """Should extract type from 'the answer is X' responses."""
-        result = query_classifier._parse_classification('the answer is "conversation"')
-        assert result == "conversation"
-
-    def test_parse_with_sure_prefix(self, query_classifier):
-        """Should extract type from verbose responses."""
-        result = query_classifier._parse_classification('sure, the answer is "aggregation"')
-        assert result == "aggregation"
-
-    def test_parse_recent_maps_to_filtered_temporal(self, query_classifier):
-        """Should map 'recent' to filtered-temporal."""
-        result = query_classifier._parse_classification("recent")
-        assert result == "filtered-temporal"
-
-    def test_parse_latest_maps_to_filtered_temporal(self, query_classifier):
-        """Should map 'latest' to filtered-temporal."""
-        result = query_classifier._parse_classification("latest")
-        assert result == "filtered-temporal"
-
-    def test_parse_count_maps_to_aggregation(self, query_classifier):
-        """Should map 'count' to aggregation."""
-        result = query_classifier._parse_classification("count")
-        assert result == "aggregation"
-
-    def test_parse_with_underscore_normalization(self, query_classifier):
-        """Should normalize underscores to hyphens."""
-        result = query_classifier._parse_classification("filtered_temporal")
-        assert result == "filtered-temporal"
-
-    def test_parse_unknown_defaults_to_semantic(self, query_classifier):
-        """Should default to semantic for unknown types."""
-        result = query_classifier._parse_classification("unknown_type_xyz")
-        assert result == "semantic"
-
-    def test_parse_empty_string(self, query_classifier):
-        """Should handle empty string gracefully."""
-        result = query_classifier._parse_classification("")
-        assert result == "semantic"
-
-    def test_parse_strips_punctuation(self, query_classifier):
-        """Should strip punctuation from response."""
-        result = query_classifier._parse_classification("conversation.")
-        assert result == "conversation"
-        
-        result = query_classifier._parse_classification("aggregation,")
-        assert result == "aggregation"
-
-
-class TestFallbackClassification:
-    """Tests for _fallback_classification method."""
-
-    def test_fallback_hello(self, query_classifier):
-        """Should classify hello as conversation."""
-        result = query_classifier._fallback_classification("hello there")
-        assert result == "conversation"
-
-    def test_fallback_thanks(self, query_classifier):
-        """Should classify thanks as conversation."""
-        result = query_classifier._fallback_classification("thank you very much")
-        assert result == "conversation"
-
-    def test_fallback_how_many(self, query_classifier):
-        """Should classify 'how many' as aggregation."""
-        result = query_classifier._fallback_classification("how many uber emails")
-        assert result == "aggregation"
-
-    def test_fallback_count(self, query_classifier):
-        """Should classify 'count' as aggregation."""
-        result = query_classifier._fallback_classification("count my emails")
-        assert result == "aggregation"
-
-    def test_fallback_recent_with_topic(self, query_classifier):
-        """Should classify 'recent [topic]' as filtered-temporal."""
-        result = query_classifier._fallback_classification("recent uber emails")
-        assert result == "filtered-temporal"
-
-    def test_fallback_latest_with_topic(self, query_classifier):
-        """Should classify 'latest [topic]' as filtered-temporal."""
-        result = query_classifier._fallback_classification("latest amazon orders")
-        assert result == "filtered-temporal"
-
-    def test_fallback_recent_alone(self, query_classifier):
-        """Should classify 'recent' alone as temporal."""
-        result = query_classifier._fallback_classification("recent emails")
-        # 'emails' alone doesn't have content filter, but 'recent' without specific topic
-        # fallback logic checks for both temporal AND content filter
-        # Since 'emails' is common, it should be temporal
-        assert result in ("temporal", "filtered-temporal")
 
-    def test_fallback_default_semantic(self, query_classifier):
-        """Should default to semantic for unrecognized patterns."""
-        result = query_classifier._fallback_classification("what did john say about the project")
-        assert result == "semantic"
+# (raw LLM response, expected query type) for _parse_classification
+PARSE_CASES = [
+    pytest.param("conversation", "conversation", id="direct_conversation"),
+    pytest.param("aggregation", "aggregation", id="direct_aggregation"),
+    pytest.param("semantic", "semantic", id="direct_semantic"),
+    pytest.param('the answer is "conversation"', "conversation", id="answer_is_prefix"),
+    pytest.param('sure, the answer is "aggregation"', "aggregation", id="verbose_prefix"),
+    pytest.param('I think "filtered-temporal" fits best', "filtered-temporal", id="type_inside_sentence"),
+    pytest.param("recent", "filtered-temporal", id="recent_maps_to_filtered_temporal"),
+    pytest.param("latest", "filtered-temporal", id="latest_maps_to_filtered_temporal"),
+    pytest.param("count", "aggregation", id="count_maps_to_aggregation"),
+    pytest.param("filtered_temporal", "filtered-temporal", id="underscore_normalization"),
+    pytest.param("unknown_type_xyz", "semantic", id="unknown_defaults_to_semantic"),
+    pytest.param("", "semantic", id="empty_string"),
+    pytest.param("conversation.", "conversation", id="strips_trailing_period"),
+    pytest.param("aggregation,", "aggregation", id="strips_trailing_comma"),
+]
+
+
+@pytest.mark.parametrize("response, expected", PARSE_CASES)
+def test_parse_classification(query_classifier, response, expected):
+    """LLM responses should be normalized to a single query type."""
+    assert query_classifier._parse_classification(response) == expected
+
+
+# (question, acceptable types) for the heuristic _fallback_classification
+FALLBACK_CASES = [
+    pytest.param("hello there", {"conversation"}, id="hello"),
+    pytest.param("thank you very much", {"conversation"}, id="thanks"),
+    pytest.param("how many uber emails", {"aggregation"}, id="how_many"),
+    pytest.param("count my emails", {"aggregation"}, id="count"),
+    pytest.param("recent uber emails", {"filtered-temporal"}, id="recent_with_topic"),
+    pytest.param("latest amazon orders", {"filtered-temporal"}, id="latest_with_topic"),
+    # 'recent' without a specific topic; 'emails' alone isn't a content filter
+    pytest.param("recent emails", {"temporal", "filtered-temporal"}, id="recent_alone"),
+    pytest.param("what did john say about the project", {"semantic"}, id="default_semantic"),
+]
+
+
+@pytest.mark.parametrize("question, expected", FALLBACK_CASES)
+def test_fallback_classification(query_classifier, question, expected):
+    """Heuristic classification used when the LLM is unavailable."""
+    assert query_classifier._fallback_classification(question) in expected
 
 
 class TestEdgeCases:
@@ -362,77 +272,65 @@ class TestEdgeCases:
         result = query_classifier.detect_query_type("how many emails?")
         assert result in ("aggregation", "semantic")
 
-    def test_empty_query(self, query_classifier):
-        """Should handle empty queries gracefully."""
-        result = query_classifier.detect_query_type("")
-        # Should return some valid type
-        assert result in query_classifier.VALID_TYPES
-
-    def test_whitespace_only(self, query_classifier):
-        """Should handle whitespace-only queries."""
-        result = query_classifier.detect_query_type("   ")
-        assert result in query_classifier.VALID_TYPES
-
-    def test_very_long_query(self, query_classifier):
-        """Should handle very long queries."""
-        long_query = "show me all the emails " * 50
-        result = query_classifier.detect_query_type(long_query)
-        assert result in query_classifier.VALID_TYPES
-
-    def test_special_characters(self, query_classifier):
-        """Should handle queries with special characters."""
-        result = query_classifier.detect_query_type("emails from test@example.com")
-        assert result in query_classifier.VALID_TYPES
-
-
-class TestIntentBasedClassification:
-    """Test intent-based classification (pronouns should not change query type)."""
-
-    def test_contextual_aggregation_intent(self, query_classifier):
-        """Contextual query 'of those, how many' should be aggregation (intent: count)."""
-        result = query_classifier.detect_query_type("of those, how many are from work")
-        # Intent is COUNT/aggregation, not semantic search
-        assert result in ["aggregation", "semantic"]
-
-    def test_contextual_classification_intent(self, query_classifier):
-        """Contextual query 'of those, which are spam' should be classification (intent: categorize)."""
-        result = query_classifier.detect_query_type("of those, which are spam")
-        # Intent is CATEGORIZE/classification, not semantic
-        assert result in ["classification", "semantic"]
-
-    def test_contextual_classification_receipts(self, query_classifier):
-        """Contextual query 'from them, show receipts' should be classification (intent: filter by type)."""
-        result = query_classifier.detect_query_type("from them, show me receipts")
-        # Intent is FILTER/classification, not search-by-sender
-        assert result in ["classification", "semantic"]
-
-    def test_contextual_without_pronoun_classification(self, query_classifier):
-        """Query 'which are interviews' should be classification regardless of context."""
-        result = query_classifier.detect_query_type("which are interviews")
-        # Intent is CATEGORIZE/classification
-        assert result in ["classification", "semantic"]
+    @pytest.mark.parametrize("query", [
+        pytest.param("", id="empty"),
+        pytest.param("   ", id="whitespace_only"),
+        pytest.param("show me all the emails " * 50, id="very_long"),
+        pytest.param("emails from test@example.com", id="special_characters"),
+    ])
+    def test_unusual_input_returns_valid_type(self, query_classifier, query):
+        """Should handle degenerate or unusual queries gracefully."""
+        assert query_classifier.detect_query_type(query) in query_classifier.VALID_TYPES
+
+    def test_blank_query_is_semantic_without_llm(self):
+        """Blank queries default to semantic without asking the LLM."""
+        llm = MagicMock()
+        classifier = QueryClassifier(llm)
+        assert classifier.detect_query_type(" \n ") == "semantic"
+        llm.llm.invoke.assert_not_called()
+
+
+# Contextual phrasing (pronouns, "of those") should not change the intent
+INTENT_CASES = [
+    pytest.param("of those, how many are from work", {"aggregation", "semantic"}, id="aggregation_intent"),
+    pytest.param("of those, which are spam", {"classification", "semantic"}, id="classification_intent"),
+    pytest.param("from them, show me receipts", {"classification", "semantic"}, id="classification_receipts"),
+    pytest.param("which are interviews", {"classification", "semantic"}, id="classification_without_pronoun"),
+]
+
+
+@pytest.mark.parametrize("query, expected", INTENT_CASES)
+def test_intent_based_classification(query_classifier, query, expected):
+    """Pronouns referring to earlier results should not change the query type."""
+    assert query_classifier.detect_query_type(query) in expected
+
+
+_VALID_TYPES = QueryClassifier.VALID_TYPES
+
+# (query, allowed types). The expected types are unioned with VALID_TYPES
+# up front since the rules provider may land on any valid type.
+COMMON_QUERY_CASES = [
+    (query, frozenset(expected) | _VALID_TYPES)
+    for query, expected in [
+        ("hey there", {"conversation"}),
+        ("hi", {"conversation"}),
+        ("help me", {"conversation"}),
+        ("how many emails", {"aggregation", "semantic"}),
+        ("show me uber emails", {"search-by-sender", "aggregation", "semantic", "filtered-temporal"}),
+        ("latest messages", {"temporal", "filtered-temporal", "semantic"}),
+        ("emails about meetings", {"semantic", "classification", "aggregation"}),
+    ]
+]
 
 
 class TestQueryClassifierIntegration:
     """Integration tests for common query patterns."""
 
-    def test_common_user_queries(self, query_classifier):
+    @pytest.mark.parametrize("query, allowed", COMMON_QUERY_CASES)
+    def test_common_user_queries(self, query_classifier, query, allowed):
         """Test classification of common user queries."""
-        queries_and_valid_types = [
-            ("hey there", {"conversation"}),
-            ("hi", {"conversation"}),
-            ("help me", {"conversation"}),
-            ("how many emails", {"aggregation", "semantic"}),
-            ("show me uber emails", {"search-by-sender", "aggregation", "semantic", "filtered-temporal"}),
-            ("latest messages", {"temporal", "filtered-temporal", "semantic"}),
-            ("emails about meetings", {"semantic", "classification", "aggregation"}),
-        ]
-        
-        for query, valid_types in queries_and_valid_types:
-            result = query_classifier.detect_query_type(query)
-            # Use VALID_TYPES as fallback if specific assertion fails with rules provider
-            assert result in valid_types or result in query_classifier.VALID_TYPES, \
-                f"Query '{query}' got {result}, expected one of {valid_types}"
+        result = query_classifier.detect_query_type(query)
+        assert result in allowed, f"Query '{query}' got {result}, expected one of {sorted(allowed)}"
 
     def test_all_returned_types_are_valid(self, query_classifier):
         """Ensure all returned types are in VALID_TYPES."""
@@ -444,5 +342,5 @@ class TestQueryClassifierIntegration:
         
         for query in test_queries:
             result = query_classifier.detect_query_type(query)
-            assert result in query_classifier.VALID_TYPES, \
+            assert result in _VALID_TYPES, \
                 f"Query '{query[:50]}' returned invalid type: {result}"
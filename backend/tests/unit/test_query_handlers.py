@@ -9,39 +9,109 @@ Tests all 7 query handlers:
 - TemporalHandler
 - SemanticHandler
 """
-import os
 import pytest
-from unittest.mock import Mock, patch, MagicMock
-
-# Set rules provider BEFORE imports
-os.environ["LLM_PROVIDER"] = "rules"
-os.environ.pop("OPENAI_API_KEY", None)
-os.environ.pop("ANTHROPIC_API_KEY", None)
-os.environ.pop("OLLAMA_HOST", None)
-os.environ.pop("ORGANIZE_MAIL_LLM_CMD", None)
-
-from src.services.query_handlers.conversation import ConversationHandler
-from src.services.query_handlers.aggregation import AggregationHandler
-from src.services.query_handlers.sender import SenderHandler
-from src.services.query_handlers.attachment import AttachmentHandler
-from src.services.query_handlers.classification import ClassificationHandler
-from src.services.query_handlers.temporal import TemporalHandler
-from src.services.query_handlers.semantic import SemanticHandler
+from unittest.mock import patch
+
+from src.services.query_handlers import (
+    ConversationHandler,
+    AggregationHandler,
+    SenderHandler,
+    AttachmentHandler,
+    ClassificationHandler,
+    TemporalHandler,
+    SemanticHandler,
+)
+from src.services.context_builder import ContextBuilder
 from src.models.message import MailMessage
+from src.storage.memory_storage import InMemoryStorage
+from tests.unit.fixtures_common import make_email, make_sample_storage
+
+pytestmark = pytest.mark.usefixtures("no_llm_api_env")
+
+
+class FakeVectorStorage(InMemoryStorage):
+    """InMemoryStorage whose similarity_search returns canned results.
+
+    Set ``results`` to the (message, score) tuples to return; each call is
+    appended to ``search_calls`` as a ``(method_name, kwargs)`` tuple.
+    """
+
+    def __init__(self, results=None):
+        super().__init__()
+        self.results = results or []
+        self.search_calls = []
+
+    def similarity_search(self, **kwargs):
+        self.search_calls.append(("similarity_search", kwargs))
+        return self.results
+
+
+class FakeHybridStorage(FakeVectorStorage):
+    """FakeVectorStorage that also offers hybrid_search, as Postgres does."""
+
+    def hybrid_search(self, **kwargs):
+        self.search_calls.append(("hybrid_search", kwargs))
+        return self.results
+
+
+@pytest.fixture(scope="module")
+def shared_dependencies(llm_processor):
+    """Handler dependencies over the sample emails, shared by read-only tests.
+
+    Tests that add messages or replace storage methods directly should use
+    the function-scoped ``handler_dependencies`` instead.
+    """
+    return {
+        "storage": make_sample_storage(),
+        "llm": llm_processor,
+        "context_builder": ContextBuilder(),
+    }
+
+
+@pytest.fixture(scope="module")
+def conversation_handler(shared_dependencies):
+    return ConversationHandler(**shared_dependencies)
+
+
+@pytest.fixture(scope="module")
+def aggregation_handler(shared_dependencies):
+    return AggregationHandler(**shared_dependencies)
+
+
+@pytest.fixture(scope="module")
+def sender_handler(shared_dependencies):
+    return SenderHandler(**shared_dependencies)
+
+
+@pytest.fixture(scope="module")
+def attachment_handler(shared_dependencies):
+    return AttachmentHandler(**shared_dependencies)
+
+
+@pytest.fixture(scope="module")
+def classification_handler(shared_dependencies):
+    return ClassificationHandler(**shared_dependencies)
+
+
+@pytest.fixture(scope="module")
+def temporal_handler(shared_dependencies):
+    return TemporalHandler(**shared_dependencies)
 
 
 class TestConversationHandler:
     """Tests for ConversationHandler."""
 
-    def test_handle_greeting_hello(self, handler_dependencies):
-        """Should respond to 'hello' with a greeting."""
-        handler = ConversationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("hello")
+    @pytest.mark.parametrize("query", [
+        pytest.param("hello", id="greeting_hello"),
+        pytest.param("hi", id="greeting_hi"),
+        pytest.param("thanks!", id="thanks"),
+        pytest.param("help", id="help_request"),
+        # Generic response for unknown conversational input
+        pytest.param("random conversational input", id="fallback_response"),
+    ])
+    def test_handle_conversation(self, conversation_handler, query):
+        """Should answer conversational input directly, without email sources."""
+        result = conversation_handler.handle(query)
         
         assert result['query_type'] == 'conversation'
         assert result['confidence'] == 'high'
@@ -49,165 +119,65 @@ class TestConversationHandler:
         # Fallback response should contain helpful text
         assert result['answer']  # Not empty
 
-    def test_handle_greeting_hi(self, handler_dependencies):
-        """Should respond to 'hi' with a greeting."""
-        handler = ConversationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("hi")
-        
-        assert result['query_type'] == 'conversation'
-        assert 'sources' in result
-        assert result['answer']  # Not empty
-
-    def test_handle_thanks(self, handler_dependencies):
-        """Should respond politely to thanks."""
-        handler = ConversationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("thanks!")
-        
-        assert result['query_type'] == 'conversation'
-        # Response should have some content
-        assert result['answer']
-
-    def test_handle_help_request(self, handler_dependencies):
-        """Should provide help information."""
-        handler = ConversationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("help")
-        
-        assert result['query_type'] == 'conversation'
-        # Help response should have content
-        assert result['answer']
-
-    def test_fallback_response(self, handler_dependencies):
-        """Should provide a generic response for unknown conversational input."""
-        handler = ConversationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("random conversational input")
-        
-        assert result['query_type'] == 'conversation'
-        assert result['answer']  # Should have some response
-
 
 class TestAggregationHandler:
     """Tests for AggregationHandler."""
 
-    def test_handle_total_count(self, handler_dependencies):
+    def test_handle_total_count(self, aggregation_handler):
         """Should return total email count."""
-        handler = AggregationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("how many total emails do I have?")
+        result = aggregation_handler.handle("how many total emails do I have?")
         
         assert result['query_type'] == 'aggregation'
         assert result['confidence'] == 'high'
         # Should mention the count (10 emails in sample_emails fixture)
         assert '10' in result['answer']
 
-    def test_handle_unread_count(self, handler_dependencies):
+    def test_handle_unread_count(self, aggregation_handler):
         """Should return unread email count."""
-        handler = AggregationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("how many unread emails do I have?")
+        result = aggregation_handler.handle("how many unread emails do I have?")
         
         assert result['query_type'] == 'aggregation'
         # Should mention unread count (3 unread in sample_emails)
         assert '3' in result['answer']
 
-    def test_handle_topic_count_uber(self, handler_dependencies):
+    def test_handle_topic_count_uber(self, aggregation_handler):
         """Should count emails by topic."""
-        handler = AggregationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("how many uber emails do I have?")
+        result = aggregation_handler.handle("how many uber emails do I have?")
         
         assert result['query_type'] == 'aggregation'
         # Should return some answer (topic extraction may vary with rules provider)
         assert result['answer']
 
-    def test_handle_daily_stats(self, handler_dependencies):
+    def test_handle_daily_stats(self, aggregation_handler):
         """Should return daily email statistics."""
-        handler = AggregationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("how many emails do I get per day?")
+        result = aggregation_handler.handle("how many emails do I get per day?")
         
         assert result['query_type'] == 'aggregation'
         assert 'day' in result['answer'].lower() or 'average' in result['answer'].lower()
 
-    def test_handle_top_senders(self, handler_dependencies):
+    def test_handle_top_senders(self, aggregation_handler):
         """Should return top email senders."""
-        handler = AggregationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("who emails me most?")
+        result = aggregation_handler.handle("who emails me most?")
         
         assert result['query_type'] == 'aggregation'
         # Should list senders
         assert '@' in result['answer'] or 'sender' in result['answer'].lower()
 
-    def test_extract_topic_cleanup(self, handler_dependencies):
+    @pytest.mark.parametrize("input_topic,expected", [
+        ("uber", "uber"),
+        ("Uber", "Uber"),
+        ("**uber**", "uber"),
+        ("topic: uber", "uber"),
+        ("the topic is uber", "uber"),
+    ])
+    def test_extract_topic_cleanup(self, aggregation_handler, input_topic, expected):
         """Should clean up verbose LLM topic responses."""
-        handler = AggregationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        # Test the cleanup logic
-        test_cases = [
-            ("uber", "uber"),
-            ("Uber", "Uber"),
-            ("**uber**", "uber"),
-            ("topic: uber", "uber"),
-            ("the topic is uber", "uber"),
-        ]
-        
-        for input_topic, expected in test_cases:
-            cleaned = handler._clean_topic_response(input_topic)
-            assert expected.lower() in cleaned.lower(), f"Failed for input: {input_topic}"
+        cleaned = aggregation_handler._clean_topic_response(input_topic)
+        assert expected.lower() in cleaned.lower()
 
-    def test_handle_generic_aggregation(self, handler_dependencies):
+    def test_handle_generic_aggregation(self, aggregation_handler):
         """Should handle generic aggregation queries gracefully."""
-        handler = AggregationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("email statistics")
+        result = aggregation_handler.handle("email statistics")
         
         assert result['query_type'] == 'aggregation'
         assert result['answer']
@@ -216,82 +186,53 @@ class TestAggregationHandler:
 class TestSenderHandler:
     """Tests for SenderHandler."""
 
-    def test_handle_search_by_sender_uber(self, handler_dependencies):
+    def test_handle_search_by_sender_uber(self, sender_handler):
         """Should find emails from uber."""
-        handler = SenderHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("show me all emails from uber")
+        result = sender_handler.handle("show me all emails from uber")
         
         assert result['query_type'] == 'search-by-sender'
         # Should find uber emails
         if result['sources']:
             assert any('uber' in s.get('from', '').lower() for s in result['sources'])
 
-    def test_handle_search_by_sender_amazon(self, handler_dependencies):
+    def test_handle_search_by_sender_amazon(self, sender_handler):
         """Should find emails from amazon."""
-        handler = SenderHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("emails from amazon")
+        result = sender_handler.handle("emails from amazon")
         
         assert result['query_type'] == 'search-by-sender'
         # Should find amazon emails
         if result['sources']:
             assert any('amazon' in s.get('from', '').lower() for s in result['sources'])
 
-    def test_handle_no_matching_sender(self, handler_dependencies):
+    def test_handle_no_matching_sender(self, sender_handler):
         """Should handle when no emails match sender."""
-        handler = SenderHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("emails from nonexistent@nowhere.com")
+        result = sender_handler.handle("emails from nonexistent@nowhere.com")
         
         assert result['query_type'] == 'search-by-sender'
         assert result['confidence'] == 'none' or "couldn't find" in result['answer'].lower()
         assert result['sources'] == []
 
-    def test_extract_number_from_query(self, handler_dependencies):
+    def test_extract_number_from_query(self, sender_handler):
         """Should extract numbers from queries like 'last 10 emails'."""
-        handler = SenderHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
         # Test various number extraction patterns
-        assert handler._extract_number_from_query("what are my last 10 ubereats mail") == 10
-        assert handler._extract_number_from_query("show me 20 amazon emails") == 20
-        assert handler._extract_number_from_query("get 5 messages from linkedin") == 5
-        assert handler._extract_number_from_query("latest 15 github emails") == 15
-        assert handler._extract_number_from_query("recent 3 notifications") == 3
+        assert sender_handler._extract_number_from_query("what are my last 10 ubereats mail") == 10
+        assert sender_handler._extract_number_from_query("show me 20 amazon emails") == 20
+        assert sender_handler._extract_number_from_query("get 5 messages from linkedin") == 5
+        assert sender_handler._extract_number_from_query("latest 15 github emails") == 15
+        assert sender_handler._extract_number_from_query("recent 3 notifications") == 3
         
         # No number specified
-        assert handler._extract_number_from_query("show me uber emails") is None
+        assert sender_handler._extract_number_from_query("show me uber emails") is None
         
         # Out of range (too large)
-        assert handler._extract_number_from_query("last 200 emails") is None
+        assert sender_handler._extract_number_from_query("last 200 emails") is None
         
         # Zero or negative
-        assert handler._extract_number_from_query("last 0 emails") is None
+        assert sender_handler._extract_number_from_query("last 0 emails") is None
 
-    def test_handle_respects_extracted_limit(self, handler_dependencies):
+    def test_handle_respects_extracted_limit(self, sender_handler, monkeypatch):
         """Should use extracted number as limit when specified in query."""
-        storage = handler_dependencies['storage']
-        handler = SenderHandler(
-            storage=storage,
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
+        storage = sender_handler.storage
         
         # Mock the search to track what limit was requested
         original_search = storage.search_by_sender
@@ -302,30 +243,22 @@ class TestSenderHandler:
             called_with_limit = limit
             return original_search(sender, limit=limit)
         
-        storage.search_by_sender = track_limit
+        # monkeypatch restores the shared storage after the test
+        monkeypatch.setattr(storage, "search_by_sender", track_limit)
         
         # Query with "last 10"
-        handler.handle("what are my last 10 ubereats mail")
+        sender_handler.handle("what are my last 10 ubereats mail")
         
         # Should have extracted 10 and used it as limit
         assert called_with_limit == 10
-        
-        # Restore original
-        storage.search_by_sender = original_search
 
 
 class TestAttachmentHandler:
     """Tests for AttachmentHandler."""
 
-    def test_handle_find_attachments(self, handler_dependencies):
+    def test_handle_find_attachments(self, attachment_handler):
         """Should find emails with attachments."""
-        handler = AttachmentHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("show me emails with attachments")
+        result = attachment_handler.handle("show me emails with attachments")
         
         assert result['query_type'] == 'search-by-attachment'
         # Should find emails with attachments (4 in sample_emails)
@@ -335,13 +268,7 @@ class TestAttachmentHandler:
     def test_handle_no_attachments(self, empty_storage, llm_processor, context_builder):
         """Should handle when no emails have attachments."""
         # Add email without attachment
-        email = MailMessage(
-            id="test1",
-            from_="test@example.com",
-            subject="No attachment",
-            snippet="Plain email",
-            has_attachments=False,
-        )
+        email = make_email("test1", "No attachment", "test@example.com", "Plain email", 1733050800)
         empty_storage.save_message(email)
         
         handler = AttachmentHandler(
@@ -360,42 +287,24 @@ class TestAttachmentHandler:
 class TestClassificationHandler:
     """Tests for ClassificationHandler."""
 
-    def test_handle_finance_label(self, handler_dependencies):
+    def test_handle_finance_label(self, classification_handler):
         """Should find emails with finance label."""
-        handler = ClassificationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("show me my finance emails")
+        result = classification_handler.handle("show me my finance emails")
         
         assert result['query_type'] == 'classification'
         # Should return a result (may or may not find finance emails depending on label matching)
         assert 'answer' in result
         assert 'sources' in result
 
-    def test_handle_work_label(self, handler_dependencies):
+    def test_handle_work_label(self, classification_handler):
         """Should find emails with work label."""
-        handler = ClassificationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("show me work emails")
+        result = classification_handler.handle("show me work emails")
         
         assert result['query_type'] == 'classification'
 
-    def test_handle_unknown_label(self, handler_dependencies):
+    def test_handle_unknown_label(self, classification_handler):
         """Should handle unknown classification labels."""
-        handler = ClassificationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("show me my xyz123 emails")
+        result = classification_handler.handle("show me my xyz123 emails")
         
         assert result['query_type'] == 'classification'
         # Should indicate no match or empty results
@@ -405,71 +314,41 @@ class TestClassificationHandler:
 class TestTemporalHandler:
     """Tests for TemporalHandler."""
 
-    def test_handle_pure_temporal_latest(self, handler_dependencies):
+    def test_handle_pure_temporal_latest(self, temporal_handler):
         """Should return latest emails for pure temporal query."""
-        handler = TemporalHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("show me my latest emails")
+        result = temporal_handler.handle("show me my latest emails")
         
         assert result['query_type'] == 'temporal'
         # With rules provider, may have sources or not depending on LLM response
         assert 'sources' in result
         assert 'answer' in result
 
-    def test_handle_pure_temporal_recent(self, handler_dependencies):
+    def test_handle_pure_temporal_recent(self, temporal_handler):
         """Should return recent emails."""
-        handler = TemporalHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle("recent messages")
+        result = temporal_handler.handle("recent messages")
         
         assert result['query_type'] == 'temporal'
         assert 'sources' in result
 
-    def test_handle_filtered_temporal_uber(self, handler_dependencies):
+    def test_handle_filtered_temporal_uber(self, temporal_handler):
         """Should return recent uber emails for filtered-temporal query."""
-        handler = TemporalHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle_filtered("most recent uber emails")
+        result = temporal_handler.handle_filtered("most recent uber emails")
         
         assert result['query_type'] == 'filtered-temporal'
         # Should have response structure
         assert 'sources' in result
         assert 'answer' in result
 
-    def test_handle_filtered_temporal_amazon(self, handler_dependencies):
+    def test_handle_filtered_temporal_amazon(self, temporal_handler):
         """Should return recent amazon emails."""
-        handler = TemporalHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        result = handler.handle_filtered("latest amazon orders")
+        result = temporal_handler.handle_filtered("latest amazon orders")
         
         assert result['query_type'] == 'filtered-temporal'
         assert 'answer' in result
 
-    def test_extract_keywords_fallback(self, handler_dependencies):
+    def test_extract_keywords_fallback(self, temporal_handler):
         """Should extract keywords using fallback when LLM fails."""
-        handler = TemporalHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        keywords = handler._extract_keywords_fallback("recent uber eats orders")
+        keywords = temporal_handler._extract_keywords_fallback("recent uber eats orders")
         
         assert len(keywords) > 0
         assert any('uber' in kw.lower() for kw in keywords) or any('eats' in kw.lower() for kw in keywords)
@@ -491,270 +370,124 @@ class TestTemporalHandler:
 class TestSemanticHandler:
     """Tests for SemanticHandler with mocked embeddings."""
 
-    def test_handle_no_embedder(self, handler_dependencies):
+    @pytest.fixture(autouse=True)
+    def no_cross_encoder(self):
+        """Skip reranking; these tests cover retrieval and response shape.
+
+        Reranking itself is tested in test_hybrid_search.py with a mocked model.
+        """
+        with patch('src.services.query_handlers.semantic.get_cross_encoder', return_value=None):
+            yield
+
+    @pytest.fixture
+    def semantic_handler(self, handler_dependencies):
+        """SemanticHandler over the mock embedder; tests swap in a fake storage."""
+        return SemanticHandler(**handler_dependencies)
+
+    def test_handle_no_embedder(self, semantic_handler):
         """Should handle missing embedder gracefully."""
-        handler = SemanticHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-            embedder=None,  # No embedder
-        )
+        semantic_handler.embedder = None
         
-        result = handler.handle("search for budget discussions")
+        result = semantic_handler.handle("search for budget discussions")
         
         assert result['query_type'] == 'semantic'
         assert result['confidence'] == 'none'
         assert 'not available' in result['answer'].lower()
 
-    def test_handle_with_mock_embedder(self, handler_dependencies):
+    def test_handle_with_mock_embedder(self, semantic_handler):
         """Should use embedder and storage for hybrid search."""
-        mock_embedder = handler_dependencies['embedder']
-        storage = handler_dependencies['storage']
-        
-        # Mock hybrid_search to return some emails
-        email = MailMessage(
-            id="test1",
-            from_="test@example.com",
-            subject="Budget Discussion",
-            snippet="Let's talk about the Q4 budget",
-            internal_date=1733050800000,
+        email = make_email(
+            "test1", "Budget Discussion", "test@example.com", "Let's talk about the Q4 budget", 1733050800
         )
-        storage.save_message(email)
+        semantic_handler.storage = FakeHybridStorage([(email, 0.85)])
         
-        # Add hybrid_search method to mock storage
-        mock_results = [(email, 0.85)]
-        storage.hybrid_search = Mock(return_value=mock_results)
-        
-        handler = SemanticHandler(
-            storage=storage,
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-            embedder=mock_embedder,
-        )
-        
-        result = handler.handle("budget discussions")
+        result = semantic_handler.handle("budget discussions")
         
         assert result['query_type'] == 'semantic'
         # Embedder should have been called
-        mock_embedder.embed_text.assert_called_once()
+        semantic_handler.embedder.embed_text.assert_called_once()
         # Storage hybrid_search should have been called
-        storage.hybrid_search.assert_called_once()
+        calls = semantic_handler.storage.search_calls
+        assert [name for name, _ in calls] == ["hybrid_search"]
 
-    def test_handle_no_results(self, handler_dependencies):
+    def test_handle_no_results(self, semantic_handler):
         """Should handle when hybrid search returns no results."""
-        mock_embedder = handler_dependencies['embedder']
-        storage = handler_dependencies['storage']
-        
-        # Mock empty results
-        storage.hybrid_search = Mock(return_value=[])
+        semantic_handler.storage = FakeHybridStorage([])
         
-        handler = SemanticHandler(
-            storage=storage,
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-            embedder=mock_embedder,
-        )
-        
-        result = handler.handle("something that doesn't exist")
+        result = semantic_handler.handle("something that doesn't exist")
         
         assert result['query_type'] == 'semantic'
         assert result['confidence'] == 'none'
         assert "couldn't find" in result['answer'].lower()
 
-    def test_confidence_levels_high(self, handler_dependencies):
-        """Should return high confidence for high similarity scores."""
-        mock_embedder = handler_dependencies['embedder']
-        storage = handler_dependencies['storage']
-        
-        email = MailMessage(
-            id="test_high",
-            from_="test@example.com",
-            subject="Test",
-            snippet="Test content",
-            internal_date=1733050800000,
-        )
-        storage.save_message(email)
+    @pytest.mark.parametrize("score, expected", [
+        pytest.param(0.9, 'high', id="high"),
+        pytest.param(0.7, 'medium', id="medium"),
+        pytest.param(0.55, 'low', id="low"),
+    ])
+    def test_confidence_levels(self, semantic_handler, sample_message, score, expected):
+        """Confidence should follow the top similarity score."""
+        semantic_handler.storage = FakeHybridStorage([(sample_message, score)])
         
-        # High similarity score
-        storage.hybrid_search = Mock(return_value=[(email, 0.9)])
-        
-        handler = SemanticHandler(
-            storage=storage,
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-            embedder=mock_embedder,
-        )
-        
-        result = handler.handle("test query")
+        result = semantic_handler.handle("test query")
         
         # With rules provider, LLM answer generation may fail, resulting in 'none'
-        # If it succeeds, confidence should be 'high' for score 0.9
-        assert result['confidence'] in ('high', 'none')
-
-    def test_confidence_levels_medium(self, handler_dependencies):
-        """Should return medium confidence for medium similarity scores."""
-        mock_embedder = handler_dependencies['embedder']
-        storage = handler_dependencies['storage']
-        
-        email = MailMessage(
-            id="test_medium",
-            from_="test@example.com",
-            subject="Test",
-            snippet="Test content",
-            internal_date=1733050800000,
-        )
-        storage.save_message(email)
-        
-        # Medium similarity score
-        storage.hybrid_search = Mock(return_value=[(email, 0.7)])
-        
-        handler = SemanticHandler(
-            storage=storage,
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-            embedder=mock_embedder,
-        )
-        
-        result = handler.handle("test query")
-        
-        # With rules provider, LLM answer generation may fail
-        assert result['confidence'] in ('medium', 'none')
+        assert result['confidence'] in (expected, 'none')
 
-    def test_confidence_levels_low(self, handler_dependencies):
-        """Should return low confidence for low similarity scores."""
-        mock_embedder = handler_dependencies['embedder']
-        storage = handler_dependencies['storage']
-        
-        email = MailMessage(
-            id="test_low",
-            from_="test@example.com",
-            subject="Test",
-            snippet="Test content",
-            internal_date=1733050800000,
-        )
-        storage.save_message(email)
-        
-        # Low similarity score
-        storage.hybrid_search = Mock(return_value=[(email, 0.55)])
-        
-        handler = SemanticHandler(
-            storage=storage,
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-            embedder=mock_embedder,
-        )
-        
-        result = handler.handle("test query")
-        
-        # With rules provider, LLM answer generation may fail
-        assert result['confidence'] in ('low', 'none')
-
-    def test_handle_embedding_error(self, handler_dependencies):
+    def test_handle_embedding_error(self, semantic_handler):
         """Should handle embedding errors gracefully."""
-        mock_embedder = handler_dependencies['embedder']
-        mock_embedder.embed_text.side_effect = Exception("Embedding failed")
-        
-        handler = SemanticHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-            embedder=mock_embedder,
-        )
+        semantic_handler.embedder.embed_text.side_effect = Exception("Embedding failed")
         
-        result = handler.handle("test query")
+        result = semantic_handler.handle("test query")
         
         assert result['query_type'] == 'semantic'
         assert result['confidence'] == 'none'
         assert 'error' in result['answer'].lower()
 
-    def test_fallback_to_vector_search(self, handler_dependencies):
+    def test_fallback_to_vector_search(self, semantic_handler):
         """Should fallback to similarity_search when hybrid_search not available."""
-        mock_embedder = handler_dependencies['embedder']
-        storage = handler_dependencies['storage']
-        
-        email = MailMessage(
-            id="test_fallback",
-            from_="test@example.com",
-            subject="Fallback Test",
-            snippet="Testing fallback to vector search",
-            internal_date=1733050800000,
+        email = make_email(
+            "test_fallback", "Fallback Test", "test@example.com", "Testing fallback to vector search", 1733050800
         )
-        storage.save_message(email)
+        # No hybrid_search method - simulate old storage backend
+        storage = FakeVectorStorage([(email, 0.8)])
+        semantic_handler.storage = storage
         
-        # Don't add hybrid_search method - simulate old storage backend
-        mock_results = [(email, 0.8)]
-        storage.similarity_search = Mock(return_value=mock_results)
-        
-        handler = SemanticHandler(
-            storage=storage,
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-            embedder=mock_embedder,
-        )
-        
-        result = handler.handle("test query")
+        result = semantic_handler.handle("test query")
         
         assert result['query_type'] == 'semantic'
         # Should have called similarity_search as fallback
-        storage.similarity_search.assert_called_once()
-        # Should NOT have hybrid_search attribute called
-        assert not hasattr(storage, 'hybrid_search') or not storage.hybrid_search.called
+        assert [name for name, _ in storage.search_calls] == ["similarity_search"]
+        assert 'threshold' in storage.search_calls[0][1]
 
-    def test_hybrid_search_with_reranking(self, handler_dependencies):
+    def test_hybrid_search_with_reranking(self, semantic_handler):
         """Should use hybrid_search when available."""
-        mock_embedder = handler_dependencies['embedder']
-        storage = handler_dependencies['storage']
-        
         emails = [
-            MailMessage(
-                id=f"test{i}",
-                from_="test@example.com",
-                subject=f"Email {i}",
-                snippet=f"Content {i}",
-                internal_date=1733050800000,
-            )
+            make_email(f"test{i}", f"Email {i}", "test@example.com", f"Content {i}", 1733050800)
             for i in range(10)
         ]
-        for email in emails:
-            storage.save_message(email)
-        
-        # Mock hybrid_search to return multiple results
-        mock_results = [(email, 0.9 - i*0.05) for i, email in enumerate(emails[:10])]
-        storage.hybrid_search = Mock(return_value=mock_results)
-        
-        handler = SemanticHandler(
-            storage=storage,
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-            embedder=mock_embedder,
-        )
+        storage = FakeHybridStorage([(email, 0.9 - i*0.05) for i, email in enumerate(emails)])
+        semantic_handler.storage = storage
         
-        result = handler.handle("test query", limit=5)
+        result = semantic_handler.handle("test query", limit=5)
         
         assert result['query_type'] == 'semantic'
-        # Should have called hybrid_search
-        storage.hybrid_search.assert_called_once()
-        # Verify hybrid_search was called with correct parameters
-        call_args = storage.hybrid_search.call_args
-        assert 'query_embedding' in call_args[1]
-        assert 'query_text' in call_args[1]
-        assert call_args[1]['limit'] == 5
-        assert 'vector_weight' in call_args[1]
-        assert 'keyword_weight' in call_args[1]
+        # Should have called hybrid_search once, with the correct parameters
+        assert [name for name, _ in storage.search_calls] == ["hybrid_search"]
+        call_kwargs = storage.search_calls[0][1]
+        assert 'query_embedding' in call_kwargs
+        assert 'query_text' in call_kwargs
+        assert call_kwargs['limit'] == 5
+        assert 'vector_weight' in call_kwargs
+        assert 'keyword_weight' in call_kwargs
 
 
 class TestBaseHandlerMethods:
     """Tests for base handler shared methods."""
 
-    def test_build_response_format(self, handler_dependencies):
+    def test_build_response_format(self, conversation_handler):
         """Should build response with correct format."""
-        handler = ConversationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
-        response = handler._build_response(
+        response = conversation_handler._build_response(
             answer="Test answer",
             sources=[{"id": "1", "subject": "Test"}],
             question="Test question",
@@ -770,14 +503,8 @@ class TestBaseHandlerMethods:
         assert response['confidence'] == "high"
         assert response['extra_field'] == "extra_value"
 
-    def test_format_sources(self, handler_dependencies):
+    def test_format_sources(self, conversation_handler):
         """Should format email sources correctly."""
-        handler = ConversationHandler(
-            storage=handler_dependencies['storage'],
-            llm=handler_dependencies['llm'],
-            context_builder=handler_dependencies['context_builder'],
-        )
-        
         emails = [
             MailMessage(
                 id="test1",
@@ -788,7 +515,7 @@ class TestBaseHandlerMethods:
             )
         ]
         
-        sources = handler._format_sources(emails, similarity=0.95)
+        sources = conversation_handler._format_sources(emails, similarity=0.95)
         
         assert len(sources) == 1
         assert sources[0]['message_id'] == "test1"
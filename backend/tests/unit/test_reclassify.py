@@ -1,13 +1,44 @@
 """Tests for the reclassify endpoint and update_message_latest_classification functionality."""
 
+import json
 import pytest
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
 from unittest.mock import patch, MagicMock
 
+from src.storage import use_storage
 from src.models.message import MailMessage
 from src.models.classification_record import ClassificationRecord
+from src.services import LLMProcessor
 from src.storage.memory_storage import InMemoryStorage
 
+# Fixed classification timestamps keep record ordering deterministic
+_FIXED_TS = datetime(2024, 1, 1, tzinfo=timezone.utc)
+_LATER_TS = _FIXED_TS + timedelta(hours=1)
+
+# Base64: "We would like to invite you to an interview!"
+_INTERVIEW_B64 = "V2Ugd291bGQgbGlrZSB0byBpbnZpdGUgeW91IHRvIGFuIGludGVydmlldyE="
+# Base64: "This is the full body of the email with much more content than the snippet."
+_FULL_BODY_B64 = (
+    "VGhpcyBpcyB0aGUgZnVsbCBib2R5IG9mIHRoZSBlbWFpbCB3aXRoIG11Y2ggbW9yZSBjb250ZW50"
+    "IHRoYW4gdGhlIHNuaXBwZXQu"
+)
+
+# Body of a successful Ollama /api/tags response
+_MODELS_JSON = json.dumps({
+    "models": [
+        {"name": "gemma:2b", "size": 123456},
+        {"name": "gemma:7b", "size": 789012},
+        {"name": "llama2:13b", "size": 345678}
+    ]
+}).encode('utf-8')
+
+
+@pytest.fixture(scope="module")
+def _memory_storage():
+    """One InMemoryStorage per module; ``mock_storage`` empties it per test."""
+    return InMemoryStorage()
+
 
 class TestUpdateMessageLatestClassification:
     """Tests for update_message_latest_classification method."""
@@ -42,7 +73,7 @@ class TestUpdateMessageLatestClassification:
             priority="high",
             summary="First summary",
             model="gemma:2b",
-            created_at=datetime.now(timezone.utc)
+            created_at=_FIXED_TS
         )
         storage.save_classification_record(classification1)
         storage.update_message_latest_classification("test-msg-1", "class-1")
@@ -61,7 +92,7 @@ class TestUpdateMessageLatestClassification:
             priority="normal",
             summary="Updated summary",
             model="gemma:7b",
-            created_at=datetime.now(timezone.utc)
+            created_at=_LATER_TS
         )
         storage.save_classification_record(classification2)
         storage.update_message_latest_classification("test-msg-1", "class-2")
@@ -74,20 +105,18 @@ class TestUpdateMessageLatestClassification:
         
         # Verify both classifications exist in history
         history = storage.list_classification_records_for_message("test-msg-1")
-        assert len(history) == 2
-        assert history[0].id in ["class-1", "class-2"]
-        assert history[1].id in ["class-1", "class-2"]
+        assert {record.id for record in history} == {"class-1", "class-2"}
 
 
 class TestReclassifyEndpoint:
     """Tests for the /messages/{message_id}/reclassify API endpoint."""
     
     @pytest.fixture
-    def mock_storage(self):
-        """Create a mock storage backend."""
-        storage = InMemoryStorage()
-        storage.init_db()
-        return storage
+    def mock_storage(self, _memory_storage):
+        """The shared in-memory backend, emptied and installed for the API."""
+        _memory_storage.reset()
+        with use_storage(_memory_storage):
+            yield _memory_storage
     
     @pytest.fixture
     def test_message(self, mock_storage):
@@ -104,7 +133,7 @@ class TestReclassifyEndpoint:
             payload={
                 "mimeType": "text/plain",
                 "body": {
-                    "data": "V2Ugd291bGQgbGlrZSB0byBpbnZpdGUgeW91IHRvIGFuIGludGVydmlldyE="  # Base64: "We would like to invite you to an interview!"
+                    "data": _INTERVIEW_B64
                 }
             },
             raw=None,
@@ -114,54 +143,50 @@ class TestReclassifyEndpoint:
         mock_storage.save_message(msg)
         return msg
     
-    def test_reclassify_creates_new_classification(self, mock_storage, test_message):
-        """Test that reclassify creates a new classification record."""
-        from src.api import app
-        from fastapi.testclient import TestClient
-        from src import storage as storage_module
+    @pytest.fixture(autouse=True)
+    def patched_llm(self):
+        """Stand-in for the LLMProcessor the endpoint builds; tests set its result."""
+        processor = MagicMock(spec=LLMProcessor)
+        processor.configure_mock(model="gemma:7b")
+        with patch('src.api.LLMProcessor', return_value=processor):
+            yield processor
+    
+    @pytest.mark.parametrize("model, result", [
+        ("gemma:7b", {
+            "labels": ["job-interview"],
+            "priority": "high",
+            "summary": "Interview invitation from company"
+        }),
+        ("gemma:2b", {"labels": ["test"], "priority": "normal", "summary": "Test"}),
+    ])
+    def test_reclassify_creates_new_classification(self, api_client, mock_storage, patched_llm, test_message, model, result):
+        """Test that reclassify records a new classification made with the requested model."""
         
-        # Set the storage backend to our mock before the API uses it
-        storage_module.set_storage_backend(mock_storage)
+        patched_llm.categorize_message.return_value = result
+        # The processor's own model differs so the record must come from the request.
+        patched_llm.model = "processor-default"
         
-        try:
-            # Mock LLM processor
-            mock_processor = MagicMock()
-            mock_processor.categorize_message.return_value = {
-                "labels": ["job-interview"],
-                "priority": "high",
-                "summary": "Interview invitation from company"
-            }
-            mock_processor.model = "gemma:7b"
-            
-            with patch('src.api.LLMProcessor', return_value=mock_processor):
-                client = TestClient(app)
-                
-                # Make reclassify request
-                response = client.post(
-                    f"/messages/{test_message.id}/reclassify",
-                    json={"model": "gemma:7b"}
-                )
-                
-                assert response.status_code == 200
-                data = response.json()
-                assert data["success"] is True
-                assert data["message_id"] == test_message.id
-                
-                # Verify new classification was created
-                history = mock_storage.list_classification_records_for_message(test_message.id)
-                assert len(history) == 1
-                assert history[0].labels == ["job-interview"]
-                assert history[0].priority == "high"
-                assert history[0].summary == "Interview invitation from company"
-        finally:
-            # Reset storage backend
-            storage_module._backend = None
+        # Make reclassify request
+        response = api_client.post(
+            f"/messages/{test_message.id}/reclassify",
+            json={"model": model}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert data["message_id"] == test_message.id
+        
+        # Verify new classification was created
+        history = mock_storage.list_classification_records_for_message(test_message.id)
+        assert len(history) == 1
+        assert history[0].labels == result["labels"]
+        assert history[0].priority == result["priority"]
+        assert history[0].summary == result["summary"]
+        assert history[0].model == model
     
-    def test_reclassify_updates_message_latest_classification(self, mock_storage, test_message):
+    def test_reclassify_updates_message_latest_classification(self, api_client, mock_storage, patched_llm, test_message):
         """Test that reclassify updates the message's latest_classification_id."""
-        from src.api import app
-        from fastapi.testclient import TestClient
-        from src import storage as storage_module
         
         # Create initial classification
         initial_classification = ClassificationRecord(
@@ -171,7 +196,7 @@ class TestReclassifyEndpoint:
             priority="normal",
             summary="Initial classification",
             model="gemma:2b",
-            created_at=datetime.now(timezone.utc)
+            created_at=_FIXED_TS
         )
         mock_storage.save_classification_record(initial_classification)
         mock_storage.update_message_latest_classification(test_message.id, "initial-class")
@@ -181,47 +206,32 @@ class TestReclassifyEndpoint:
         assert retrieved.classification_labels == ["job-application"]
         assert retrieved.priority == "normal"
         
-        # Set the storage backend to our mock
-        storage_module.set_storage_backend(mock_storage)
+        patched_llm.categorize_message.return_value = {
+            "labels": ["job-rejection"],
+            "priority": "low",
+            "summary": "Rejection email"
+        }
         
-        try:
-            # Mock LLM processor
-            mock_processor = MagicMock()
-            mock_processor.categorize_message.return_value = {
-                "labels": ["job-rejection"],
-                "priority": "low",
-                "summary": "Rejection email"
-            }
-            mock_processor.model = "gemma:7b"
-            
-            with patch('src.api.LLMProcessor', return_value=mock_processor):
-                client = TestClient(app)
-                
-                # Make reclassify request
-                response = client.post(
-                    f"/messages/{test_message.id}/reclassify",
-                    json={"model": "gemma:7b"}
-                )
-                
-                assert response.status_code == 200
-                
-                # Verify message now has updated classification
-                retrieved = mock_storage.get_message_by_id(test_message.id)
-                assert retrieved.classification_labels == ["job-rejection"]
-                assert retrieved.priority == "low"
-                assert retrieved.summary == "Rejection email"
-                
-                # Verify both classifications exist in history
-                history = mock_storage.list_classification_records_for_message(test_message.id)
-                assert len(history) == 2
-        finally:
-            storage_module._backend = None
+        # Make reclassify request
+        response = api_client.post(
+            f"/messages/{test_message.id}/reclassify",
+            json={"model": "gemma:7b"}
+        )
+        
+        assert response.status_code == 200
+        
+        # Verify message now has updated classification
+        retrieved = mock_storage.get_message_by_id(test_message.id)
+        assert retrieved.classification_labels == ["job-rejection"]
+        assert retrieved.priority == "low"
+        assert retrieved.summary == "Rejection email"
+        
+        # Verify both classifications exist in history
+        history = mock_storage.list_classification_records_for_message(test_message.id)
+        assert len(history) == 2
     
-    def test_reclassify_extracts_full_body(self, mock_storage):
+    def test_reclassify_extracts_full_body(self, api_client, mock_storage, patched_llm):
         """Test that reclassify extracts the full body from Gmail payload."""
-        from src.api import app
-        from fastapi.testclient import TestClient
-        from src import storage as storage_module
         
         # Create message with multipart payload
         msg = MailMessage(
@@ -239,7 +249,7 @@ class TestReclassifyEndpoint:
                     {
                         "mimeType": "text/plain",
                         "body": {
-                            "data": "VGhpcyBpcyB0aGUgZnVsbCBib2R5IG9mIHRoZSBlbWFpbCB3aXRoIG11Y2ggbW9yZSBjb250ZW50IHRoYW4gdGhlIHNuaXBwZXQu"  # "This is the full body of the email with much more content than the snippet."
+                            "data": _FULL_BODY_B64
                         }
                     }
                 ]
@@ -250,122 +260,46 @@ class TestReclassifyEndpoint:
         )
         mock_storage.save_message(msg)
         
-        storage_module.set_storage_backend(mock_storage)
+        # Capture what body the LLM receives
+        patched_llm.categorize_message.return_value = {
+            "labels": ["personal"],
+            "priority": "normal",
+            "summary": "Personal email"
+        }
+        patched_llm.model = "gemma:2b"
         
-        try:
-            # Mock LLM processor and capture what body it receives
-            mock_processor = MagicMock()
-            mock_processor.categorize_message.return_value = {
-                "labels": ["personal"],
-                "priority": "normal",
-                "summary": "Personal email"
-            }
-            mock_processor.model = "gemma:2b"
-            
-            with patch('src.api.LLMProcessor', return_value=mock_processor):
-                client = TestClient(app)
-                
-                response = client.post(
-                    f"/messages/{msg.id}/reclassify",
-                    json={"model": "gemma:2b"}
-                )
-                
-                assert response.status_code == 200
-                
-                # Verify LLM was called with full body, not snippet
-                mock_processor.categorize_message.assert_called_once()
-                call_args = mock_processor.categorize_message.call_args
-                subject, body = call_args[0]
-                
-                assert subject == "Multipart Message"
-                assert "full body" in body
-                assert len(body) > len(msg.snippet)
-        finally:
-            storage_module._backend = None
-    
-    def test_reclassify_with_different_models(self, mock_storage, test_message):
-        """Test that reclassify respects the model parameter."""
-        from src.api import app
-        from fastapi.testclient import TestClient
-        from src import storage as storage_module
+        response = api_client.post(
+            f"/messages/{msg.id}/reclassify",
+            json={"model": "gemma:2b"}
+        )
         
-        storage_module.set_storage_backend(mock_storage)
+        assert response.status_code == 200
         
-        try:
-            mock_processor = MagicMock()
-            mock_processor.categorize_message.return_value = {
-                "labels": ["test"],
-                "priority": "normal",
-                "summary": "Test"
-            }
-            
-            with patch('src.api.LLMProcessor', return_value=mock_processor):
-                client = TestClient(app)
-                
-                # Reclassify with gemma:7b
-                response = client.post(
-                    f"/messages/{test_message.id}/reclassify",
-                    json={"model": "gemma:7b"}
-                )
-                
-                assert response.status_code == 200
-                
-                # Verify classification record has correct model
-                history = mock_storage.list_classification_records_for_message(test_message.id)
-                assert len(history) == 1
-                assert history[0].model == "gemma:7b"
-        finally:
-            storage_module._backend = None
+        # Verify LLM was called with full body, not snippet
+        patched_llm.categorize_message.assert_called_once()
+        call_args = patched_llm.categorize_message.call_args
+        subject, body = call_args[0]
+        
+        assert subject == "Multipart Message"
+        assert "full body" in body
+        assert len(body) > len(msg.snippet)
 
 
 class TestGetModelsEndpoint:
     """Tests for the /models endpoint."""
     
-    def test_get_models_returns_available_models(self):
-        """Test that /models endpoint returns list of available Ollama models."""
-        from src.api import app
-        from fastapi.testclient import TestClient
-        import json
-        from io import BytesIO
-        
-        # Mock the urllib.request.urlopen response
-        mock_response = MagicMock()
-        mock_data = json.dumps({
-            "models": [
-                {"name": "gemma:2b", "size": 123456},
-                {"name": "gemma:7b", "size": 789012},
-                {"name": "llama2:13b", "size": 345678}
-            ]
-        }).encode('utf-8')
-        mock_response.read.return_value = mock_data
-        mock_response.__enter__ = MagicMock(return_value=mock_response)
-        mock_response.__exit__ = MagicMock(return_value=False)
-        
-        with patch('urllib.request.urlopen', return_value=mock_response):
-            client = TestClient(app)
-            response = client.get("/models")
-            
-            assert response.status_code == 200
-            data = response.json()
-            assert "models" in data
-            assert len(data["models"]) == 3
-            assert data["models"][0]["name"] == "gemma:2b"
-            assert data["models"][1]["name"] == "gemma:7b"
-            assert data["models"][2]["name"] == "llama2:13b"
-    
-    def test_get_models_handles_ollama_unavailable(self):
-        """Test that /models endpoint handles Ollama being unavailable."""
-        from src.api import app
-        from fastapi.testclient import TestClient
-        
-        # Mock connection error
-        with patch('urllib.request.urlopen', side_effect=Exception("Connection refused")):
-            client = TestClient(app)
-            response = client.get("/models")
+    @pytest.mark.parametrize("urlopen_kw, expected_names", [
+        # BytesIO is already a readable context manager, like the real response
+        ({"return_value": BytesIO(_MODELS_JSON)}, ["gemma:2b", "gemma:7b", "llama2:13b"]),
+        # The endpoint catches generic errors and returns 200 with an error field
+        ({"side_effect": Exception("Connection refused")}, []),
+    ], ids=["available", "ollama-unavailable"])
+    def test_get_models(self, api_client, urlopen_kw, expected_names):
+        """Test that /models lists Ollama's models, or none with an error when it fails."""
+        with patch('urllib.request.urlopen', **urlopen_kw):
+            response = api_client.get("/models")
             
-            # The endpoint catches exceptions and returns 200 with empty models and error
             assert response.status_code == 200
             data = response.json()
-            assert "models" in data
-            assert len(data["models"]) == 0
-            assert "error" in data
+            assert [m["name"] for m in data["models"]] == expected_names
+            assert ("error" in data) == (not expected_names)
@@ -5,7 +5,19 @@ Run these after deployment or as a quick sanity check.
 """
 
 import pytest
-from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def memory_storage():
+    """Route the storage shim to a fresh in-memory backend for one test.
+
+    Keeps these tests independent of whatever backend an earlier test left
+    installed, so they pass in any order and on any xdist worker.
+    """
+    from src.storage import InMemoryStorage, use_storage
+
+    with use_storage(InMemoryStorage()) as backend:
+        yield backend
 
 
 def test_can_import_api():
@@ -23,25 +35,22 @@ def test_can_import_core_modules():
     # If we get here, imports worked
 
 
-def test_api_starts():
+def test_api_starts(memory_storage, api_client):
     """Verify API can start and respond to requests."""
-    from src.api import app
     from src.storage import storage
 
     # Initialize database first
     storage.init_db()
 
-    client = TestClient(app)
-    response = client.get("/messages")
+    response = api_client.get("/messages")
     assert response.status_code == 200
 
 
-def test_llm_processor_works():
+def test_llm_processor_works(monkeypatch):
     """Verify LLM processor can classify (using fallback)."""
-    import os
     from src.services import LLMProcessor
 
-    os.environ["LLM_PROVIDER"] = "rules"
+    monkeypatch.setenv("LLM_PROVIDER", "rules")
     processor = LLMProcessor()
     result = processor.categorize_message(
         "Invoice Payment",
@@ -57,7 +66,7 @@ def test_llm_processor_works():
     assert isinstance(result["summary"], str)
 
 
-def test_storage_works():
+def test_storage_works(memory_storage):
     """Verify storage can save messages."""
     from src.storage import storage
     from src.models.message import MailMessage
@@ -33,6 +33,81 @@ def test_inmemory_save_and_get():
     assert "1" in ids
 
 
+# reset() empties an InMemoryStorage in place so one instance can be reused.
+def test_inmemory_reset_clears_everything():
+    from src.storage import InMemoryStorage
+
+    mem = InMemoryStorage()
+    mem.save_message(MailMessage(id="1", subject="hi", from_="a@b"))
+    mem.create_classification("1", ["work"], "low", "s", "m")
+    mem.set_history_id("42")
+
+    mem.reset()
+
+    assert mem.get_message_ids() == []
+    assert mem.get_latest_classification("1") is None
+    assert mem.get_history_id() is None
+
+
+# save_messages_batch must leave the store exactly as one save_message per
+# message would, including re-dated and repeated ids within the batch.
+def test_inmemory_save_messages_batch_matches_single_saves():
+    from src.storage import InMemoryStorage
+
+    def batch():
+        return [
+            MailMessage(id="a", internal_date=300, from_="x@y", has_attachments=True),
+            MailMessage(id="b", internal_date=100, from_="x@y", has_attachments=True),
+            MailMessage(id="c", internal_date=200, has_attachments=True),
+            MailMessage(id="b", internal_date=400, from_="z@y", has_attachments=True),
+        ]
+
+    single = InMemoryStorage()
+    batched = InMemoryStorage()
+    for mem in (single, batched):
+        mem.save_message(MailMessage(id="c", internal_date=500, has_attachments=True))
+    for m in batch():
+        single.save_message(m)
+    batched.save_messages_batch(batch())
+
+    expected = ["b", "a", "c"]
+    assert [m.id for m in single.search_by_attachment()] == expected
+    assert [m.id for m in batched.search_by_attachment()] == expected
+    assert batched.get_top_senders() == single.get_top_senders()
+
+
+# init_db() is safe to call on a populated store, as the sync manager does
+# before reading existing ids; only reset() empties it.
+def test_inmemory_init_db_keeps_existing_data():
+    from src.storage import InMemoryStorage
+
+    mem = InMemoryStorage()
+    mem.init_db()
+    mem.save_message(MailMessage(id="1", subject="hi", from_="a@b"))
+    mem.init_db()
+
+    assert mem.get_message_ids() == ["1"]
+
+
+# use_storage routes shim calls to the given backend and restores the
+# previous global backend afterwards, even if the block raises.
+def test_use_storage_restores_previous_backend():
+    from src import storage
+    from src.storage import InMemoryStorage, use_storage
+
+    outer = InMemoryStorage()
+    inner = InMemoryStorage()
+    with use_storage(outer):
+        with pytest.raises(RuntimeError):
+            with use_storage(inner):
+                storage.save_message(MailMessage(id="x"))
+                raise RuntimeError("boom")
+        assert storage.get_storage_backend() is outer
+
+    assert inner.get_message_ids() == ["x"]
+    assert outer.get_message_ids() == []
+
+
 # Ensure that the SQLite backend creates the database file at the
 # provided path, can save a MailMessage, and exposes the saved id.
 def test_sqlite_backend_file(tmp_path):
@@ -45,3 +120,57 @@ def test_sqlite_backend_file(tmp_path):
     s.save_message(m)
     ids = s.get_message_ids()
     assert "2" in ids
+
+
+# ":memory:" databases must persist across the per-call connections the
+# SQLite backend opens, and separate instances must not share data.
+def test_sqlite_in_memory_backend():
+    from src.storage import SQLiteStorage
+
+    s = SQLiteStorage(db_path=":memory:")
+    s.init_db()
+    s.save_message(MailMessage(id="3", subject="hello", from_="x@y"))
+    assert s.get_message_ids() == ["3"]
+
+    other = SQLiteStorage(db_path=":memory:")
+    other.init_db()
+    assert other.get_message_ids() == []
+
+    other.close()
+    s.close()
+
+
+# close() drops a ":memory:" database's keepalive connection, which frees
+# the shared-cache database and its data; repeated calls are harmless.
+def test_sqlite_in_memory_close_releases_database():
+    import sqlite3
+    from src.storage import SQLiteStorage
+
+    s = SQLiteStorage(db_path=":memory:")
+    s.init_db()
+    s.save_message(MailMessage(id="4", subject="hello", from_="x@y"))
+    s.close()
+    s.close()
+
+    probe = sqlite3.connect(s._memory_uri, uri=True)
+    try:
+        tables = probe.execute("SELECT name FROM sqlite_master").fetchall()
+    finally:
+        probe.close()
+    assert tables == []
+
+
+# PostgresStorage only runs its schema DDL once per database URL; later
+# init_db() calls must not open a connection at all.
+def test_postgres_init_db_runs_once_per_url(monkeypatch):
+    from unittest.mock import MagicMock
+    from src.storage.postgres_storage import PostgresStorage
+
+    monkeypatch.setattr(PostgresStorage, "_initialized_urls", set())
+    connect = MagicMock()
+    monkeypatch.setattr(PostgresStorage, "connect", connect)
+
+    PostgresStorage(db_url="postgresql://test/once").init_db()
+    PostgresStorage(db_url="postgresql://test/once").init_db()
+
+    assert connect.call_count == 1
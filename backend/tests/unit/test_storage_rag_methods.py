@@ -10,15 +10,13 @@ Tests the 8 new storage methods added for RAG support:
 - get_total_message_count()
 - get_unread_count()
 """
-import os
 import pytest
 
-os.environ["LLM_PROVIDER"] = "rules"
-os.environ.pop("OLLAMA_HOST", None)
-
 from src.storage.memory_storage import InMemoryStorage
 from src.models.message import MailMessage
 
+pytestmark = pytest.mark.usefixtures("no_llm_api_env")
+
 
 class TestSearchBySender:
     """Tests for search_by_sender method."""
@@ -70,6 +68,14 @@ class TestSearchBySender:
         results = empty_storage.search_by_sender("test")
         assert results == []
 
+    def test_search_by_sender_follows_resaved_message(self, empty_storage):
+        """Re-saving a message under a new sender should move it in the search."""
+        empty_storage.save_message(MailMessage(id="m1", from_="old@example.com"))
+        empty_storage.save_message(MailMessage(id="m1", from_="New@Example.com"))
+
+        assert empty_storage.search_by_sender("old@") == []
+        assert [r.id for r in empty_storage.search_by_sender("new@")] == ["m1"]
+
 
 class TestSearchByAttachment:
     """Tests for search_by_attachment method."""
@@ -100,6 +106,22 @@ class TestSearchByAttachment:
         results = empty_storage.search_by_attachment()
         assert results == []
 
+    def test_search_by_attachment_follows_resaved_date(self, empty_storage):
+        """Re-saving with a new date should reorder; equal dates keep save order."""
+        for msg_id, ts in (("a", 100), ("b", 200), ("c", 200)):
+            empty_storage.save_message(MailMessage(id=msg_id, internal_date=ts, has_attachments=True))
+        assert [r.id for r in empty_storage.search_by_attachment()] == ["b", "c", "a"]
+
+        empty_storage.save_message(MailMessage(id="a", internal_date=300, has_attachments=True))
+        assert [r.id for r in empty_storage.search_by_attachment(limit=2)] == ["a", "b"]
+
+    def test_search_by_attachment_follows_resaved_flag(self, empty_storage):
+        """Re-saving without attachments should drop the message from results."""
+        empty_storage.save_message(MailMessage(id="a", has_attachments=True))
+        empty_storage.save_message(MailMessage(id="a", has_attachments=False))
+
+        assert empty_storage.search_by_attachment() == []
+
     def test_search_by_attachment_no_attachments(self):
         """Should return empty when no emails have attachments."""
         storage = InMemoryStorage()
@@ -225,6 +247,22 @@ class TestCountByTopic:
         
         assert count == 0
 
+    def test_count_by_topic_follows_resaved_message(self, empty_storage):
+        """Re-saving a message should match against its new subject."""
+        empty_storage.save_message(MailMessage(id="m1", subject="Uber receipt"))
+        empty_storage.save_message(MailMessage(id="m1", subject="Lyft receipt"))
+
+        assert empty_storage.count_by_topic("uber") == 0
+        assert empty_storage.count_by_topic("LYFT") == 1
+
+    def test_count_by_topic_sees_later_saves(self, empty_storage):
+        """A repeated topic count should include messages saved in between."""
+        empty_storage.save_message(MailMessage(id="m1", subject="Uber receipt"))
+        assert empty_storage.count_by_topic("uber") == 1
+
+        empty_storage.save_message(MailMessage(id="m2", subject="Uber Eats order"))
+        assert empty_storage.count_by_topic("uber") == 2
+
 
 class TestGetDailyEmailStats:
     """Tests for get_daily_email_stats method."""
@@ -273,6 +311,17 @@ class TestGetDailyEmailStats:
         assert len(stats) == 1
         assert stats[0]['count'] == 2
 
+    def test_get_daily_email_stats_follows_resaved_date(self, empty_storage):
+        """Re-saving a message with a new date should move it to that day."""
+        day_ms = 86400000
+        base_ts = 1733050800000
+
+        empty_storage.save_message(MailMessage(id="e1", internal_date=base_ts))
+        empty_storage.save_message(MailMessage(id="e1", internal_date=base_ts + 3 * day_ms))
+
+        stats = empty_storage.get_daily_email_stats()
+        assert [s['count'] for s in stats] == [1]
+
 
 class TestGetTopSenders:
     """Tests for get_top_senders method."""
@@ -329,6 +378,13 @@ class TestGetTopSenders:
         assert senders[0]['from_addr'] == "frequent@example.com"
         assert senders[0]['count'] == 3
 
+    def test_get_top_senders_follows_resaved_message(self, empty_storage):
+        """Re-saving a message under a new sender should move its count."""
+        empty_storage.save_message(MailMessage(id="m1", from_="old@example.com"))
+        empty_storage.save_message(MailMessage(id="m1", from_="new@example.com"))
+
+        assert empty_storage.get_top_senders() == [{'from_addr': "new@example.com", 'count': 1}]
+
 
 class TestGetTotalMessageCount:
     """Tests for get_total_message_count method."""
@@ -420,6 +476,14 @@ class TestGetUnreadCount:
         count = storage.get_unread_count()
         assert count == 0
 
+    def test_get_unread_count_follows_resaved_message(self, empty_storage):
+        """Re-saving a message without UNREAD should stop counting it."""
+        empty_storage.save_message(MailMessage(id="e1", labels=["INBOX", "UNREAD"]))
+        assert empty_storage.get_unread_count() == 1
+
+        empty_storage.save_message(MailMessage(id="e1", labels=["INBOX"]))
+        assert empty_storage.get_unread_count() == 0
+
 
 class TestStorageMethodsIntegration:
     """Integration tests for storage methods working together."""